@@ -36,6 +36,8 @@ from dipdup.exceptions import DipDupError
 from dipdup.exceptions import InitializationRequiredError
 from dipdup.exceptions import MigrationRequiredError
 from dipdup.hasura import HasuraGateway
+from dipdup.http import CACHE_PATH
+from dipdup.http import ResponseCache
 from dipdup.models import Index
 from dipdup.models import Schema
 from dipdup.utils import iter_files
@@ -341,6 +343,41 @@ async def config_env(ctx, file: Optional[str]) -> None:
         echo(content)
 
 
+@cli.group()
+@click.pass_context
+@cli_wrapper
+async def cache(ctx) -> None:
+    """Manage disk cache of API responses."""
+    ...
+
+
+@cache.command(name='show')
+@click.pass_context
+@cli_wrapper
+async def cache_show(ctx) -> None:
+    """Show information about cached responses."""
+    table: List[Tuple[str, str | int, str]] = [('host', 'entries', 'size')]
+    if exists(CACHE_PATH):
+        for host in sorted(os.listdir(CACHE_PATH)):
+            response_cache = ResponseCache(join(CACHE_PATH, host))
+            table.append((host, response_cache.count(), f'{response_cache.size() / 1024 / 1024:.1f} MB'))
+
+    # NOTE: Lazy import to speed up startup
+    from tabulate import tabulate
+
+    echo(f'Cache path: {CACHE_PATH}')
+    echo(tabulate(table, tablefmt='plain'))
+
+
+@cache.command(name='clear')
+@click.pass_context
+@cli_wrapper
+async def cache_clear(ctx) -> None:
+    """Remove all cached responses."""
+    ResponseCache(CACHE_PATH).clear()
+    _logger.info('Cache cleared')
+
+
 @cli.group(help='Hasura integration related commands.')
 @click.pass_context
 @cli_wrapper
@@ -115,6 +115,7 @@ class PostgresDatabaseConfig:
     :param schema_name: Schema name
     :param immune_tables: List of tables to preserve during reindexing
     :param connection_timeout: Connection timeout
+    :param pool_size: Maximum number of connections in pool; indexes can commit transactions concurrently when greater than 1
     """
 
     kind: Literal['postgres']
@@ -126,12 +127,15 @@ class PostgresDatabaseConfig:
     password: str = field(default='', repr=False)
     immune_tables: Set[str] = field(default_factory=set)
     connection_timeout: int = 60
+    pool_size: int = 1
 
     @cached_property
     def connection_string(self) -> str:
-        # NOTE: `maxsize=1` is important! Concurrency will be broken otherwise.
+        # NOTE: Every transaction takes its own connection from pool; transaction state is task-local since Tortoise 0.19.
         # NOTE: https://github.com/tortoise/tortoise-orm/issues/792
-        connection_string = f'{self.kind}://{self.user}:{quote_plus(self.password)}@{self.host}:{self.port}/{self.database}?maxsize=1'
+        connection_string = (
+            f'{self.kind}://{self.user}:{quote_plus(self.password)}@{self.host}:{self.port}/{self.database}?maxsize={self.pool_size}'
+        )
         if self.schema_name != DEFAULT_POSTGRES_SCHEMA:
             connection_string += f'&schema={self.schema_name}'
         return connection_string
@@ -153,6 +157,12 @@ class PostgresDatabaseConfig:
                 raise ConfigurationError('Tables with `dipdup` prefix can\'t be immune')
         return v
 
+    @validator('pool_size')
+    def _valid_pool_size(cls, v) -> int:
+        if v < 1:
+            raise ConfigurationError('`pool_size` must be a positive integer')
+        return v
+
 
 @dataclass
 class HTTPConfig:
@@ -166,6 +176,8 @@ class HTTPConfig:
     :param connection_limit: Number of simultaneous connections
     :param connection_timeout: Connection timeout in seconds
     :param batch_size: Number of items fetched in a single paginated request (for some APIs)
+    :param cache: Whether to cache finalized responses on disk (for some APIs)
+    :param cache_size: Maximum size of disk cache in megabytes
     """
 
     retry_count: Optional[int] = None
@@ -176,6 +188,8 @@ class HTTPConfig:
     connection_limit: Optional[int] = None  # default 100
     connection_timeout: Optional[int] = None  # default 60
     batch_size: Optional[int] = None
+    cache: Optional[bool] = None
+    cache_size: Optional[int] = None  # default 1024
 
     def merge(self, other: Optional['HTTPConfig']) -> 'HTTPConfig':
         """Set missing values from other config"""
@@ -229,6 +243,14 @@ class ContractConfig(NameMixin):
         return v
 
 
+def _get_contract_address(contract: Optional[Union[str, ContractConfig]]) -> Optional[str]:
+    if contract is None:
+        return None
+    if not isinstance(contract, ContractConfig):
+        raise ConfigInitializationException
+    return contract.address
+
+
 # NOTE: Don't forget `http` and `__hash__` in all datasource configs
 @dataclass
 class TzktDatasourceConfig(NameMixin):
@@ -238,12 +260,22 @@ class TzktDatasourceConfig(NameMixin):
     :param url: Base API URL, e.g. https://api.tzkt.io/
     :param http: HTTP client configuration
     :param buffer_size: Number of levels to keep in FIFO buffer before processing
+    :param prefetch_depth: Number of REST pages to fetch in background while processing during sync
+    :param sync_partitions: Number of level ranges to fetch concurrently during sync
+    :param adaptive_batch_size: Adjust `http.batch_size` based on response time and payload size
+    :param min_batch_size: Lower bound of adaptive batch size
+    :param max_batch_size: Upper bound of adaptive batch size
     """
 
     kind: Literal['tzkt']
     url: str
     http: Optional[HTTPConfig] = None
     buffer_size: int = 0
+    prefetch_depth: int = 0
+    sync_partitions: int = 1
+    adaptive_batch_size: bool = False
+    min_batch_size: int = 100
+    max_batch_size: int = 10000
 
     def __hash__(self) -> int:
         return hash(self.kind + self.url)
@@ -252,6 +284,12 @@ class TzktDatasourceConfig(NameMixin):
         super().__post_init_post_parse__()
         if self.http and self.http.batch_size and self.http.batch_size > 10000:
             raise ConfigurationError('`batch_size` must be less than 10000')
+        if self.prefetch_depth < 0:
+            raise ConfigurationError('`prefetch_depth` must be a non-negative integer')
+        if self.sync_partitions < 1:
+            raise ConfigurationError('`sync_partitions` must be a positive integer')
+        if not 0 < self.min_batch_size <= self.max_batch_size <= 10000:
+            raise ConfigurationError('`min_batch_size` and `max_batch_size` must satisfy 0 < min <= max <= 10000')
         parsed_url = urlparse(self.url)
         # NOTE: Environment substitution disabled
         if '$' in self.url:
@@ -696,11 +734,19 @@ class OperationHandlerConfig(HandlerConfig, kind='handler'):
 
     :param callback: Name of method in `handlers` package
     :param pattern: Filters to match operation groups
+    :param batch: Pass all matched operation groups of a level (or of `batch_levels` levels during sync) to handler at once
+    :param lazy: Parse parameters and storage of matched operations on first access instead of before calling handler
     """
 
     pattern: Tuple[OperationHandlerPatternConfigT, ...]
+    batch: bool = False
+    lazy: bool = False
 
     def iter_imports(self, package: str) -> Iterator[Tuple[str, str]]:
+        if self.batch:
+            yield 'typing', 'Tuple'
+            if any(pattern.optional for pattern in self.pattern):
+                yield 'typing', 'Optional'
         yield 'dipdup.context', 'HandlerContext'
         for pattern in self.pattern:
             yield from pattern.iter_imports(package)
@@ -708,7 +754,11 @@ class OperationHandlerConfig(HandlerConfig, kind='handler'):
     def iter_arguments(self) -> Iterator[Tuple[str, str]]:
         yield 'ctx', 'HandlerContext'
         for pattern in self.pattern:
-            yield from pattern.iter_arguments()
+            for name, cls in pattern.iter_arguments():
+                # NOTE: Sequences of matched operations are aligned, missing optional ones are `None`
+                if self.batch:
+                    cls = f"Tuple[{cls.replace(' = None', '')}, ...]"
+                yield name, cls
 
 
 @dataclass
@@ -749,6 +799,16 @@ class IndexTemplateConfig(NameMixin):
     last_level: int = 0
 
 
+def _validate_index_tunables(batch_levels: int = 1, batch_interval: float = 0, queue_size: int = 0) -> None:
+    """Validate batch processing and realtime queue fields shared by index configs"""
+    if batch_levels < 1:
+        raise ConfigurationError('`batch_levels` must be a positive integer')
+    if batch_interval < 0:
+        raise ConfigurationError('`batch_interval` must be a non-negative number')
+    if queue_size < 0:
+        raise ConfigurationError('`queue_size` must be a non-negative integer')
+
+
 @dataclass
 class IndexConfig(TemplateValuesMixin, NameMixin, SubscriptionsMixin, ParentMixin['ResolvedIndexConfigT']):
     """Index config
@@ -780,10 +840,31 @@ class IndexConfig(TemplateValuesMixin, NameMixin, SubscriptionsMixin, ParentMixi
 
         # NOTE: We need to preserve datasource URL but remove its HTTP tunables to avoid false-positives.
         config_dict['datasource'].pop('http', None)
-        # NOTE: TzKT tunable
+        # NOTE: TzKT tunables
         config_dict['datasource'].pop('buffer_size', None)
+        config_dict['datasource'].pop('prefetch_depth', None)
+        config_dict['datasource'].pop('sync_partitions', None)
+        config_dict['datasource'].pop('adaptive_batch_size', None)
+        config_dict['datasource'].pop('min_batch_size', None)
+        config_dict['datasource'].pop('max_batch_size', None)
         # NOTE: Same for BigMapIndex tunables
         config_dict.pop('skip_history', None)
+        config_dict.pop('skip_history_concurrency', None)
+        # NOTE: Same for batch processing tunables
+        config_dict.pop('batch_levels', None)
+        config_dict.pop('batch_interval', None)
+        # NOTE: Same for realtime queue tunables
+        config_dict.pop('queue_size', None)
+        # NOTE: Unset TokenTransferIndex filters to keep hashes of existing indexes
+        for key in ('contract', 'token_id', 'from_', 'to'):
+            if config_dict.get(key, ...) is None:
+                config_dict.pop(key)
+        for handler_dict in config_dict.get('handlers', ()):
+            handler_dict.pop('batch', None)
+            handler_dict.pop('lazy', None)
+            for key in ('contract', 'token_id', 'from_', 'to'):
+                if handler_dict.get(key, ...) is None:
+                    handler_dict.pop(key)
 
         config_json = json.dumps(config_dict)
         return hashlib.sha256(config_json.encode()).hexdigest()
@@ -797,6 +878,9 @@ class OperationIndexConfig(IndexConfig):
     :param handlers: List of indexer handlers
     :param types: Types of transaction to fetch
     :param contracts: Aliases of contracts being indexed in `contracts` section
+    :param batch_levels: Number of levels to process in a single transaction during sync
+    :param batch_interval: Maximum time in seconds to collect matched levels into a single window during sync, 0 for no limit
+    :param queue_size: Maximum number of realtime items in memory; on overflow levels are fetched again via REST, 0 for no limit
     :param first_level: Level to start indexing from
     :param last_level: Level to stop indexing at (DipDup will terminate at this level)
     """
@@ -805,10 +889,17 @@ class OperationIndexConfig(IndexConfig):
     handlers: Tuple[OperationHandlerConfig, ...]
     types: Tuple[OperationType, ...] = (OperationType.transaction,)
     contracts: List[Union[str, ContractConfig]] = field(default_factory=list)
+    batch_levels: int = 1
+    batch_interval: float = 0
+    queue_size: int = 0
 
     first_level: int = 0
     last_level: int = 0
 
+    def __post_init_post_parse__(self) -> None:
+        super().__post_init_post_parse__()
+        _validate_index_tunables(self.batch_levels, self.batch_interval, self.queue_size)
+
     @cached_property
     def entrypoint_filter(self) -> Set[Optional[str]]:
         """Set of entrypoints to filter operations with before an actual matching"""
@@ -845,10 +936,12 @@ class BigMapHandlerConfig(HandlerConfig, kind='handler'):
 
     :param contract: Contract to fetch big map from
     :param path: Path to big map (alphanumeric string with dots)
+    :param batch: Pass all matched big map diffs of a level (of a window during sync, of a page of keys with `skip_history`) at once
     """
 
     contract: Union[str, ContractConfig]
     path: str
+    batch: bool = False
 
     def __post_init_post_parse__(self):
         super().__post_init_post_parse__()
@@ -868,12 +961,16 @@ class BigMapHandlerConfig(HandlerConfig, kind='handler'):
         return f'{package}.types.{module_name}.big_map.{value_module}', value_cls
 
     @classmethod
-    def format_big_map_diff_argument(cls, path: str) -> Tuple[str, str]:
+    def format_big_map_diff_argument(cls, path: str, batch: bool = False) -> Tuple[str, str]:
         key_cls = f'{snake_to_pascal(path)}Key'
         value_cls = f'{snake_to_pascal(path)}Value'
+        if batch:
+            return pascal_to_snake(path), f'Tuple[BigMapDiff[{key_cls}, {value_cls}], ...]'
         return pascal_to_snake(path), f'BigMapDiff[{key_cls}, {value_cls}]'
 
     def iter_imports(self, package: str) -> Iterator[Tuple[str, str]]:
+        if self.batch:
+            yield 'typing', 'Tuple'
         yield 'dipdup.context', 'HandlerContext'
         yield 'dipdup.models', 'BigMapDiff'
         yield package, 'models as models'
@@ -883,7 +980,7 @@ class BigMapHandlerConfig(HandlerConfig, kind='handler'):
 
     def iter_arguments(self) -> Iterator[Tuple[str, str]]:
         yield 'ctx', 'HandlerContext'
-        yield self.format_big_map_diff_argument(self.path)
+        yield self.format_big_map_diff_argument(self.path, self.batch)
 
     @cached_property
     def contract_config(self) -> ContractConfig:
@@ -925,6 +1022,10 @@ class BigMapIndexConfig(IndexConfig):
     :param datasource: Index datasource to fetch big maps with
     :param handlers: Description of big map diff handlers
     :param skip_history: Fetch only current big map keys ignoring historical changes
+    :param skip_history_concurrency: Number of big map key pages to fetch concurrently with `skip_history`
+    :param batch_levels: Number of levels to process in a single transaction during sync
+    :param batch_interval: Maximum time in seconds to collect matched levels into a single window during sync, 0 for no limit
+    :param queue_size: Maximum number of realtime items in memory; on overflow levels are fetched again via REST, 0 for no limit
     :param first_level: Level to start indexing from
     :param last_level: Level to stop indexing at (Dipdup will terminate at this level)
     """
@@ -934,10 +1035,20 @@ class BigMapIndexConfig(IndexConfig):
     handlers: Tuple[BigMapHandlerConfig, ...]
 
     skip_history: SkipHistory = SkipHistory.never
+    skip_history_concurrency: int = 4
+    batch_levels: int = 1
+    batch_interval: float = 0
+    queue_size: int = 0
 
     first_level: int = 0
     last_level: int = 0
 
+    def __post_init_post_parse__(self) -> None:
+        super().__post_init_post_parse__()
+        if self.skip_history_concurrency < 1:
+            raise ConfigurationError('`skip_history_concurrency` must be a positive integer')
+        _validate_index_tunables(self.batch_levels, self.batch_interval, self.queue_size)
+
     @cached_property
     def contracts(self) -> Set[ContractConfig]:
         return {handler_config.contract_config for handler_config in self.handlers}
@@ -959,36 +1070,115 @@ class HeadHandlerConfig(HandlerConfig, kind='handler'):
 
 @dataclass
 class HeadIndexConfig(IndexConfig):
-    """Head block index config"""
+    """Head block index config
+
+    :param kind: always `head`
+    :param datasource: Index datasource to receive head blocks
+    :param handlers: Mapping of head block handlers
+    :param queue_size: Maximum number of head blocks to keep in memory; on overflow queued blocks are skipped, 0 for no limit
+    """
 
     kind: Literal['head']
     datasource: Union[str, TzktDatasourceConfig]
     handlers: Tuple[HeadHandlerConfig, ...]
+    queue_size: int = 0
+
+    def __post_init_post_parse__(self) -> None:
+        super().__post_init_post_parse__()
+        _validate_index_tunables(queue_size=self.queue_size)
 
 
 @dataclass
 class TokenTransferHandlerConfig(HandlerConfig, kind='handler'):
+    """Token transfer handler config
+
+    :param callback: Name of method in `handlers` package
+    :param contract: Filter by token contract
+    :param token_id: Filter by token ID (requires `contract`)
+    :param from_: Filter by sender (`from` in YAML)
+    :param to: Filter by recipient
+    :param batch: Pass all matched token transfers of a level (or of `batch_levels` levels during sync) to handler at once
+    """
+
+    contract: Optional[Union[str, ContractConfig]] = None
+    token_id: Optional[int] = None
+    from_: Optional[Union[str, ContractConfig]] = None
+    to: Optional[Union[str, ContractConfig]] = None
+    batch: bool = False
+
+    @property
+    def contract_address(self) -> Optional[str]:
+        return _get_contract_address(self.contract)
+
+    @property
+    def from_address(self) -> Optional[str]:
+        return _get_contract_address(self.from_)
+
+    @property
+    def to_address(self) -> Optional[str]:
+        return _get_contract_address(self.to)
+
     def iter_imports(self, package: str) -> Iterator[Tuple[str, str]]:
+        if self.batch:
+            yield 'typing', 'Tuple'
         yield 'dipdup.context', 'HandlerContext'
         yield 'dipdup.models', 'TokenTransferData'
         yield package, 'models as models'
 
     def iter_arguments(self) -> Iterator[Tuple[str, str]]:
         yield 'ctx', 'HandlerContext'
-        yield 'token_transfer', 'TokenTransferData'
+        if self.batch:
+            yield 'token_transfers', 'Tuple[TokenTransferData, ...]'
+        else:
+            yield 'token_transfer', 'TokenTransferData'
 
 
 @dataclass
 class TokenTransferIndexConfig(IndexConfig):
-    """Token index config"""
+    """Token transfer index config
+
+    :param kind: always `token_transfer`
+    :param datasource: Index datasource to use
+    :param handlers: Mapping of token transfer handlers
+    :param contract: Filter by token contract for all handlers
+    :param token_id: Filter by token ID for all handlers (requires `contract`)
+    :param from_: Filter by sender for all handlers (`from` in YAML)
+    :param to: Filter by recipient for all handlers
+    :param batch_levels: Number of levels to process in a single transaction during sync
+    :param batch_interval: Maximum time in seconds to collect matched levels into a single window during sync, 0 for no limit
+    :param queue_size: Maximum number of realtime items in memory; on overflow levels are fetched again via REST, 0 for no limit
+    :param first_level: Level to start indexing from
+    :param last_level: Level to stop indexing at
+    """
 
     kind: Literal['token_transfer']
     datasource: Union[str, TzktDatasourceConfig]
     handlers: Tuple[TokenTransferHandlerConfig, ...] = field(default_factory=tuple)
 
+    contract: Optional[Union[str, ContractConfig]] = None
+    token_id: Optional[int] = None
+    from_: Optional[Union[str, ContractConfig]] = None
+    to: Optional[Union[str, ContractConfig]] = None
+    batch_levels: int = 1
+    batch_interval: float = 0
+    queue_size: int = 0
+
     first_level: int = 0
     last_level: int = 0
 
+    def __post_init_post_parse__(self) -> None:
+        super().__post_init_post_parse__()
+        _validate_index_tunables(self.batch_levels, self.batch_interval, self.queue_size)
+
+
+def _rename_token_transfer_filter(index_dict: Any, old: str, new: str) -> None:
+    """Rename filter key of raw token transfer index config and its handlers"""
+    if not isinstance(index_dict, dict) or index_dict.get('kind') != 'token_transfer':
+        return
+    for filters in (index_dict, *index_dict.get('handlers', ())):
+        if isinstance(filters, dict) and old in filters:
+            filters[new] = filters.pop(old)
+
 
 IndexConfigT = Union[
     OperationIndexConfig,
@@ -1171,6 +1361,7 @@ class AdvancedConfig:
     :param metadata_interface: Expose metadata interface for TzKT
     :param skip_version_check: Do not check for new DipDup versions on startup
     :param rollback_depth: A number of levels to keep for rollback
+    :param parse_workers: Number of processes parsing operation parameters and storage during sync, 0 to parse in the main process
     """
 
     reindex: Dict[ReindexingReason, ReindexingAction] = field(default_factory=dict)
@@ -1181,6 +1372,11 @@ class AdvancedConfig:
     metadata_interface: bool = False
     skip_version_check: bool = False
     rollback_depth: int = 2
+    parse_workers: int = 0
+
+    def __post_init_post_parse__(self) -> None:
+        if self.parse_workers < 0:
+            raise ConfigurationError('`advanced.parse_workers` must be greater or equal to 0')
 
 
 @dataclass
@@ -1225,6 +1421,13 @@ class DipDupConfig:
         self._callback_patterns: Dict[str, List[Sequence[HandlerPatternConfigT]]] = defaultdict(list)
         self._default_hooks: bool = False
 
+    @validator('indexes', 'templates', pre=True, allow_reuse=True)
+    def _valid_token_transfer_filters(cls, v):
+        # NOTE: `from` is a reserved word in Python, so the sender filter is stored as `from_`
+        for index_dict in v.values():
+            _rename_token_transfer_filter(index_dict, 'from', 'from_')
+        return v
+
     @cached_property
     def schema_name(self) -> str:
         if isinstance(self.database, PostgresDatabaseConfig):
@@ -1284,6 +1487,9 @@ class DipDupConfig:
 
         config_json = json.dumps(self, default=pydantic_encoder)
         config_yaml = exclude_none(yaml.load(config_json))
+        for section in ('indexes', 'templates'):
+            for index_dict in config_yaml.get(section, {}).values():
+                _rename_token_transfer_filter(index_dict, 'from_', 'from')
         buffer = StringIO()
         yaml.dump(config_yaml, buffer)
         return buffer.getvalue()
@@ -1501,7 +1707,28 @@ class DipDupConfig:
             index_config.subscriptions.add(HeadSubscription())
 
         elif isinstance(index_config, TokenTransferIndexConfig):
-            index_config.subscriptions.add(TokenTransferSubscription())
+            if self.advanced.merge_subscriptions:
+                index_config.subscriptions.add(TokenTransferSubscription())
+            else:
+                for token_transfer_handler_config in index_config.handlers:
+                    contract = token_transfer_handler_config.contract_address
+                    # NOTE: TzKT allows to subscribe to a single account, either sender or recipient
+                    account = token_transfer_handler_config.from_address or token_transfer_handler_config.to_address
+                    # NOTE: One of handlers requires all transfers, the rest of subscriptions are redundant
+                    if contract is None and account is None:
+                        index_config.subscriptions.clear()
+                        index_config.subscriptions.add(TokenTransferSubscription())
+                        break
+                    index_config.subscriptions.add(
+                        TokenTransferSubscription(
+                            contract=contract,
+                            token_id=token_transfer_handler_config.token_id,
+                            account=account,
+                        )
+                    )
+                else:
+                    if not index_config.handlers:
+                        index_config.subscriptions.add(TokenTransferSubscription())
 
         else:
             raise NotImplementedError(f'Index kind `{index_config.kind}` is not supported')
@@ -1561,9 +1788,30 @@ class DipDupConfig:
             if isinstance(index_config.datasource, str):
                 index_config.datasource = self.get_tzkt_datasource(index_config.datasource)
 
+            for field_name in ('contract', 'from_', 'to'):
+                if isinstance(getattr(index_config, field_name), str):
+                    setattr(index_config, field_name, self.get_contract(getattr(index_config, field_name)))
+
             for token_transfer_handler_config in index_config.handlers:
                 token_transfer_handler_config.parent = index_config
 
+                # NOTE: Index-wide filters are applied to every handler
+                for field_name in ('contract', 'token_id', 'from_', 'to'):
+                    handler_value = getattr(token_transfer_handler_config, field_name)
+                    if isinstance(handler_value, str):
+                        handler_value = self.get_contract(handler_value)
+                    index_value = getattr(index_config, field_name)
+                    if handler_value is None:
+                        handler_value = index_value
+                    elif index_value is not None and handler_value != index_value:
+                        raise ConfigurationError(
+                            f'`{token_transfer_handler_config.callback}` handler `{field_name}` filter conflicts with index one'
+                        )
+                    setattr(token_transfer_handler_config, field_name, handler_value)
+
+                if token_transfer_handler_config.token_id is not None and token_transfer_handler_config.contract is None:
+                    raise ConfigurationError(f'`{token_transfer_handler_config.callback}` handler `token_id` filter requires `contract`')
+
         else:
             raise NotImplementedError(f'Index kind `{index_config.kind}` is not supported')
 
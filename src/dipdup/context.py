@@ -4,6 +4,7 @@ import logging
 import os
 import sys
 from collections import deque
+from concurrent.futures import Executor
 from contextlib import AsyncExitStack
 from contextlib import ExitStack
 from contextlib import contextmanager
@@ -23,6 +24,7 @@ from typing import Type
 from typing import TypeVar
 from typing import Union
 from typing import cast
+from weakref import WeakSet
 
 from tortoise import Tortoise
 from tortoise.exceptions import OperationalError
@@ -68,6 +70,8 @@ from dipdup.utils.database import wipe_schema
 DatasourceT = TypeVar('DatasourceT', bound=Datasource)
 # NOTE: Dependency cycle
 pending_indexes = deque()  # type: ignore
+# NOTE: IndexDispatcher wakeup events; set when new index is pending to not wait for idle timeout
+pending_indexes_events: 'WeakSet[asyncio.Event]' = WeakSet()
 pending_hooks: Deque[Awaitable[None]] = deque()
 rolled_back_indexes: Set[str] = set()
 
@@ -118,6 +122,7 @@ class DipDupContext:
         self.config = config
         self._callbacks = callbacks
         self._transactions = transactions
+        self._parse_pool: Optional[Executor] = None
         self.logger = FormattedLogger('dipdup.context')
 
     def __str__(self) -> str:
@@ -261,6 +266,8 @@ class DipDupContext:
 
         # NOTE: IndexDispatcher will handle further initialization when it's time
         pending_indexes.append(index)
+        for event in pending_indexes_events:
+            event.set()
 
     async def update_contract_metadata(
         self,
@@ -402,13 +409,16 @@ class CallbackManager:
         self._package = package
         self._handlers: Dict[Tuple[str, str], HandlerConfig] = {}
         self._hooks: Dict[str, HookConfig] = {}
+        self._hooks_scheduled = asyncio.Event()
 
     async def run(self) -> None:
         self._logger.debug('Starting CallbackManager loop')
         while True:
+            await self._hooks_scheduled.wait()
+            # NOTE: Hooks scheduled while awaiting pending ones will trigger the next iteration
+            self._hooks_scheduled.clear()
             while pending_hooks:
                 await pending_hooks.popleft()
-            await asyncio.sleep(1)
 
     def register_handler(self, handler_config: HandlerConfig) -> None:
         if not handler_config.parent:
@@ -486,6 +496,7 @@ class CallbackManager:
             await _wrapper()
         else:
             pending_hooks.append(_wrapper())
+            self._hooks_scheduled.set()
 
     async def execute_sql(self, ctx: 'DipDupContext', name: str) -> None:
         """Execute SQL included with project"""
@@ -33,6 +33,12 @@ class DatasourceFactory:
                 http_config=datasource_config.http,
                 merge_subscriptions=config.advanced.merge_subscriptions,
                 buffer_size=datasource_config.buffer_size,
+                prefetch_depth=datasource_config.prefetch_depth,
+                sync_partitions=datasource_config.sync_partitions,
+                adaptive_batch_size=datasource_config.adaptive_batch_size,
+                min_batch_size=datasource_config.min_batch_size,
+                max_batch_size=datasource_config.max_batch_size,
+                rollback_depth=config.advanced.rollback_depth,
             )
 
         if isinstance(datasource_config, CoinbaseDatasourceConfig):
@@ -41,6 +41,9 @@ class BigMapSubscription(Subscription):
 @dataclass(frozen=True)
 class TokenTransferSubscription(Subscription):
     type: Literal['token_transfer'] = 'token_transfer'
+    contract: Optional[str] = None
+    token_id: Optional[int] = None
+    account: Optional[str] = None
 
 
 class SubscriptionManager:
@@ -1,10 +1,14 @@
 import asyncio
+import heapq
 import logging
 import sys
+import time
+from asyncio import CancelledError
 from asyncio import Event
 from asyncio import create_task
 from collections import defaultdict
 from collections import deque
+from contextlib import suppress
 from datetime import datetime
 from datetime import timezone
 from decimal import Decimal
@@ -18,12 +22,17 @@ from typing import DefaultDict
 from typing import Deque
 from typing import Dict
 from typing import Generator
+from typing import Generic
+from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import NamedTuple
 from typing import NoReturn
 from typing import Optional
+from typing import Sequence
 from typing import Set
 from typing import Tuple
+from typing import TypeVar
 from typing import Union
 from typing import cast
 
@@ -55,10 +64,20 @@ from dipdup.models import HeadBlockData
 from dipdup.models import OperationData
 from dipdup.models import QuoteData
 from dipdup.models import TokenTransferData
+from dipdup.models import construct
+from dipdup.prometheus import Metrics
 from dipdup.utils import FormattedLogger
 from dipdup.utils import split_by_chunks
 
 TZKT_ORIGINATIONS_REQUEST_LIMIT = 100
+# NOTE: Adaptive batch size aims for pages fetched in about a second and no larger than a few megabytes
+TARGET_PAGE_DURATION = 1.0
+TARGET_PAGE_PAYLOAD = 4 * 1024 * 1024
+# NOTE: Number of Websocket messages received but not processed yet; receive loop is blocked when exceeded
+REALTIME_QUEUE_SIZE = 1000
+
+PageT = TypeVar('PageT')
+LevelDataT = TypeVar('LevelDataT', OperationData, BigMapData, TokenTransferData)
 
 
 def dedup_operations(operations: Tuple[OperationData, ...]) -> Tuple[OperationData, ...]:
@@ -71,8 +90,163 @@ def dedup_operations(operations: Tuple[OperationData, ...]) -> Tuple[OperationDa
     )
 
 
+def split_by_level(items: Tuple[LevelDataT, ...]) -> Iterator[Tuple[int, Tuple[LevelDataT, ...]]]:
+    """Split a batch of items sorted by level into per-level slices in a single pass"""
+    start = 0
+    for i in range(1, len(items)):
+        if items[i].level != items[i - 1].level:
+            yield items[start].level, items[start:i]
+            start = i
+    if items:
+        yield items[start].level, items[start:]
+
+
+async def group_by_level(batches: AsyncIterator[Tuple[LevelDataT, ...]]) -> AsyncIterator[Tuple[int, Tuple[LevelDataT, ...]]]:
+    """Yield items of paginated REST response grouped by level.
+
+    Items must be sorted by level. The last level of a batch is held back until the next one, as it may continue there.
+    """
+    pending: List[LevelDataT] = []
+    async for batch in batches:
+        if not batch:
+            continue
+        if pending and pending[-1].level != batch[0].level:
+            yield pending[0].level, tuple(pending)
+            pending = []
+
+        levels = tuple(split_by_level(batch))
+        for level, items in levels[:-1]:
+            if pending:
+                pending.extend(items)
+                yield level, tuple(pending)
+                pending = []
+            else:
+                yield level, items
+        pending.extend(levels[-1][1])
+
+    if pending:
+        yield pending[0].level, tuple(pending)
+
+
+class PagePrefetcher(Generic[PageT]):
+    """Consumes pages in a background task keeping up to `depth` of them ready to be processed.
+
+    Fetching starts on creation. Backpressure is provided by the bounded queue: fetching is suspended until the consumer catches up.
+    `close` must be called when done to stop fetching and release pages left in the queue.
+    """
+
+    def __init__(self, pages: AsyncIterator[PageT], depth: int, datasource: str) -> None:
+        self._pages = pages
+        self._datasource = datasource
+        self._queue: asyncio.Queue[Union[PageT, Exception, None]] = asyncio.Queue(maxsize=depth)
+        # NOTE: Pages counted in the shared datasource gauge, released on close whatever the reason of exit is
+        self._buffered = 0
+        self._task = create_task(self._fetch())
+
+    def _count_pages(self, pages: int) -> None:
+        self._buffered += pages
+        if Metrics.enabled:
+            if pages > 0:
+                Metrics.inc_datasource_fetch_buffer(self._datasource, pages)
+            else:
+                Metrics.dec_datasource_fetch_buffer(self._datasource, -pages)
+
+    async def _fetch(self) -> None:
+        try:
+            async for page in self._pages:
+                await self._queue.put(page)
+                self._count_pages(1)
+        except Exception as e:
+            await self._queue.put(e)
+        else:
+            await self._queue.put(None)
+
+    async def iter_pages(self) -> AsyncIterator[PageT]:
+        while (item := await self._queue.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            self._count_pages(-1)
+            yield item
+
+    async def close(self) -> None:
+        self._task.cancel()
+        with suppress(CancelledError):
+            await self._task
+
+        # NOTE: Consumer exited early, drop pages left in queue
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        if self._buffered:
+            self._count_pages(-self._buffered)
+
+
+async def prefetch_pages(pages: AsyncIterator[PageT], depth: int, datasource: str) -> AsyncGenerator[PageT, None]:
+    """Iterate over pages fetched in background, see `PagePrefetcher`"""
+    prefetcher = PagePrefetcher(pages, depth, datasource)
+    try:
+        async for page in prefetcher.iter_pages():
+            yield page
+    finally:
+        await prefetcher.close()
+
+
+def split_level_range(first_level: int, last_level: int, partitions: int) -> Tuple[Tuple[int, int], ...]:
+    """Split level range into up to `partitions` adjacent windows of roughly equal size"""
+    partitions = max(min(partitions, last_level - first_level + 1), 1)
+    step, remainder = divmod(last_level - first_level + 1, partitions)
+    windows: Deque[Tuple[int, int]] = deque()
+    for i in range(partitions):
+        last = first_level + step - 1 + (i < remainder)
+        windows.append((first_level, last))
+        first_level = last + 1
+    return tuple(windows)
+
+
+class AdaptiveBatchSize:
+    """Adjusts the number of items requested per REST page within bounds.
+
+    Every full page is an estimate of how long and how large a page of different size would be. The next size is scaled to meet both
+    `TARGET_PAGE_DURATION` and `TARGET_PAGE_PAYLOAD`, at most twice per observation. Partial pages can only shrink the size.
+    """
+
+    def __init__(self, size: int, min_size: int, max_size: int, history: int = 16) -> None:
+        self._min_size = min_size
+        self._max_size = max_size
+        self._size = self._clamp(size)
+        self._durations: Deque[float] = deque(maxlen=history)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def durations(self) -> Tuple[float, ...]:
+        """Durations of recent page requests"""
+        return tuple(self._durations)
+
+    def observe(self, limit: int, items: int, duration: float, payload: int) -> None:
+        """Update size with the result of a page request sent with `limit`"""
+        self._durations.append(duration)
+
+        ratio = TARGET_PAGE_DURATION / max(duration, 0.001)
+        if payload:
+            ratio = min(ratio, TARGET_PAGE_PAYLOAD / payload)
+        ratio = max(min(ratio, 2.0), 0.5)
+
+        # NOTE: Dead band to avoid jitter; partial page says nothing about larger ones
+        if 0.8 < ratio < 1.25 or (ratio > 1 and items < limit):
+            return
+        self._size = self._clamp(int(limit * ratio))
+
+    def _clamp(self, size: int) -> int:
+        return max(min(size, self._max_size), self._min_size)
+
+
 class OperationFetcher:
-    """Fetches operations from multiple REST API endpoints, merges them and yields by level. Offet of every endpoint is tracked separately."""
+    """Fetches operations from multiple REST API endpoints, merges them and yields by level.
+
+    Offset of every endpoint is tracked separately.
+    """
 
     def __init__(
         self,
@@ -95,6 +269,15 @@ class OperationFetcher:
         self._offsets: Dict[OperationFetcherRequest, int] = {}
         self._fetched: Dict[OperationFetcherRequest, bool] = {}
 
+        # NOTE: TzKT may hit URL length limit with hundreds of originations in a single request.
+        # NOTE: Every chunk of addresses is paginated separately; see `TzktDatasource.get_originations`.
+        self._origination_chunks = tuple(
+            tuple(chunk) for chunk in split_by_chunks(sorted(origination_addresses), TZKT_ORIGINATIONS_REQUEST_LIMIT)
+        )
+        self._origination_chunks_heads: List[int] = []
+        self._origination_chunks_offsets: List[int] = []
+        self._origination_chunks_fetched: List[bool] = []
+
         self._operations: DefaultDict[int, Deque[OperationData]] = defaultdict(deque)
         for origination in migration_originations or ():
             self._operations[origination.level].append(origination)
@@ -104,10 +287,11 @@ class OperationFetcher:
         for i in range(len(operations) - 1)[::-1]:
             if operations[i].level != operations[i + 1].level:
                 return operations[i].level
-        return operations[0].level
+        # NOTE: Whole batch belongs to a single level which is not complete yet
+        return operations[0].level - 1
 
     async def _fetch_originations(self) -> None:
-        """Fetch a single batch of originations, bump channel offset"""
+        """Fetch a single batch of originations of every lagging address chunk concurrently, bump chunk offsets"""
         key = OperationFetcherRequest.originations
         if not self._origination_addresses:
             self._fetched[key] = True
@@ -115,22 +299,41 @@ class OperationFetcher:
         if self._fetched[key]:
             return
 
-        self._logger.debug('Fetching originations of %s', self._origination_addresses)
-
-        # FIXME: No pagination because of URL length limit workaround
-        originations = await self._datasource.get_originations(
-            addresses=self._origination_addresses,
-            first_level=self._first_level,
-            last_level=self._last_level,
+        # NOTE: Only chunks behind the others are fetched; buffer won't grow past a single batch per chunk
+        unfinished = tuple(i for i, fetched in enumerate(self._origination_chunks_fetched) if not fetched)
+        lagging_head = min(self._origination_chunks_heads[i] for i in unfinished)
+        chunks = tuple(i for i in unfinished if self._origination_chunks_heads[i] == lagging_head)
+        self._logger.debug('Fetching originations of %s address chunks', len(chunks))
+
+        limit = self._datasource.request_limit
+        batches = await asyncio.gather(
+            *(
+                self._datasource.get_originations(
+                    addresses=set(self._origination_chunks[i]),
+                    offset=self._origination_chunks_offsets[i],
+                    limit=limit,
+                    first_level=self._first_level,
+                    last_level=self._last_level,
+                )
+                for i in chunks
+            )
         )
 
-        for op in originations:
-            level = op.level
-            self._operations[level].append(op)
+        for i, originations in zip(chunks, batches):
+            for level, level_originations in split_by_level(originations):
+                self._operations[level].extend(level_originations)
 
-        self._logger.debug('Got %s', len(originations))
-        self._fetched[key] = True
-        self._heads[key] = self._last_level
+            self._logger.debug('Got %s', len(originations))
+
+            if len(originations) < limit:
+                self._origination_chunks_fetched[i] = True
+                self._origination_chunks_heads[i] = self._last_level
+            else:
+                self._origination_chunks_offsets[i] = originations[-1].id
+                self._origination_chunks_heads[i] = self._get_operations_head(originations)
+
+        self._fetched[key] = all(self._origination_chunks_fetched)
+        self._heads[key] = min(self._origination_chunks_heads)
 
     async def _fetch_transactions(self, field: str) -> None:
         """Fetch a single batch of transactions, bump channel offset"""
@@ -143,21 +346,22 @@ class OperationFetcher:
 
         self._logger.debug('Fetching %s transactions of %s', field, self._transaction_addresses)
 
+        limit = self._datasource.request_limit
         transactions = await self._datasource.get_transactions(
             field=field,
             addresses=self._transaction_addresses,
             offset=self._offsets[key],
+            limit=limit,
             first_level=self._first_level,
             last_level=self._last_level,
         )
 
-        for op in transactions:
-            level = op.level
-            self._operations[level].append(op)
+        for level, level_transactions in split_by_level(transactions):
+            self._operations[level].extend(level_transactions)
 
         self._logger.debug('Got %s', len(transactions))
 
-        if len(transactions) < self._datasource.request_limit:
+        if len(transactions) < limit:
             self._fetched[key] = True
             self._heads[key] = self._last_level
         else:
@@ -169,6 +373,16 @@ class OperationFetcher:
 
         Resulting data is splitted by level, deduped, sorted and ready to be processed by OperationIndex.
         """
+        pages = self.fetch_operations_by_page()
+        if self._datasource.prefetch_depth:
+            pages = prefetch_pages(pages, self._datasource.prefetch_depth, self._datasource.name)
+
+        async for page in pages:
+            for level, operations in page:
+                yield level, operations
+
+    async def fetch_operations_by_page(self) -> AsyncGenerator[Tuple[Tuple[int, Tuple[OperationData, ...]], ...], None]:
+        """Fetch a single batch from the lagging channel at a time, yield levels which are complete after that"""
         for type_ in (
             OperationFetcherRequest.sender_transactions,
             OperationFetcherRequest.target_transactions,
@@ -178,6 +392,10 @@ class OperationFetcher:
             self._offsets[type_] = 0
             self._fetched[type_] = False
 
+        self._origination_chunks_heads = [0] * len(self._origination_chunks)
+        self._origination_chunks_offsets = [0] * len(self._origination_chunks)
+        self._origination_chunks_fetched = [False] * len(self._origination_chunks)
+
         while True:
             min_head = sorted(self._heads.items(), key=lambda x: x[1])[0][0]
             if min_head == OperationFetcherRequest.originations:
@@ -189,12 +407,16 @@ class OperationFetcher:
             else:
                 raise RuntimeError
 
+            page: Deque[Tuple[int, Tuple[OperationData, ...]]] = deque()
             head = min(self._heads.values())
-            while self._head <= head:
-                if self._head in self._operations:
-                    operations = self._operations.pop(self._head)
-                    yield self._head, dedup_operations(tuple(operations))
-                self._head += 1
+            # NOTE: Iterate over buffered levels only, not over every level in range
+            for level in sorted(level for level in self._operations if level <= head):
+                operations = self._operations.pop(level)
+                page.append((level, dedup_operations(tuple(operations))))
+            self._head = max(self._head, head + 1)
+
+            if page:
+                yield tuple(page)
 
             if all(self._fetched.values()):
                 break
@@ -203,6 +425,31 @@ class OperationFetcher:
             raise RuntimeError('Operations left in queue')
 
 
+async def fetch_operations_by_level_concurrently(
+    fetchers: Sequence[OperationFetcher],
+) -> AsyncIterator[Tuple[int, Tuple[OperationData, ...]]]:
+    """Run fetchers of adjacent level ranges concurrently, yield their operations strictly in level order.
+
+    Every fetcher keeps at most `prefetch_depth` (at least one) pages in memory until previous ranges are processed.
+    """
+    if len(fetchers) == 1:
+        async for level, operations in fetchers[0].fetch_operations_by_level():
+            yield level, operations
+        return
+
+    datasource = fetchers[0]._datasource
+    depth = max(datasource.prefetch_depth, 1)
+    prefetchers = tuple(PagePrefetcher(fetcher.fetch_operations_by_page(), depth, datasource.name) for fetcher in fetchers)
+    try:
+        for prefetcher in prefetchers:
+            async for page in prefetcher.iter_pages():
+                for level, operations in page:
+                    yield level, operations
+    finally:
+        for prefetcher in prefetchers:
+            await prefetcher.close()
+
+
 class BigMapFetcher:
     """Fetches bigmap diffs from REST API, merges them and yields by level."""
 
@@ -226,74 +473,49 @@ class BigMapFetcher:
 
         Resulting data is splitted by level, deduped, sorted and ready to be processed by BigMapIndex.
         """
-
-        big_maps: Tuple[BigMapData, ...] = ()
-
-        # TODO: Share code between this and OperationFetcher
         big_map_iter = self._datasource.iter_big_maps(
             self._big_map_addresses,
             self._big_map_paths,
             self._first_level,
             self._last_level,
         )
-        async for fetched_big_maps in big_map_iter:
-            big_maps = big_maps + fetched_big_maps
-
-            # NOTE: Yield big map slices by level except the last one
-            while True:
-                for i in range(len(big_maps) - 1):
-                    curr_level, next_level = big_maps[i].level, big_maps[i + 1].level
-
-                    # NOTE: Level boundaries found. Exit for loop, stay in while.
-                    if curr_level != next_level:
-                        yield curr_level, big_maps[: i + 1]
-                        big_maps = big_maps[i + 1 :]
-                        break
-                else:
-                    break
-
-        if big_maps:
-            yield big_maps[0].level, big_maps
+        async for level, big_maps in group_by_level(big_map_iter):
+            yield level, big_maps
 
 
 class TokenTransferFetcher:
+    """Fetches token transfers from REST API filtered on server side and yields by level."""
+
     def __init__(
         self,
         datasource: 'TzktDatasource',
         first_level: int,
         last_level: int,
+        token_addresses: Optional[Set[str]] = None,
+        token_ids: Optional[Set[int]] = None,
+        from_addresses: Optional[Set[str]] = None,
+        to_addresses: Optional[Set[str]] = None,
     ) -> None:
         self._logger = logging.getLogger('dipdup.tzkt')
         self._datasource = datasource
         self._first_level = first_level
         self._last_level = last_level
+        self._token_addresses = token_addresses
+        self._token_ids = token_ids
+        self._from_addresses = from_addresses
+        self._to_addresses = to_addresses
 
     async def fetch_token_transfers_by_level(self) -> AsyncGenerator[Tuple[int, Tuple[TokenTransferData, ...]], None]:
-        token_transfers: Tuple[TokenTransferData, ...] = ()
-
-        # TODO: Share code between this and OperationFetcher
         token_transfer_iter = self._datasource.iter_token_transfers(
             self._first_level,
             self._last_level,
+            token_addresses=self._token_addresses,
+            token_ids=self._token_ids,
+            from_addresses=self._from_addresses,
+            to_addresses=self._to_addresses,
         )
-        async for fetched_token_transfers in token_transfer_iter:
-            token_transfers = token_transfers + fetched_token_transfers
-
-            # NOTE: Yield token transfer slices by level except the last one
-            while True:
-                for i in range(len(token_transfers) - 1):
-                    curr_level, next_level = token_transfers[i].level, token_transfers[i + 1].level
-
-                    # NOTE: Level boundaries found. Exit for loop, stay in while.
-                    if curr_level != next_level:
-                        yield curr_level, token_transfers[: i + 1]
-                        token_transfers = token_transfers[i + 1 :]
-                        break
-                else:
-                    break
-
-        if token_transfers:
-            yield token_transfers[0].level, token_transfers
+        async for level, token_transfers in group_by_level(token_transfer_iter):
+            yield level, token_transfers
 
 
 MessageData = Union[Dict[str, Any], List[Dict[str, Any]]]
@@ -302,24 +524,40 @@ MessageData = Union[Dict[str, Any], List[Dict[str, Any]]]
 class BufferedMessage(NamedTuple):
     type: MessageType
     data: MessageData
+    size: int = 0
 
 
 class MessageBuffer:
-    """Buffers realtime TzKT messages and yields them in by level."""
+    """Buffers realtime TzKT messages and yields them in by level.
+
+    Messages are grouped by level; buffered levels are kept in a min-heap, so the oldest level is popped in O(log n) without sorting.
+    """
 
     def __init__(self, size: int) -> None:
         self._logger = logging.getLogger('dipdup.tzkt')
         self._size = size
         self._messages: Dict[int, List[BufferedMessage]] = {}
+        self._levels: List[int] = []
+        self._items = 0
 
     def __len__(self) -> int:
         return len(self._messages)
 
+    @property
+    def item_count(self) -> int:
+        """Number of data items in buffered messages"""
+        return self._items
+
     def add(self, type_: MessageType, level: int, data: MessageData) -> None:
         """Add a message to the buffer."""
         if level not in self._messages:
             self._messages[level] = []
-        self._messages[level].append(BufferedMessage(type_, data))
+            heapq.heappush(self._levels, level)
+
+        # NOTE: Head messages contain a single block, others are lists of items
+        size = len(data) if isinstance(data, list) else 1
+        self._items += size
+        self._messages[level].append(BufferedMessage(type_, data, size))
 
     def rollback(self, type_: MessageType, channel_level: int, message_level: int) -> bool:
         """Drop buffered messages in reversed order while possible, return if successful."""
@@ -330,19 +568,20 @@ class MessageBuffer:
                 self._logger.info('Level %s is not buffered, can\'t avoid rollback', level)
                 return False
 
-            for i, message in enumerate(self._messages[level]):
-                if message.type == type_:
-                    del self._messages[level][i]
+            messages = self._messages[level]
+            self._items -= sum(message.size for message in messages if message.type == type_)
+            self._messages[level] = [message for message in messages if message.type != type_]
 
         self._logger.info('All rolled back levels are buffered, no action required')
         return True
 
     def yield_from(self) -> Generator[BufferedMessage, None, None]:
         """Yield extensively buffered messages by level"""
-        buffered_levels = sorted(self._messages.keys())
-        yielded_levels = buffered_levels[: len(buffered_levels) - self._size]
-        for level in yielded_levels:
-            yield from self._messages.pop(level)
+        while len(self._levels) > self._size:
+            level = heapq.heappop(self._levels)
+            messages = self._messages.pop(level)
+            self._items -= sum(message.size for message in messages)
+            yield from messages
 
 
 class TzktDatasource(IndexDatasource):
@@ -361,6 +600,12 @@ class TzktDatasource(IndexDatasource):
         http_config: Optional[HTTPConfig] = None,
         merge_subscriptions: bool = False,
         buffer_size: int = 0,
+        prefetch_depth: int = 0,
+        sync_partitions: int = 1,
+        rollback_depth: int = 2,
+        adaptive_batch_size: bool = False,
+        min_batch_size: int = 100,
+        max_batch_size: int = 10000,
     ) -> None:
         super().__init__(
             url=url,
@@ -369,14 +614,94 @@ class TzktDatasource(IndexDatasource):
         )
         self._logger = logging.getLogger('dipdup.tzkt')
         self._buffer = MessageBuffer(buffer_size)
+        self._prefetch_depth = prefetch_depth
+        self._sync_partitions = sync_partitions
+        self._rollback_depth = rollback_depth
+        self._head_level: Optional[int] = None
+        self._batch_size = (
+            AdaptiveBatchSize(cast(int, self._http_config.batch_size), min_batch_size, max_batch_size) if adaptive_batch_size else None
+        )
 
         self._ws_client: Optional[SignalRClient] = None
+        self._realtime_queue: asyncio.Queue[Tuple[MessageType, List[Dict[str, Any]]]] = asyncio.Queue(maxsize=REALTIME_QUEUE_SIZE)
         self._level: DefaultDict[MessageType, Optional[int]] = defaultdict(lambda: None)
 
     @property
     def request_limit(self) -> int:
+        """Number of items to request in a single page; varies over time in adaptive mode"""
+        if self._batch_size:
+            return self._batch_size.size
         return cast(int, self._http_config.batch_size)
 
+    @property
+    def prefetch_depth(self) -> int:
+        return self._prefetch_depth
+
+    @property
+    def sync_partitions(self) -> int:
+        return self._sync_partitions
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        weight: int = 1,
+        **kwargs,
+    ) -> Any:
+        """Send HTTP request, serve finalized pages of level-bounded requests from disk cache if enabled.
+
+        TzKT sorts items by id, so a full page with items below `level.le` is the same for any greater `level.le` value.
+        Such pages are cached without this param once all their items are older than head minus rollback depth. `limit` param is not
+        a part of the key either: a cached page serves any request with the same or lower limit, so adaptive batch size doesn't
+        invalidate the cache. Disk IO is performed in executor.
+        """
+        cache = self._http.cache
+        params = kwargs.get('params') or {}
+        if cache is None or method != 'get' or 'level.le' not in params or 'limit' not in params:
+            return await self._request_page(method, url, weight, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        last_level, limit = params['level.le'], params['limit']
+        key = (self._http._url, url, tuple((k, str(v)) for k, v in params.items() if k not in ('level.le', 'limit')))
+        cached = await loop.run_in_executor(None, cache.get, key)
+        if cached is not None and len(cached) >= limit:
+            self._logger.debug('Using cached response of `%s`', url)
+            return [item for item in cached[:limit] if item['level'] <= last_level]
+
+        response = await self._request_page(method, url, weight, **kwargs)
+
+        finalized_level = (self._head_level or 0) - self._rollback_depth
+        if (
+            isinstance(response, list)
+            and len(response) == limit
+            and all(isinstance(item, dict) and 'level' in item for item in response)
+            and response[-1]['level'] <= min(last_level, finalized_level)
+        ):
+            await loop.run_in_executor(None, cache.set, key, response)
+
+        return response
+
+    async def _request_page(self, method: str, url: str, weight: int = 1, **kwargs) -> Any:
+        """Send HTTP request, feed duration and payload size of paginated ones to adaptive batch size"""
+        params = kwargs.get('params') or {}
+        if method != 'get' or 'limit' not in params or not (self._batch_size or Metrics.enabled):
+            return await super().request(method, url, weight, **kwargs)
+
+        payloads: List[int] = []
+        started_at = time.perf_counter()
+        response = await super().request(method, url, weight, payload_callback=payloads.append, **kwargs)
+        duration = time.perf_counter() - started_at
+
+        if Metrics.enabled:
+            Metrics.set_datasource_page_duration(self.name, duration)
+        # NOTE: Payload is unknown if response was shared with an identical in-flight request; it's not a measurement of our own
+        if self._batch_size and isinstance(response, list) and payloads:
+            self._batch_size.observe(params['limit'], len(response), duration, payloads[0])
+            if Metrics.enabled:
+                Metrics.set_datasource_batch_size(self.name, self._batch_size.size)
+
+        return response
+
     def set_logger(self, name: str) -> None:
         super().set_logger(name)
         self._buffer._logger = FormattedLogger(self._buffer._logger.name, name + ': {}')
@@ -396,6 +721,9 @@ class TzktDatasource(IndexDatasource):
     def _set_channel_level(self, message_type: MessageType, level: int) -> None:
         self._level[message_type] = level
 
+    def _set_head_level(self, level: int) -> None:
+        self._head_level = max(level, self._head_level or 0)
+
     async def get_similar_contracts(
         self,
         address: str,
@@ -458,6 +786,24 @@ class TzktDatasource(IndexDatasource):
             url=f'v1/contracts/{address}',
         )
 
+    async def get_contract_hashes(self, addresses: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+        """Get code and type hashes of contracts, split by chunks of `TZKT_ORIGINATIONS_REQUEST_LIMIT` addresses"""
+        hashes: Dict[str, Tuple[int, int]] = {}
+        for addresses_chunk in split_by_chunks(sorted(addresses), TZKT_ORIGINATIONS_REQUEST_LIMIT):
+            self._logger.info('Fetching code and type hashes of %s contracts', len(addresses_chunk))
+            response = await self.request(
+                'get',
+                url='v1/contracts',
+                params={
+                    'address.in': ','.join(addresses_chunk),
+                    'select': 'address,codeHash,typeHash',
+                    'limit': len(addresses_chunk),
+                },
+            )
+            for item in response:
+                hashes[item['address']] = (item['codeHash'], item['typeHash'])
+        return hashes
+
     async def get_contract_storage(self, address: str) -> Dict[str, Any]:
         """Get contract storage"""
         self._logger.info('Fetching contract storage for address `%s', address)
@@ -512,6 +858,56 @@ class TzktDatasource(IndexDatasource):
         ):
             yield batch
 
+    async def iter_big_map_keys(
+        self,
+        big_map_ids: Sequence[int],
+        level: Optional[int] = None,
+        active: bool = False,
+        concurrency: int = 1,
+    ) -> AsyncIterator[Tuple[int, Tuple[Dict[str, Any], ...]]]:
+        """Fetch keys of multiple bigmaps keeping up to `concurrency` page requests in flight.
+
+        Pages are requested round-robin over bigmaps and yielded in the same order. Requests made past the last page of a bigmap are
+        cancelled once it's known.
+        """
+        limit, finished = self.request_limit, set()
+
+        def iter_requests() -> Iterator[Tuple[int, int]]:
+            offset = 0
+            while unfinished := tuple(i for i in big_map_ids if i not in finished):
+                for big_map_id in unfinished:
+                    if big_map_id not in finished:
+                        yield big_map_id, offset
+                offset += limit
+
+        requests = iter_requests()
+        pending: Deque[Tuple[int, asyncio.Task[Tuple[Dict[str, Any], ...]]]] = deque()
+        try:
+            while True:
+                while len(pending) < max(concurrency, 1) and (request := next(requests, None)):
+                    big_map_id, offset = request
+                    task = create_task(self.get_big_map(big_map_id, level, active, offset, limit))
+                    pending.append((big_map_id, task))
+                if not pending:
+                    return
+
+                big_map_id, task = pending.popleft()
+                big_map_keys = await task
+                if big_map_keys:
+                    yield big_map_id, big_map_keys
+                if len(big_map_keys) < limit:
+                    finished.add(big_map_id)
+                    # NOTE: Wait for cancelled requests to finish to keep no more than `concurrency` of them in flight
+                    cancelled = tuple(pending_task for pending_id, pending_task in pending if pending_id == big_map_id)
+                    for pending_task in cancelled:
+                        pending_task.cancel()
+                    await asyncio.gather(*cancelled, return_exceptions=True)
+                    pending = deque(item for item in pending if item[0] != big_map_id)
+        finally:
+            for _, task in pending:
+                task.cancel()
+            await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+
     async def get_contract_big_maps(
         self,
         address: str,
@@ -543,7 +939,9 @@ class TzktDatasource(IndexDatasource):
             'get',
             url='v1/head',
         )
-        return self.convert_head_block(head_block_json)
+        head_block = self.convert_head_block(head_block_json)
+        self._set_head_level(head_block.level)
+        return head_block
 
     async def get_block(self, level: int) -> BlockData:
         """Get block by level"""
@@ -586,33 +984,63 @@ class TzktDatasource(IndexDatasource):
         ):
             yield batch
 
-    # FIXME: No pagination because of URL length limit workaround
     async def get_originations(
         self,
         addresses: Set[str],
         first_level: int,
         last_level: int,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
     ) -> Tuple[OperationData, ...]:
-        raw_originations = []
         # NOTE: TzKT may hit URL length limit with hundreds of originations in a single request.
         # NOTE: Chunk of 100 addresses seems like a reasonable choice - URL of ~3971 characters.
         # NOTE: Other operation requests won't hit that limit.
-        for addresses_chunk in split_by_chunks(list(addresses), TZKT_ORIGINATIONS_REQUEST_LIMIT):
-            raw_originations += await self.request(
-                'get',
-                url='v1/operations/originations',
-                params={
-                    "originatedContract.in": ','.join(addresses_chunk),
-                    "level.ge": first_level,
-                    "level.le": last_level,
-                    "select": ','.join(ORIGINATION_OPERATION_FIELDS),
-                    "status": "applied",
-                },
+        # NOTE: Larger address sets are split into chunks requested concurrently and merged into a single page.
+        offset, limit = offset or 0, limit or self.request_limit
+        if len(addresses) > TZKT_ORIGINATIONS_REQUEST_LIMIT:
+            # NOTE: Every chunk returns its first `limit` items after cursor;
+            # NOTE: the first `limit` of them by id are a valid page of all addresses.
+            chunks = await asyncio.gather(
+                *(
+                    self.get_originations(set(addresses_chunk), first_level, last_level, offset, limit)
+                    for addresses_chunk in split_by_chunks(sorted(addresses), TZKT_ORIGINATIONS_REQUEST_LIMIT)
+                )
             )
+            originations = sorted((op for chunk in chunks for op in chunk), key=lambda op: op.id)
+            return tuple(originations[:limit])
+
+        raw_originations = await self.request(
+            'get',
+            url='v1/operations/originations',
+            params={
+                "originatedContract.in": ','.join(addresses),
+                "offset.cr": offset,
+                "limit": limit,
+                "level.ge": first_level,
+                "level.le": last_level,
+                "select": ','.join(ORIGINATION_OPERATION_FIELDS),
+                "status": "applied",
+            },
+        )
 
         # NOTE: `type` field needs to be set manually when requesting operations by specific type
         return tuple(self.convert_operation(op, type_='origination') for op in raw_originations)
 
+    async def iter_originations(
+        self,
+        addresses: Set[str],
+        first_level: int,
+        last_level: int,
+    ) -> AsyncIterator[Tuple[OperationData, ...]]:
+        for addresses_chunk in split_by_chunks(sorted(addresses), TZKT_ORIGINATIONS_REQUEST_LIMIT):
+            async for batch in self._iter_batches(
+                self.get_originations,
+                set(addresses_chunk),
+                first_level,
+                last_level,
+            ):
+                yield batch
+
     async def get_transactions(
         self,
         field: str,
@@ -748,15 +1176,27 @@ class TzktDatasource(IndexDatasource):
         last_level: int,
         offset: Optional[int] = None,
         limit: Optional[int] = None,
+        token_addresses: Optional[Set[str]] = None,
+        token_ids: Optional[Set[int]] = None,
+        from_addresses: Optional[Set[str]] = None,
+        to_addresses: Optional[Set[str]] = None,
     ) -> Tuple[TokenTransferData, ...]:
-        """Get token transfers for contract"""
+        """Get token transfers, optionally filtered by token contract, token ID, sender and recipient"""
         offset, limit = offset or 0, limit or self.request_limit
         params: dict = {}
+        if token_addresses:
+            params['token.contract.in'] = ','.join(token_addresses)
+        if token_ids:
+            params['token.tokenId.in'] = ','.join(str(token_id) for token_id in token_ids)
+        if from_addresses:
+            params['from.in'] = ','.join(from_addresses)
+        if to_addresses:
+            params['to.in'] = ','.join(to_addresses)
 
         raw_token_transfers = await self.request(
             'get',
             url='v1/tokens/transfers',
-            params={**params, 'level.ge': first_level, 'level.lt': last_level, 'offset': offset, 'limit': limit, 'sort.asc': 'level'},
+            params={**params, 'level.ge': first_level, 'level.le': last_level, 'offset': offset, 'limit': limit, 'sort.asc': 'level'},
         )
         return tuple(self.convert_token_transfer(item) for item in raw_token_transfers)
 
@@ -764,13 +1204,21 @@ class TzktDatasource(IndexDatasource):
         self,
         first_level: int,
         last_level: int,
+        token_addresses: Optional[Set[str]] = None,
+        token_ids: Optional[Set[int]] = None,
+        from_addresses: Optional[Set[str]] = None,
+        to_addresses: Optional[Set[str]] = None,
     ) -> AsyncIterator[Tuple[TokenTransferData, ...]]:
-        """Iterate token transfers for contract"""
+        """Iterate over token transfers, optionally filtered by token contract, token ID, sender and recipient"""
         async for batch in self._iter_batches(
             self.get_token_transfers,
             first_level,
             last_level,
             cursor=False,
+            token_addresses=token_addresses,
+            token_ids=token_ids,
+            from_addresses=from_addresses,
+            to_addresses=to_addresses,
         ):
             yield batch
 
@@ -818,6 +1266,12 @@ class TzktDatasource(IndexDatasource):
         elif isinstance(subscription, TokenTransferSubscription):
             method = 'SubscribeToTokenTransfers'
             request = [{}]
+            if subscription.contract:
+                request[0]['contract'] = subscription.contract
+            if subscription.token_id is not None:
+                request[0]['tokenId'] = str(subscription.token_id)
+            if subscription.account:
+                request[0]['account'] = subscription.account
 
         else:
             raise NotImplementedError
@@ -838,9 +1292,12 @@ class TzktDatasource(IndexDatasource):
         if set(kwargs).intersection(('offset', 'offset.cr', 'limit')):
             raise ValueError('`offset` and `limit` arguments are not allowed')
 
-        size, offset = self.request_limit, 0
-        while size == self.request_limit:
-            result = await fn(*args, offset=offset, **kwargs)
+        # NOTE: Request limit may change between pages in adaptive mode
+        size = limit = self.request_limit
+        offset = 0
+        while size == limit:
+            limit = self.request_limit
+            result = await fn(*args, offset=offset, limit=limit, **kwargs)
             if not result:
                 return
 
@@ -854,7 +1311,7 @@ class TzktDatasource(IndexDatasource):
                 except TypeError:
                     offset = result[-1].id
             else:
-                offset += self.request_limit
+                offset += limit
 
     def _get_ws_client(self) -> SignalRClient:
         """Create SignalR client, register message callbacks"""
@@ -871,10 +1328,10 @@ class TzktDatasource(IndexDatasource):
         self._ws_client.on_close(self._on_disconnected)
         self._ws_client.on_error(self._on_error)
 
-        self._ws_client.on('operations', partial(self._on_message, MessageType.operation))
-        self._ws_client.on('transfers', partial(self._on_message, MessageType.token_transfer))
-        self._ws_client.on('bigmaps', partial(self._on_message, MessageType.big_map))
-        self._ws_client.on('head', partial(self._on_message, MessageType.head))
+        self._ws_client.on('operations', partial(self._receive_message, MessageType.operation))
+        self._ws_client.on('transfers', partial(self._receive_message, MessageType.token_transfer))
+        self._ws_client.on('bigmaps', partial(self._receive_message, MessageType.big_map))
+        self._ws_client.on('head', partial(self._receive_message, MessageType.head))
 
         return self._ws_client
 
@@ -889,11 +1346,18 @@ class TzktDatasource(IndexDatasource):
                     await ws.run()
                 except WebsocketConnectionError as e:
                     self._logger.error('Websocket connection error: %s', e)
+                    self._drain_realtime_queue()
                     await self.emit_disconnected()
                     await asyncio.sleep(retry_sleep)
                     retry_sleep *= self._http_config.retry_multiplier
 
-        await create_task(_wrapper())
+        # NOTE: Messages are processed in a separate task to keep reading from socket while callbacks are running
+        tasks = (create_task(_wrapper()), create_task(self._process_realtime_queue()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
 
     async def _on_connected(self) -> None:
         self._logger.info('Realtime connection established')
@@ -903,12 +1367,45 @@ class TzktDatasource(IndexDatasource):
     async def _on_disconnected(self) -> None:
         self._logger.info('Realtime connection lost, resetting subscriptions')
         self._subscriptions.reset()
+        self._drain_realtime_queue()
         await self.emit_disconnected()
 
     async def _on_error(self, message: CompletionMessage) -> NoReturn:
         """Raise exception from WS server's error message"""
         raise DatasourceError(datasource=self.name, msg=cast(str, message.error))
 
+    async def _receive_message(self, type_: MessageType, message: List[Dict[str, Any]]) -> None:
+        """Put message received from Websocket to the realtime queue, wait for a free slot if it's full"""
+        if self._realtime_queue.full():
+            self._logger.warning('Realtime queue is full, waiting for messages to be processed')
+            started_at = time.perf_counter()
+            await self._realtime_queue.put((type_, message))
+            if Metrics.enabled:
+                Metrics.set_datasource_realtime_blocked(self.name, time.perf_counter() - started_at)
+        else:
+            self._realtime_queue.put_nowait((type_, message))
+
+        if Metrics.enabled:
+            Metrics.set_datasource_realtime_queue_size(self.name, self._realtime_queue.qsize())
+
+    def _drain_realtime_queue(self) -> None:
+        """Drop messages received before connection was lost; indexes will fetch these levels again after resubscribing"""
+        if dropped := self._realtime_queue.qsize():
+            self._logger.info('Dropping %s unprocessed realtime messages', dropped)
+        while not self._realtime_queue.empty():
+            self._realtime_queue.get_nowait()
+
+        if Metrics.enabled:
+            Metrics.set_datasource_realtime_queue_size(self.name, 0)
+
+    async def _process_realtime_queue(self) -> None:
+        """Process messages put to the realtime queue by `_receive_message` in order"""
+        while True:
+            type_, message = await self._realtime_queue.get()
+            if Metrics.enabled:
+                Metrics.set_datasource_realtime_queue_size(self.name, self._realtime_queue.qsize())
+            await self._on_message(type_, message)
+
     async def _on_message(self, type_: MessageType, message: List[Dict[str, Any]]) -> None:
         """Parse message received from Websocket, ensure it's correct in the current context and yield data."""
         # NOTE: Parse messages and either buffer or yield data
@@ -955,6 +1452,9 @@ class TzktDatasource(IndexDatasource):
             else:
                 raise NotImplementedError(f'Unknown message type: {buffered_message.type}')
 
+        if Metrics.enabled:
+            Metrics.set_datasource_buffer(self.name, len(self._buffer), self._buffer.item_count)
+
     async def _process_operations_data(self, data: List[Dict[str, Any]]) -> None:
         """Parse and emit raw operations from WS"""
         level_operations: DefaultDict[int, Deque[OperationData]] = defaultdict(deque)
@@ -994,6 +1494,7 @@ class TzktDatasource(IndexDatasource):
     async def _process_head_data(self, data: Dict[str, Any]) -> None:
         """Parse and emit raw head block from WS"""
         block = self.convert_head_block(data)
+        self._set_head_level(block.level)
         await self.emit_head(block)
 
     @classmethod
@@ -1016,7 +1517,8 @@ class TzktDatasource(IndexDatasource):
                 if parameter is None:
                     parameter = {}
 
-        return OperationData(
+        return construct(
+            OperationData,
             type=type_ or operation_json['type'],
             id=operation_json['id'],
             level=operation_json['level'],
@@ -1039,9 +1541,9 @@ class TzktDatasource(IndexDatasource):
             originated_contract_address=originated_contract_json.get('address'),
             originated_contract_type_hash=originated_contract_json.get('typeHash'),
             originated_contract_code_hash=originated_contract_json.get('codeHash'),
-            originated_contract_tzips=originated_contract_json.get('tzips'),
+            originated_contract_tzips=tuple(tzips) if (tzips := originated_contract_json.get('tzips')) is not None else None,
             storage=operation_json.get('storage'),
-            diffs=operation_json.get('diffs') or (),
+            diffs=tuple(operation_json.get('diffs') or ()),
             delegate_address=delegate_json.get('address'),
             delegate_alias=delegate_json.get('alias'),
         )
@@ -1049,7 +1551,8 @@ class TzktDatasource(IndexDatasource):
     @classmethod
     def convert_migration_origination(cls, migration_origination_json: Dict[str, Any]) -> OperationData:
         """Convert raw migration message from REST into dataclass"""
-        return OperationData(
+        return construct(
+            OperationData,
             type='origination',
             id=migration_origination_json['id'],
             level=migration_origination_json['level'],
@@ -1059,7 +1562,7 @@ class TzktDatasource(IndexDatasource):
             originated_contract_alias=migration_origination_json['account'].get('alias'),
             amount=migration_origination_json['balanceChange'],
             storage=migration_origination_json.get('storage'),
-            diffs=migration_origination_json.get('diffs') or (),
+            diffs=tuple(migration_origination_json.get('diffs') or ()),
             status='applied',
             has_internals=False,
             hash='[none]',
@@ -1074,7 +1577,8 @@ class TzktDatasource(IndexDatasource):
         """Convert raw big map diff message from WS/REST into dataclass"""
         action = BigMapAction(big_map_json['action'])
         active = action not in (BigMapAction.REMOVE, BigMapAction.REMOVE_KEY)
-        return BigMapData(
+        return construct(
+            BigMapData,
             id=big_map_json['id'],
             level=big_map_json['level'],
             # FIXME: missing `operation_id` field in API to identify operation
@@ -1092,7 +1596,8 @@ class TzktDatasource(IndexDatasource):
     @classmethod
     def convert_block(cls, block_json: Dict[str, Any]) -> BlockData:
         """Convert raw block message from REST into dataclass"""
-        return BlockData(
+        return construct(
+            BlockData,
             level=block_json['level'],
             hash=block_json['hash'],
             timestamp=cls._parse_timestamp(block_json['timestamp']),
@@ -1110,7 +1615,8 @@ class TzktDatasource(IndexDatasource):
     @classmethod
     def convert_head_block(cls, head_block_json: Dict[str, Any]) -> HeadBlockData:
         """Convert raw head block message from WS/REST into dataclass"""
-        return HeadBlockData(
+        return construct(
+            HeadBlockData,
             chain=head_block_json['chain'],
             chain_id=head_block_json['chainId'],
             cycle=head_block_json['cycle'],
@@ -1122,7 +1628,7 @@ class TzktDatasource(IndexDatasource):
             voting_epoch=head_block_json['votingEpoch'],
             voting_period=head_block_json['votingPeriod'],
             known_level=head_block_json['knownLevel'],
-            last_sync=head_block_json['lastSync'],
+            last_sync=cls._parse_timestamp(head_block_json['lastSync']),
             synced=head_block_json['synced'],
             quote_level=head_block_json['quoteLevel'],
             quote_btc=Decimal(head_block_json['quoteBtc']),
@@ -1138,7 +1644,8 @@ class TzktDatasource(IndexDatasource):
     @classmethod
     def convert_quote(cls, quote_json: Dict[str, Any]) -> QuoteData:
         """Convert raw quote message from REST into dataclass"""
-        return QuoteData(
+        return construct(
+            QuoteData,
             level=quote_json['level'],
             timestamp=cls._parse_timestamp(quote_json['timestamp']),
             btc=Decimal(quote_json['btc']),
@@ -1159,21 +1666,22 @@ class TzktDatasource(IndexDatasource):
         to_json = token_transfer_json.get('to') or {}
         standard = token_json.get('standard')
         metadata = token_json.get('metadata')
-        return TokenTransferData(
+        return construct(
+            TokenTransferData,
             id=token_transfer_json['id'],
             level=token_transfer_json['level'],
             timestamp=cls._parse_timestamp(token_transfer_json['timestamp']),
             tzkt_token_id=token_json['id'],
             contract_address=contract_json.get('address'),
             contract_alias=contract_json.get('alias'),
-            token_id=token_json.get('tokenId'),
+            token_id=int(token_id) if (token_id := token_json.get('tokenId')) is not None else None,
             standard=TokenStandard(standard) if standard else None,
             metadata=metadata if isinstance(metadata, dict) else {},
             from_alias=from_json.get('alias'),
             from_address=from_json.get('address'),
             to_alias=to_json.get('alias'),
             to_address=to_json.get('address'),
-            amount=token_transfer_json.get('amount'),
+            amount=int(amount) if (amount := token_transfer_json.get('amount')) is not None else None,
             tzkt_transaction_id=token_transfer_json.get('transactionId'),
             tzkt_origination_id=token_transfer_json.get('originationId'),
             tzkt_migration_id=token_transfer_json.get('migrationId'),
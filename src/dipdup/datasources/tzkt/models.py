@@ -3,6 +3,7 @@ from contextlib import suppress
 from functools import lru_cache
 from itertools import groupby
 from typing import Any
+from typing import Callable
 from typing import Dict
 from typing import Hashable
 from typing import Iterable
@@ -27,6 +28,8 @@ from dipdup.models import StorageType
 IntrospectionError = (KeyError, IndexError, AttributeError)
 
 T = TypeVar('T', Hashable, Type[BaseModel])
+BigMapDiffsT = Dict[int, Iterable[Dict[str, Any]]]
+StoragePlanT = Callable[[Any, BigMapDiffsT], Any]
 
 
 def extract_root_outer_type(storage_type: Type[BaseModel]) -> T:
@@ -109,7 +112,7 @@ def unwrap_union_type(union_type: Type) -> Tuple[bool, Tuple[Type, ...]]:
     return False, ()
 
 
-def _preprocess_bigmap_diffs(diffs: Iterable[Dict[str, Any]]) -> Dict[int, Iterable[Dict[str, Any]]]:
+def _preprocess_bigmap_diffs(diffs: Iterable[Dict[str, Any]]) -> BigMapDiffsT:
     """Filter out bigmap diffs and group them by bigmap id"""
     return {
         k: tuple(v)
@@ -122,7 +125,7 @@ def _preprocess_bigmap_diffs(diffs: Iterable[Dict[str, Any]]) -> Dict[int, Itera
 
 def _apply_bigmap_diffs(
     bigmap_id: int,
-    bigmap_diffs: Dict[int, Iterable[Dict[str, Any]]],
+    bigmap_diffs: BigMapDiffsT,
     is_array: bool,
 ) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
     """Apply bigmap diffs to the storage"""
@@ -142,55 +145,163 @@ def _apply_bigmap_diffs(
         return dict_storage
 
 
-def _process_storage(storage: Any, storage_type: T, bigmap_diffs: Dict[int, Iterable[Dict[str, Any]]]) -> Any:
-    """Replace bigmap pointers with actual data from diffs"""
-    # Check if Union or Optional (== Union[Any, NoneType])
-    is_union, arg_types = unwrap_union_type(storage_type)
-    if is_union:
-        # NOTE: We have no way but trying every possible branch until first success
-        for arg_type in arg_types:
-            with suppress(*IntrospectionError):
-                return _process_storage(storage, arg_type, bigmap_diffs)
-
-    # NOTE: Bigmap pointer, apply diffs
-    if isinstance(storage, int) and type(storage) != storage_type:
-        is_array = is_array_type(storage_type)
-        storage = _apply_bigmap_diffs(storage, bigmap_diffs, is_array)
-
-    # NOTE: List, process recursively
-    elif isinstance(storage, list):
-        elt_type = get_list_elt_type(storage_type)
-        for i, _ in enumerate(storage):
-            storage[i] = _process_storage(storage[i], elt_type, bigmap_diffs)
-
-    # NOTE: Dict, process recursively
-    elif isinstance(storage, dict):
+def _unwrap_root_type(storage_type: Type) -> Type:
+    """Replace Pydantic models with __root__ field with the type of this field"""
+    with suppress(*IntrospectionError):
+        return _unwrap_root_type(extract_root_outer_type(storage_type))
+    return storage_type
+
+
+def _get_field_types(storage_type: Type) -> Dict[str, Type]:
+    """Map Pydantic model field names and aliases to their types; empty for other types"""
+    fields = getattr(storage_type, '__fields__', None)
+    if not isinstance(fields, dict):
+        return {}
+
+    field_types: Dict[str, Type] = {}
+    for field in fields.values():
+        # NOTE: `field.type_` of Optional field is the innermost type, e.g. `bool` for `Optional[Dict[str, bool]]`
+        field_type = typing.Optional[field.outer_type_] if field.allow_none else field.outer_type_
+        field_types[field.name] = field_types[field.alias] = field_type
+    return field_types
+
+
+@lru_cache(None)
+def _has_big_maps(storage_type: Type) -> bool:
+    """Check if big map pointers can appear anywhere in the storage of this type"""
+    storage_type = _unwrap_root_type(storage_type)
+    origin = get_origin(storage_type)
+    if origin in (list, dict):
+        return True
+    if origin == Union:
+        return any(_has_big_maps(arg_type) for arg_type in get_args(storage_type))
+    return any(_has_big_maps(cast(Hashable, field_type)) for field_type in _get_field_types(storage_type).values())
+
+
+@lru_cache(None)
+def _compile_storage_plan(storage_type: Type, strict: bool = False) -> Optional[StoragePlanT]:
+    """Compile a function replacing bigmap pointers in the storage of this type with actual data from diffs.
+
+    Returns `None` when there's nothing to replace. Strict plans are used to pick a Union branch: they raise `KeyError` when
+    data doesn't fit the type instead of leaving it as is for Pydantic to report.
+    """
+    # NOTE: Types are hashable, typeshed just doesn't know it
+    if not strict and not _has_big_maps(cast(Hashable, storage_type)):
+        return None
+
+    storage_type = _unwrap_root_type(storage_type)
+    origin = get_origin(storage_type)
+
+    def _mismatch(storage: Any) -> Any:
+        if strict:
+            raise KeyError(f'{type(storage).__name__} does not match {storage_type}')
+        return storage
+
+    # NOTE: Union or Optional (== Union[Any, NoneType])
+    if origin == Union:
+        arg_plans = tuple(_compile_storage_plan(arg_type, True) for arg_type in get_args(storage_type))
+        # NOTE: Skip branches that can't match data of this kind without calling them
+        dict_plans = tuple(p for t, p in zip(get_args(storage_type), arg_plans) if get_origin(_unwrap_root_type(t)) != list)
+        list_plans = tuple(p for t, p in zip(get_args(storage_type), arg_plans) if get_origin(_unwrap_root_type(t)) == list)
+
+        def _process_union(storage: Any, bigmap_diffs: BigMapDiffsT) -> Any:
+            if isinstance(storage, dict):
+                plans = dict_plans
+            elif isinstance(storage, list):
+                plans = list_plans
+            # NOTE: Scalars and bigmap pointers always fit the first branch
+            else:
+                return cast(StoragePlanT, arg_plans[0])(storage, bigmap_diffs)
+
+            for plan in plans:
+                with suppress(KeyError):
+                    return cast(StoragePlanT, plan)(storage, bigmap_diffs)
+            return _mismatch(storage)
+
+        return _process_union
+
+    # NOTE: List, bigmap pointer or array of key-value objects
+    if origin == list:
+        elt_plan = _compile_storage_plan(get_args(storage_type)[0], strict)
+
+        def _process_list(storage: Any, bigmap_diffs: BigMapDiffsT) -> Any:
+            if isinstance(storage, list):
+                if elt_plan is not None:
+                    for i, value in enumerate(storage):
+                        storage[i] = elt_plan(value, bigmap_diffs)
+                return storage
+            if isinstance(storage, dict):
+                return _mismatch(storage)
+            if isinstance(storage, int):
+                return _apply_bigmap_diffs(storage, bigmap_diffs, True)
+            return storage
+
+        return _process_list
+
+    # NOTE: Dict, bigmap pointer or object
+    if origin == dict:
+        value_plan = _compile_storage_plan(get_args(storage_type)[1], strict)
+
+        def _process_dict(storage: Any, bigmap_diffs: BigMapDiffsT) -> Any:
+            if isinstance(storage, dict):
+                if value_plan is not None:
+                    for key, value in storage.items():
+                        storage[key] = value_plan(value, bigmap_diffs)
+                return storage
+            if isinstance(storage, list):
+                return _mismatch(storage)
+            if isinstance(storage, int):
+                return _apply_bigmap_diffs(storage, bigmap_diffs, False)
+            return storage
+
+        return _process_dict
+
+    field_types = _get_field_types(storage_type)
+
+    # NOTE: Pydantic model, process fields containing bigmaps only unless we need to check every key
+    if field_types:
+        field_plans = {key: _compile_storage_plan(cast(Hashable, field_type), strict) for key, field_type in field_types.items()}
+        bigmap_field_plans = tuple((key, plan) for key, plan in field_plans.items() if plan is not None)
         # NOTE: Ignore missing fields along with extra ones
         ignore = getattr(getattr(storage_type, 'Config', None), 'extra', None) == Extra.ignore
 
-        for key, value in storage.items():
-            try:
-                value_type = get_dict_value_type(storage_type, key)
-                storage[key] = _process_storage(value, value_type, bigmap_diffs)
-            except IntrospectionError:
-                if not ignore:
-                    raise
+        def _process_model(storage: Any, bigmap_diffs: BigMapDiffsT) -> Any:
+            if isinstance(storage, list):
+                return _mismatch(storage)
+            if not isinstance(storage, dict):
+                return storage
 
-    else:
-        pass
+            if not strict:
+                for key, plan in bigmap_field_plans:
+                    if key in storage:
+                        storage[key] = plan(storage[key], bigmap_diffs)
+                return storage
 
-    return storage
+            for key, value in storage.items():
+                try:
+                    storage[key] = cast(StoragePlanT, field_plans[key])(value, bigmap_diffs)
+                except KeyError:
+                    if not ignore:
+                        raise
+            return storage
+
+        return _process_model
+
+    # NOTE: Scalar, only containers can hold bigmaps
+    def _process_scalar(storage: Any, bigmap_diffs: BigMapDiffsT) -> Any:
+        if isinstance(storage, (list, dict)):
+            return _mismatch(storage)
+        return storage
+
+    return _process_scalar
 
 
 def deserialize_storage(operation_data: OperationData, storage_type: Type[StorageType]) -> StorageType:
     """Merge big map diffs and deserialize raw storage into typeclass"""
-    bigmap_diffs = _preprocess_bigmap_diffs(operation_data.diffs)
-
-    operation_data.storage = _process_storage(
-        storage=operation_data.storage,
-        storage_type=storage_type,
-        bigmap_diffs=bigmap_diffs,
-    )
+    plan = _compile_storage_plan(storage_type)
+    if plan is not None:
+        bigmap_diffs = _preprocess_bigmap_diffs(operation_data.diffs) if operation_data.diffs else {}
+        operation_data.storage = plan(operation_data.storage, bigmap_diffs)
 
     try:
         return storage_type.parse_obj(operation_data.storage)
@@ -5,15 +5,21 @@ from asyncio import Event
 from asyncio import Task
 from asyncio import create_task
 from asyncio import gather
+from collections import defaultdict
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import AsyncExitStack
 from contextlib import suppress
+from multiprocessing import get_context
 from typing import Awaitable
+from typing import DefaultDict
 from typing import Deque
 from typing import Dict
+from typing import List
 from typing import Optional
 from typing import Set
 from typing import Tuple
+from typing import cast
 
 from prometheus_client import start_http_server  # type: ignore
 from tortoise.exceptions import OperationalError
@@ -23,13 +29,14 @@ from dipdup.config import ContractConfig
 from dipdup.config import DatasourceConfigT
 from dipdup.config import DipDupConfig
 from dipdup.config import IndexTemplateConfig
-from dipdup.config import OperationIndexConfig
+from dipdup.config import OperationHandlerOriginationPatternConfig
 from dipdup.config import PostgresDatabaseConfig
 from dipdup.config import default_hooks
 from dipdup.context import CallbackManager
 from dipdup.context import DipDupContext
 from dipdup.context import MetadataCursor
 from dipdup.context import pending_indexes
+from dipdup.context import pending_indexes_events
 from dipdup.datasources.datasource import Datasource
 from dipdup.datasources.datasource import IndexDatasource
 from dipdup.datasources.factory import DatasourceFactory
@@ -40,9 +47,11 @@ from dipdup.exceptions import ConfigInitializationException
 from dipdup.exceptions import DipDupException
 from dipdup.hasura import HasuraGateway
 from dipdup.index import BigMapIndex
+from dipdup.index import ContractHashCache
 from dipdup.index import HeadIndex
 from dipdup.index import Index
 from dipdup.index import OperationIndex
+from dipdup.index import OperationSyncStream
 from dipdup.index import TokenTransferIndex
 from dipdup.index import extract_operation_subgroups
 from dipdup.models import BigMapData
@@ -62,6 +71,9 @@ from dipdup.utils.database import get_connection
 from dipdup.utils.database import get_schema_hash
 from dipdup.utils.database import tortoise_wrapper
 
+# NOTE: Upper bound of IndexDispatcher idle wait; new realtime messages and spawned indexes wake it up immediately
+DISPATCHER_IDLE_TIMEOUT = 1.0
+
 
 class IndexDispatcher:
     def __init__(self, ctx: DipDupContext) -> None:
@@ -69,9 +81,16 @@ class IndexDispatcher:
 
         self._logger = logging.getLogger('dipdup')
         self._indexes: Dict[str, Index] = {}
+        self._wakeup = Event()
+        pending_indexes_events.add(self._wakeup)
 
-        self._entrypoint_filter: Set[Optional[str]] = set()
-        self._address_filter: Set[str] = set()
+        # NOTE: Routing tables to push realtime messages only to indexes which can match them; first item of key is datasource name
+        self._transaction_routes: DefaultDict[Tuple[str, str, Optional[str]], List[OperationIndex]] = defaultdict(list)
+        self._origination_routes: DefaultDict[str, List[OperationIndex]] = defaultdict(list)
+        self._big_map_routes: DefaultDict[Tuple[str, str, str], List[BigMapIndex]] = defaultdict(list)
+        self._token_transfer_routes: DefaultDict[Tuple[str, Optional[str]], List[TokenTransferIndex]] = defaultdict(list)
+        # NOTE: Every index receiving messages of this type; their level is bumped even if nothing was routed to them
+        self._level_routes: DefaultDict[Tuple[str, MessageType], List[Index]] = defaultdict(list)
 
     async def run(
         self,
@@ -86,10 +105,12 @@ class IndexDispatcher:
         on_synchronized_fired = False
 
         for index in self._indexes.values():
-            if isinstance(index, OperationIndex):
-                self._apply_filters(index._config)
+            self._add_routes(index)
 
         while True:
+            # NOTE: Messages received while indexes are processed will trigger the next iteration
+            self._wakeup.clear()
+
             if not spawn_datasources_event.is_set():
                 if (self._every_index_is(IndexStatus.REALTIME) or early_realtime) and not self._ctx.config.oneshot:
                     spawn_datasources_event.set()
@@ -99,6 +120,7 @@ class IndexDispatcher:
                 for datasource in index_datasources:
                     await datasource.subscribe()
 
+            await self._attach_sync_streams()
             tasks: Deque[Awaitable] = deque(index.process() for index in self._indexes.values())
             indexes_processed = await gather(*tasks)
 
@@ -107,9 +129,7 @@ class IndexDispatcher:
                 index = pending_indexes.popleft()
                 self._indexes[index._config.name] = index
                 indexes_spawned = True
-
-                if isinstance(index, OperationIndex):
-                    self._apply_filters(index._config)
+                self._add_routes(index)
 
             if not indexes_spawned and self._every_index_is(IndexStatus.ONESHOT):
                 break
@@ -125,10 +145,12 @@ class IndexDispatcher:
                 # NOTE: Fire `on_synchronized` hook when indexes will reach realtime state again
                 on_synchronized_fired = False
 
-            if not any(indexes_processed):
-                await self._ctx._transactions.cleanup()
+            if any(indexes_processed) or indexes_spawned or pending_indexes:
+                continue
 
-            await asyncio.sleep(1)
+            await self._ctx._transactions.cleanup()
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), DISPATCHER_IDLE_TIMEOUT)
 
     async def _update_metrics(self, update_interval: float) -> None:
         while True:
@@ -144,9 +166,46 @@ class IndexDispatcher:
 
             Metrics.set_indexes_count(active, synced, realtime)
 
-    def _apply_filters(self, index_config: OperationIndexConfig) -> None:
-        self._address_filter.update(index_config.address_filter)
-        self._entrypoint_filter.update(index_config.entrypoint_filter)
+    async def _attach_sync_streams(self) -> None:
+        """Let operation indexes behind the same datasource level fetch operations together, e.g. ones spawned from a single template"""
+        groups: DefaultDict[Tuple[str, int], List[OperationIndex]] = defaultdict(list)
+        for index in self._indexes.values():
+            if isinstance(index, OperationIndex) and not index._config.last_level:
+                groups[index.datasource.name, index.get_sync_level()].append(index)
+
+        for (_, sync_level), indexes in groups.items():
+            if len(indexes) > 1:
+                await OperationSyncStream.attach(indexes, sync_level)
+
+    def _add_routes(self, index: Index) -> None:
+        """Register index in routing tables of realtime messages"""
+        datasource_name = index.datasource.name
+
+        if isinstance(index, OperationIndex):
+            index_config = index._config
+            for address in index_config.address_filter:
+                for entrypoint in index_config.entrypoint_filter:
+                    self._transaction_routes[datasource_name, address, entrypoint].append(index)
+            if any(isinstance(p, OperationHandlerOriginationPatternConfig) for h in index_config.handlers for p in h.pattern):
+                self._origination_routes[datasource_name].append(index)
+            self._level_routes[datasource_name, MessageType.operation].append(index)
+
+        elif isinstance(index, BigMapIndex):
+            for address, path in {(h.contract_config.address, h.path) for h in index._config.handlers}:
+                self._big_map_routes[datasource_name, address, path].append(index)
+            self._level_routes[datasource_name, MessageType.big_map].append(index)
+
+        elif isinstance(index, TokenTransferIndex):
+            # NOTE: Index without contract filter in any of handlers receives every token transfer
+            token_addresses: Set[Optional[str]] = set(index._get_token_addresses()) or {None}
+            for token_address in token_addresses:
+                self._token_transfer_routes[datasource_name, token_address].append(index)
+            self._level_routes[datasource_name, MessageType.token_transfer].append(index)
+
+    def _push_level(self, datasource: IndexDatasource, type_: MessageType, level: int) -> None:
+        """Let indexes know that realtime message of this level has been routed, so ones without matched data can bump their level"""
+        for index in self._level_routes.get((datasource.name, type_), ()):
+            index.push_level(level)
 
     def _every_index_is(self, status: IndexStatus) -> bool:
         if not self._indexes:
@@ -236,32 +295,65 @@ class IndexDispatcher:
         for index in self._indexes.values():
             if isinstance(index, HeadIndex) and index.datasource == datasource:
                 index.push_head(head)
+        # NOTE: New head may also mean new sync level after reconnection
+        self._wakeup.set()
 
     async def _on_operations(self, datasource: IndexDatasource, operations: Tuple[OperationData, ...]) -> None:
-        operation_subgroups = tuple(
-            extract_operation_subgroups(
-                operations,
-                entrypoints=self._entrypoint_filter,
-                addresses=self._address_filter,
-            )
-        )
+        routed_operations: Dict[OperationIndex, Deque[OperationData]] = {}
+        for operation in operations:
+            indexes: Set[OperationIndex]
+            if operation.type == 'transaction':
+                indexes = {
+                    *self._transaction_routes.get((datasource.name, cast(str, operation.sender_address), operation.entrypoint), ()),
+                    *self._transaction_routes.get((datasource.name, cast(str, operation.target_address), operation.entrypoint), ()),
+                }
+            else:
+                indexes = set(self._origination_routes.get(datasource.name, ()))
 
-        if not operation_subgroups:
-            return
+            for index in indexes:
+                routed_operations.setdefault(index, deque()).append(operation)
 
-        operation_indexes = (i for i in self._indexes.values() if isinstance(i, OperationIndex) and i.datasource == datasource)
-        for index in operation_indexes:
-            index.push_operations(operation_subgroups)
+        for index, index_operations in routed_operations.items():
+            operation_subgroups = tuple(
+                extract_operation_subgroups(
+                    index_operations,
+                    entrypoints=index._config.entrypoint_filter,
+                    addresses=index._config.address_filter,
+                )
+            )
+            if operation_subgroups:
+                index.push_operations(operation_subgroups)
+                self._wakeup.set()
+
+        if operations:
+            self._push_level(datasource, MessageType.operation, operations[0].level)
 
     async def _on_token_transfers(self, datasource: IndexDatasource, token_transfers: Tuple[TokenTransferData, ...]) -> None:
-        token_transfer_indexes = (i for i in self._indexes.values() if isinstance(i, TokenTransferIndex) and i.datasource == datasource)
-        for index in token_transfer_indexes:
-            index.push_token_transfers(token_transfers)
+        routed_token_transfers: Dict[TokenTransferIndex, Deque[TokenTransferData]] = {}
+        any_contract_indexes = self._token_transfer_routes.get((datasource.name, None), ())
+        for token_transfer in token_transfers:
+            for index in (*self._token_transfer_routes.get((datasource.name, token_transfer.contract_address), ()), *any_contract_indexes):
+                routed_token_transfers.setdefault(index, deque()).append(token_transfer)
+
+        for index, index_token_transfers in routed_token_transfers.items():
+            index.push_token_transfers(tuple(index_token_transfers))
+            self._wakeup.set()
+
+        if token_transfers:
+            self._push_level(datasource, MessageType.token_transfer, token_transfers[0].level)
 
     async def _on_big_maps(self, datasource: IndexDatasource, big_maps: Tuple[BigMapData, ...]) -> None:
-        big_map_indexes = (i for i in self._indexes.values() if isinstance(i, BigMapIndex) and i.datasource == datasource)
-        for index in big_map_indexes:
-            index.push_big_maps(big_maps)
+        routed_big_maps: Dict[BigMapIndex, Deque[BigMapData]] = {}
+        for big_map in big_maps:
+            for index in self._big_map_routes.get((datasource.name, big_map.contract_address, big_map.path), ()):
+                routed_big_maps.setdefault(index, deque()).append(big_map)
+
+        for index, index_big_maps in routed_big_maps.items():
+            index.push_big_maps(tuple(index_big_maps))
+            self._wakeup.set()
+
+        if big_maps:
+            self._push_level(datasource, MessageType.big_map, big_maps[0].level)
 
     async def _on_rollback(self, datasource: IndexDatasource, type_: MessageType, from_level: int, to_level: int) -> None:
         """Call `on_index_rollback` hook for each index that is affected by rollback"""
@@ -361,12 +453,14 @@ class DipDup:
             stack.enter_context(suppress(KeyboardInterrupt, CancelledError))
             await self._set_up_database(stack)
             await self._set_up_transactions(stack)
+            await self._set_up_parse_pool(stack)
             await self._set_up_datasources(stack)
             await self._set_up_hooks(tasks, run=not self._config.oneshot)
             await self._set_up_prometheus()
 
             await self._initialize_schema()
             await self._initialize_datasources()
+            await ContractHashCache.initialize()
             await self._set_up_hasura(stack)
 
             if advanced_config.metadata_interface:
@@ -454,6 +548,11 @@ class DipDup:
     async def _set_up_transactions(self, stack: AsyncExitStack) -> None:
         stack.enter_context(self._transactions.register())
 
+    async def _set_up_parse_pool(self, stack: AsyncExitStack) -> None:
+        if workers := self._config.advanced.parse_workers:
+            # NOTE: Forking a process with running event loop, threads and open connections is unsafe
+            self._ctx._parse_pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')))
+
     async def _set_up_database(self, stack: AsyncExitStack) -> None:
         await stack.enter_async_context(
             tortoise_wrapper(
@@ -1,15 +1,29 @@
 import asyncio
+import copy
+import hashlib
 import logging
+import os
 import platform
+import shutil
+import threading
 from abc import ABC
 from contextlib import suppress
+from functools import partial
 from http import HTTPStatus
 from json import JSONDecodeError
+from os.path import expanduser
+from os.path import join
 from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Hashable
+from typing import Iterator
 from typing import Mapping
 from typing import Optional
 from typing import Tuple
 from typing import cast
+from urllib.parse import urlparse
+from weakref import WeakSet
 
 import aiohttp
 import orjson
@@ -19,6 +33,9 @@ from dipdup import __version__
 from dipdup.config import HTTPConfig
 from dipdup.prometheus import Metrics
 
+CACHE_PATH = join(os.environ.get('XDG_CACHE_HOME') or expanduser(join('~', '.cache')), 'dipdup', 'http')
+DEFAULT_CACHE_SIZE = 1024
+
 safe_exceptions = (
     aiohttp.ClientConnectionError,
     aiohttp.ClientConnectorError,
@@ -27,6 +44,17 @@ safe_exceptions = (
 )
 
 
+def _copy_response(response: Any) -> Any:
+    """Copy decoded response; JSON round trip is much faster than `deepcopy` for large pages"""
+    if not isinstance(response, (dict, list)):
+        return response
+    try:
+        return orjson.loads(orjson.dumps(response))
+    # NOTE: orjson can't serialize integers wider than 64 bits
+    except orjson.JSONEncodeError:
+        return copy.deepcopy(response)
+
+
 class HTTPGateway(ABC):
     """Base class for datasources which connect to remote HTTP endpoints"""
 
@@ -59,10 +87,111 @@ class HTTPGateway(ABC):
         self._http.set_user_agent(*args)
 
 
+class ResponseCache:
+    """Content-addressed disk cache of decoded responses with size-based LRU eviction.
+
+    Only immutable responses must be stored here; it's up to the caller to decide which ones are. Methods block on disk IO;
+    they are thread-safe, so async callers should run them in executor.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, size: int = DEFAULT_CACHE_SIZE) -> None:
+        self._logger = logging.getLogger('dipdup.http')
+        self._path = path
+        self._size_limit = size * 1024 * 1024
+        self._size: Optional[int] = None
+        self._lock = threading.RLock()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def get(self, key: Hashable) -> Any:
+        """Get decoded response by key or None if not cached"""
+        path = self._get_path(key)
+        try:
+            with open(path, 'rb') as file:
+                value = orjson.loads(file.read())
+        except FileNotFoundError:
+            return None
+        # NOTE: Bump mtime for LRU eviction
+        with suppress(FileNotFoundError):
+            os.utime(path)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store decoded response, evict least recently used entries if cache is full"""
+        path = self._get_path(key)
+        content = orjson.dumps(value)
+        with self._lock:
+            size = self.size()
+            with suppress(FileNotFoundError):
+                size -= os.path.getsize(path)
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # NOTE: Write to temporary file first to never leave a partially written entry
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+
+            # NOTE: Size is tracked incrementally; cache directory is walked only on first write and on eviction
+            self._size = size + len(content)
+            if self._size > self._size_limit:
+                self._evict()
+
+    def size(self) -> int:
+        """Total size of cached entries in bytes"""
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, _, size in self._iter_entries())
+            return self._size
+
+    def count(self) -> int:
+        """Number of cached entries"""
+        return sum(1 for _ in self._iter_entries())
+
+    def clear(self) -> None:
+        """Remove all cached entries"""
+        self._logger.info('Clearing response cache `%s`', self._path)
+        with self._lock:
+            shutil.rmtree(self._path, ignore_errors=True)
+            self._size = 0
+
+    def _evict(self) -> None:
+        # NOTE: Free a bit more than needed to avoid evicting on every write
+        target_size = self._size_limit * 0.9
+        size = self.size()
+        for path, _, entry_size in sorted(self._iter_entries(), key=lambda e: e[1]):
+            if size <= target_size:
+                break
+            with suppress(FileNotFoundError):
+                os.remove(path)
+                size -= entry_size
+        self._logger.info('Evicted cached responses, %s bytes left', size)
+        self._size = size
+
+    def _iter_entries(self) -> Iterator[Tuple[str, float, int]]:
+        """Iterate over (path, mtime, size) of cached entries"""
+        if not os.path.isdir(self._path):
+            return
+        for dirpath, _, filenames in os.walk(self._path):
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    continue
+                path = join(dirpath, filename)
+                with suppress(FileNotFoundError):
+                    stat = os.stat(path)
+                    yield path, stat.st_mtime, stat.st_size
+
+    def _get_path(self, key: Hashable) -> str:
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return join(self._path, digest[:2], digest)
+
+
 class _HTTPGateway:
     """Wrapper for aiohttp HTTP requests.
 
-    Covers caching, retrying failed requests and ratelimiting"""
+    Covers coalescing identical requests, retrying failed requests and ratelimiting"""
 
     def __init__(self, url: str, config: HTTPConfig) -> None:
         self._logger = logging.getLogger('dipdup.http')
@@ -75,6 +204,16 @@ class _HTTPGateway:
             if config.ratelimit_rate and config.ratelimit_period
             else None
         )
+        self._inflight: Dict[Hashable, asyncio.Task[Any]] = {}
+        self._coalesced: WeakSet[asyncio.Task[Any]] = WeakSet()
+        self._cache = (
+            ResponseCache(
+                path=join(CACHE_PATH, urlparse(url).netloc),
+                size=config.cache_size or DEFAULT_CACHE_SIZE,
+            )
+            if config.cache
+            else None
+        )
         self.__session: Optional[aiohttp.ClientSession] = None
 
     async def __aenter__(self) -> None:
@@ -90,6 +229,11 @@ class _HTTPGateway:
         self._logger.debug('Closing gateway session (%s)', self._url)
         await self.__session.close()
 
+    @property
+    def cache(self) -> Optional[ResponseCache]:
+        """Disk cache of responses if enabled in config"""
+        return self._cache
+
     @property
     def user_agent(self) -> str:
         """Return User-Agent header compiled from aiohttp's one and dipdup environment"""
@@ -153,7 +297,14 @@ class _HTTPGateway:
                 multiplier = 1 if ratelimit_sleep else self._config.retry_multiplier or 1
                 retry_sleep *= multiplier
 
-    async def _request(self, method: str, url: str, weight: int = 1, **kwargs):
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        weight: int = 1,
+        payload_callback: Optional[Callable[[int], None]] = None,
+        **kwargs,
+    ):
         """Wrapped aiohttp call with preconfigured headers and ratelimiting"""
         if not url.startswith(self._url):
             url = self._url + '/' + url.lstrip('/')
@@ -176,6 +327,8 @@ class _HTTPGateway:
             raise_for_status=True,
             **kwargs,
         ) as response:
+            if payload_callback:
+                payload_callback(len(await response.read()))
             try:
                 return await response.json()
             except (JSONDecodeError, aiohttp.ContentTypeError):
@@ -186,13 +339,53 @@ class _HTTPGateway:
         method: str,
         url: str,
         weight: int = 1,
+        payload_callback: Optional[Callable[[int], None]] = None,
         **kwargs,
     ) -> Any:
         """Perform an HTTP request.
 
-        Check for parameters in cache, if not found, perform retried request and cache result.
+        Concurrent GET requests with the same URL and params share a single retried call; each caller gets its own copy of decoded result.
+        `payload_callback` is called with the size of response body in bytes only if this call has actually sent the request.
         """
-        return await self._retry_request(method, url, weight, **kwargs)
+        if payload_callback:
+            kwargs['payload_callback'] = payload_callback
+
+        key = self._get_request_key(method, url, **kwargs)
+        if key is None:
+            return await self._retry_request(method, url, weight, **kwargs)
+
+        task = self._inflight.get(key)
+        if task is None:
+            if Metrics.enabled:
+                Metrics.set_http_coalescing_miss(self._url)
+            task = asyncio.create_task(self._retry_request(method, url, weight, **kwargs))
+            task.add_done_callback(partial(self._on_request_done, key))
+            self._inflight[key] = task
+        else:
+            if Metrics.enabled:
+                Metrics.set_http_coalescing_hit(self._url)
+            self._logger.debug('Waiting for in-flight request `%s`', url)
+            self._coalesced.add(task)
+
+        # NOTE: Cancellation of one of the callers must not affect others
+        result = await asyncio.shield(task)
+        # NOTE: Callers may modify decoded response in place, e.g. when merging big map diffs into storage
+        if task in self._coalesced:
+            return _copy_response(result)
+        return result
+
+    def _get_request_key(self, method: str, url: str, **kwargs: Any) -> Optional[Hashable]:
+        """Get a key to coalesce requests by, or None if request is not safe to share"""
+        if method.lower() != 'get' or set(kwargs) - {'params', 'payload_callback'}:
+            return None
+        params = kwargs.get('params') or {}
+        return url, tuple((k, str(v)) for k, v in params.items())
+
+    def _on_request_done(self, key: Hashable, task: asyncio.Task[Any]) -> None:
+        self._inflight.pop(key, None)
+        # NOTE: Mark exception as retrieved in case all callers were cancelled
+        if not task.cancelled():
+            task.exception()
 
     def set_user_agent(self, *args: str) -> None:
         """Add list of arguments to User-Agent header"""
@@ -1,9 +1,17 @@
+import asyncio
 import logging
+import time
 from abc import abstractmethod
 from collections import defaultdict
 from collections import deque
+from concurrent.futures import Executor
 from contextlib import ExitStack
+from dataclasses import dataclass
 from datetime import datetime
+from functools import partial
+from typing import Any
+from typing import AsyncIterator
+from typing import Callable
 from typing import DefaultDict
 from typing import Deque
 from typing import Dict
@@ -14,10 +22,10 @@ from typing import Optional
 from typing import Sequence
 from typing import Set
 from typing import Tuple
+from typing import Type
 from typing import Union
 from typing import cast
 
-from pydantic.dataclasses import dataclass
 from pydantic.error_wrappers import ValidationError
 
 import dipdup.models as models
@@ -38,10 +46,13 @@ from dipdup.config import TokenTransferHandlerConfig
 from dipdup.config import TokenTransferIndexConfig
 from dipdup.context import DipDupContext
 from dipdup.context import rolled_back_indexes
+from dipdup.datasources.tzkt.datasource import TZKT_ORIGINATIONS_REQUEST_LIMIT
 from dipdup.datasources.tzkt.datasource import BigMapFetcher
 from dipdup.datasources.tzkt.datasource import OperationFetcher
 from dipdup.datasources.tzkt.datasource import TokenTransferFetcher
 from dipdup.datasources.tzkt.datasource import TzktDatasource
+from dipdup.datasources.tzkt.datasource import fetch_operations_by_level_concurrently
+from dipdup.datasources.tzkt.datasource import split_level_range
 from dipdup.datasources.tzkt.models import deserialize_storage
 from dipdup.enums import MessageType
 from dipdup.exceptions import ConfigInitializationException
@@ -52,17 +63,21 @@ from dipdup.models import BigMapData
 from dipdup.models import BigMapDiff
 from dipdup.models import HeadBlockData
 from dipdup.models import IndexStatus
+from dipdup.models import LazyOrigination
+from dipdup.models import LazyTransaction
 from dipdup.models import OperationData
 from dipdup.models import Origination
 from dipdup.models import TokenTransferData
 from dipdup.models import Transaction
+from dipdup.models import construct
 from dipdup.prometheus import Metrics
 from dipdup.utils import FormattedLogger
 
 _logger = logging.getLogger(__name__)
 
 
-@dataclass(frozen=True)
+# NOTE: Built from trusted data on every level; plain dataclass to skip pydantic validation
+@dataclass(frozen=True, slots=True)
 class OperationSubgroup:
     """Operations of a single contract call"""
 
@@ -79,6 +94,88 @@ Operations = Tuple[OperationData, ...]
 OperationHandlerArgumentT = Optional[Union[Transaction, Origination, OperationData]]
 MatchedOperationsT = Tuple[OperationSubgroup, OperationHandlerConfig, Deque[OperationHandlerArgumentT]]
 MatchedBigMapsT = Tuple[BigMapHandlerConfig, BigMapDiff]
+MatchedTokenTransfersT = Tuple[TokenTransferHandlerConfig, TokenTransferData]
+ParsedOperationT = Tuple[Union[Transaction, Origination], Optional[Type[Any]], Type[Any], 'asyncio.Future[Optional[Tuple[Any, Any, Any]]]']
+
+# NOTE: Number of matched levels waiting for worker processes before calling handlers
+PARSE_LOOKAHEAD_LEVELS = 64
+# NOTE: Number of fetched levels waiting for every index of `OperationSyncStream`
+SYNC_STREAM_QUEUE_SIZE = 256
+
+
+def parse_parameter(operation_data: OperationData, parameter_type: Optional[Type[Any]]) -> Any:
+    """Parse parameter of matched transaction"""
+    if parameter_type is None:
+        return None
+    try:
+        return parameter_type.parse_obj(operation_data.parameter_json)
+    except ValidationError as e:
+        raise InvalidDataError(parameter_type, operation_data.parameter_json, operation_data) from e
+
+
+def parse_operation(operation_data: OperationData, parameter_type: Optional[Type[Any]], storage_type: Type[Any]) -> Tuple[Any, Any]:
+    """Parse parameter and storage of matched operation, merging big map diffs into `operation_data.storage`"""
+    parameter = parse_parameter(operation_data, parameter_type)
+    storage = deserialize_storage(operation_data, storage_type)
+    return parameter, storage
+
+
+def _parse_operation_in_worker(
+    operation_data: OperationData,
+    parameter_type: Optional[Type[Any]],
+    storage_type: Type[Any],
+) -> Optional[Tuple[Any, Any, Any]]:
+    """Worker process entrypoint. Returns `None` on failure to parse operation again in the main process and raise a proper error."""
+    try:
+        parameter, storage = parse_operation(operation_data, parameter_type, storage_type)
+    except Exception:
+        return None
+    return parameter, storage, operation_data.storage
+
+
+class ContractHashCache:
+    """Process-wide cache of contract code and type hashes backed by `dipdup_contract_hash` table"""
+
+    _hashes: Dict[str, Tuple[int, int]] = {}
+
+    def __new__(cls):
+        raise NotImplementedError
+
+    @classmethod
+    async def initialize(cls) -> None:
+        """Load hashes stored in the database"""
+        for address, code_hash, type_hash in await models.ContractHash.all().values_list('address', 'code_hash', 'type_hash'):
+            cls._hashes[address] = (code_hash, type_hash)
+        _logger.debug('Loaded code and type hashes of %s contracts', len(cls._hashes))
+
+    @classmethod
+    async def prefetch(cls, datasource: TzktDatasource, addresses: Iterable[str]) -> None:
+        """Fetch hashes of unknown contracts in bulk and store them in the database"""
+        missing_addresses = set(addresses) - cls._hashes.keys()
+        if not missing_addresses:
+            return
+
+        hashes = await datasource.get_contract_hashes(missing_addresses)
+        await models.ContractHash.bulk_create(
+            (
+                models.ContractHash(address=address, code_hash=code_hash, type_hash=type_hash)
+                for address, (code_hash, type_hash) in hashes.items()
+            ),
+            ignore_conflicts=True,
+        )
+        cls._hashes.update(hashes)
+
+    @classmethod
+    async def get(cls, datasource: TzktDatasource, address: str) -> Tuple[int, int]:
+        if address not in cls._hashes:
+            await cls.prefetch(datasource, (address,))
+        if address not in cls._hashes:
+            raise RuntimeError(f'Contract `{address}` not found')
+        return cls._hashes[address]
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._hashes.clear()
 
 
 def extract_operation_subgroups(
@@ -128,6 +225,82 @@ def extract_operation_subgroups(
         )
 
 
+def _count_operations(operation_subgroups: Tuple[OperationSubgroup, ...]) -> int:
+    return sum(len(subgroup.operations) for subgroup in operation_subgroups)
+
+
+class OperationPatternLookup:
+    """Handler patterns of operation index compiled into lookup tables.
+
+    Maps `(type, destination, entrypoint)` and `(type, source)` of operation to patterns which can match it; destination of origination is
+    originated contract. Handler is a candidate for a subgroup only if each of its patterns can match some operation. Handlers with optional
+    patterns can't be ruled out this way and are checked against every subgroup, as well as patterns without address filters.
+    """
+
+    def __init__(self, handlers: Sequence[OperationHandlerConfig]) -> None:
+        self._by_destination: DefaultDict[Tuple[str, Optional[str], Optional[str]], Set[Tuple[int, int]]] = defaultdict(set)
+        self._by_source: DefaultDict[Tuple[str, str], Set[Tuple[int, int]]] = defaultdict(set)
+        self._keyed_patterns: Dict[int, int] = {}
+        self._any: Set[int] = set()
+
+        for i, handler_config in enumerate(handlers):
+            # NOTE: Handler with optional patterns may match subgroup without matching any operation
+            if any(pattern_config.optional for pattern_config in handler_config.pattern):
+                self._any.add(i)
+                continue
+
+            keyed_patterns = sum(self._add_pattern(i, j, pattern_config) for j, pattern_config in enumerate(handler_config.pattern))
+            if keyed_patterns:
+                self._keyed_patterns[i] = keyed_patterns
+            else:
+                self._any.add(i)
+
+    def _add_pattern(self, handler_idx: int, pattern_idx: int, pattern_config: OperationHandlerPatternConfigT) -> bool:
+        """Put pattern to lookup tables, return False if it has no address filters"""
+        position = (handler_idx, pattern_idx)
+        if isinstance(pattern_config, OperationHandlerTransactionPatternConfig):
+            # NOTE: Entrypoint requires destination
+            if pattern_config.destination:
+                destination = pattern_config.destination_contract_config.address
+                self._by_destination['transaction', destination, pattern_config.entrypoint].add(position)
+            elif pattern_config.source:
+                self._by_source['transaction', pattern_config.source_contract_config.address].add(position)
+            else:
+                return False
+        elif isinstance(pattern_config, OperationHandlerOriginationPatternConfig):
+            if pattern_config.originated_contract:
+                self._by_destination['origination', pattern_config.originated_contract_config.address, None].add(position)
+            elif pattern_config.source:
+                self._by_source['origination', pattern_config.source_contract_config.address].add(position)
+            else:
+                return False
+        else:
+            raise NotImplementedError
+        return True
+
+    def get_candidates(self, operations: Iterable[OperationData]) -> List[int]:
+        """Get sorted positions of handlers which can match given operations"""
+        hits: DefaultDict[int, Set[int]] = defaultdict(set)
+        for operation in operations:
+            type_ = operation.type
+            keys: Tuple[Optional[Set[Tuple[int, int]]], ...]
+            if type_ == 'transaction':
+                destination = operation.target_address
+                keys = (
+                    self._by_destination.get((type_, destination, operation.entrypoint)),
+                    self._by_destination.get((type_, destination, None)),
+                )
+            else:
+                keys = (self._by_destination.get((type_, operation.originated_contract_address, None)),)
+            for patterns in (*keys, self._by_source.get((type_, operation.sender_address or ''))):
+                if patterns:
+                    for handler_idx, pattern_idx in patterns:
+                        hits[handler_idx].add(pattern_idx)
+
+        candidates = self._any.union(i for i, patterns in hits.items() if len(patterns) == self._keyed_patterns[i])
+        return sorted(candidates)
+
+
 class Index:
     """Base class for index implementations
 
@@ -144,6 +317,10 @@ class Index:
 
         self._logger = FormattedLogger('dipdup.index', fmt=f'{config.name}: ' + '{}')
         self._state: Optional[models.Index] = None
+        self._queued_at: Optional[float] = None
+        self._queue_items = 0
+        self._dropped_level = 0
+        self._pushed_level = 0
 
     @property
     def name(self) -> str:
@@ -210,6 +387,13 @@ class Index:
         if self.name in rolled_back_indexes:
             await self.state.refresh_from_db(('level',))
             rolled_back_indexes.remove(self.name)
+            # NOTE: Rolled back levels will be pushed again
+            self._pushed_level = 0
+
+        # NOTE: Index has reached `last_level`, realtime messages are of no use
+        if self.state.status == IndexStatus.ONESHOT:
+            self._clear_queue()
+            return False
 
         if not isinstance(self._config, HeadIndexConfig) and self._config.last_level:
             head_level = self._config.last_level
@@ -224,22 +408,74 @@ class Index:
 
         if index_level < sync_level:
             self._logger.info('Index is behind datasource level, syncing: %s -> %s', index_level, sync_level)
-            self._queue.clear()
+            self._clear_queue()
 
             with ExitStack() as stack:
                 if Metrics.enabled:
                     stack.enter_context(Metrics.measure_total_sync_duration())
                 await self._synchronize(sync_level)
 
+        # NOTE: Realtime queue has overflowed; levels dropped from it are fetched again via REST
+        elif self._dropped_level > index_level:
+            dropped_level, self._dropped_level = self._dropped_level, 0
+            self._logger.info('Realtime queue has overflowed, syncing dropped levels: %s -> %s', index_level, dropped_level)
+
+            with ExitStack() as stack:
+                if Metrics.enabled:
+                    stack.enter_context(Metrics.measure_total_sync_duration())
+                await self._synchronize(dropped_level)
+
         elif self._queue:
+            if Metrics.enabled and self._queued_at is not None:
+                Metrics.set_index_realtime_delay(self.name, time.perf_counter() - self._queued_at)
+            self._queued_at = None
+
             with ExitStack() as stack:
                 if Metrics.enabled:
                     stack.enter_context(Metrics.measure_total_realtime_duration())
                 await self._process_queue()
+
+        # NOTE: Recent levels had no data for this index; we still need to bump index level
+        elif self._pushed_level > index_level:
+            await self.state.update_status(level=self._pushed_level)
         else:
             return False
         return True
 
+    def push_level(self, level: int) -> None:
+        """Mark that all realtime data of this level and below has been pushed to the index, even if there was nothing to push"""
+        self._pushed_level = max(self._pushed_level, level)
+
+    def _push_message(self, message: Any, level: int, size: int) -> None:
+        """Put realtime message to queue, remember when the oldest unprocessed message was received
+
+        When `queue_size` is exceeded, queued messages are dropped and their levels will be fetched via REST instead.
+        """
+        queue_size = self._config.queue_size
+        if queue_size and self._queue_items + size > queue_size:
+            self._logger.warning('Realtime queue is full (%s items), dropping messages up to level %s', self._queue_items, level)
+            self._clear_queue()
+            self._dropped_level = max(self._dropped_level, level)
+            if Metrics.enabled:
+                Metrics.set_index_realtime_overflow(self.name)
+            return
+
+        if self._queued_at is None:
+            self._queued_at = time.perf_counter()
+        self._queue.append(message)
+        self._queue_items += size
+
+    def _pop_message(self, size: Callable[[Any], int]) -> Any:
+        message = self._queue.popleft()
+        self._queue_items -= size(message)
+        return message
+
+    def _clear_queue(self) -> None:
+        self._queue.clear()
+        self._queue_items = 0
+        self._queued_at = None
+        self._pushed_level = 0
+
     @abstractmethod
     async def _synchronize(self, head_level: int) -> None:
         ...
@@ -248,6 +484,64 @@ class Index:
     async def _process_queue(self) -> None:
         ...
 
+    @abstractmethod
+    async def _call_matched_handlers(self, matched_handlers: Deque[Any]) -> None:
+        ...
+
+    async def _process_matched_handlers(self, matched_handlers: Deque[Any], level: int, sync_level: int) -> None:
+        """Call handlers matched on one or more levels in a single transaction and bump index level"""
+        if Metrics.enabled:
+            Metrics.set_index_handlers_matched(len(matched_handlers))
+
+        # NOTE: We still need to bump index level but don't care if it will be done in existing transaction
+        if not matched_handlers:
+            await self.state.update_status(level=level)
+            return
+
+        async with self._ctx._transactions.in_transaction(level, sync_level, self.name):
+            await self._call_matched_handlers(matched_handlers)
+            await self.state.update_status(level=level)
+
+    async def _process_matched_levels(
+        self,
+        matched_levels: AsyncIterator[Tuple[int, Deque[Any]]],
+        sync_level: int,
+        batch_levels: int,
+        batch_interval: float = 0,
+    ) -> None:
+        """Process handlers matched during sync in windows of `batch_levels` levels or `batch_interval` seconds.
+
+        Each window is committed in a single transaction along with index level, so sync resumes from the last committed window after crash.
+        """
+        rollback_depth = self._ctx.config.advanced.rollback_depth
+        window: Deque[Any] = deque()
+        window_size, window_level, window_started_at = 0, 0, 0.0
+
+        async def _flush() -> None:
+            nonlocal window, window_size
+            with ExitStack() as stack:
+                if Metrics.enabled:
+                    stack.enter_context(Metrics.measure_level_sync_duration())
+                await self._process_matched_handlers(window, window_level, sync_level)
+            window, window_size = deque(), 0
+
+        async for level, matched_handlers in matched_levels:
+            # NOTE: Levels within rollback depth are processed one by one; model updates are versioned by transaction level
+            near_head = sync_level - level <= rollback_depth
+            if window_size and near_head:
+                await _flush()
+
+            if not window_size:
+                window_started_at = time.perf_counter()
+            window.extend(matched_handlers)
+            window_size, window_level = window_size + 1, level
+
+            if window_size >= batch_levels or near_head or (batch_interval and time.perf_counter() - window_started_at >= batch_interval):
+                await _flush()
+
+        if window_size:
+            await _flush()
+
     async def _enter_sync_state(self, head_level: int) -> Optional[int]:
         # NOTE: Final state for indexes with `last_level`
         if self.state.status == IndexStatus.ONESHOT:
@@ -288,9 +582,31 @@ class OperationIndex(Index):
         super().__init__(ctx, config, datasource)
         self._queue: Deque[Tuple[OperationSubgroup, ...]] = deque()
         self._contract_hashes: Dict[str, Tuple[int, int]] = {}
+        self._pattern_lookup: Optional[OperationPatternLookup] = None
+        self._parse_pool: Optional[Executor] = None
+        self._parsed_operations: Deque[ParsedOperationT] = deque()
+        self._sync_stream: Optional['OperationSyncStream'] = None
+
+    def can_share_sync(self, sync_level: int) -> bool:
+        """Whether index can fetch operations with other indexes via `OperationSyncStream` on the next `process` call"""
+        if self.name in rolled_back_indexes or self.state.status == IndexStatus.ONESHOT:
+            return False
+        if self._config.last_level or OperationType.migration in self._config.types:
+            return False
+        return self.state.level < sync_level
+
+    async def process(self) -> bool:
+        try:
+            return await super().process()
+        finally:
+            # NOTE: Stream is valid for a single sync; release it even if index has not consumed it
+            if self._sync_stream:
+                self._sync_stream.detach(self)
+                self._sync_stream = None
 
     def push_operations(self, operation_subgroups: Tuple[OperationSubgroup, ...]) -> None:
-        self._queue.append(operation_subgroups)
+        level = operation_subgroups[0].operations[0].level
+        self._push_message(operation_subgroups, level, _count_operations(operation_subgroups))
         if Metrics.enabled:
             Metrics.set_levels_to_realtime(self._config.name, len(self._queue))
 
@@ -299,7 +615,7 @@ class OperationIndex(Index):
         self._logger.debug('Processing %s realtime messages from queue', len(self._queue))
 
         while self._queue:
-            message = self._queue.popleft()
+            message = self._pop_message(_count_operations)
             messages_left = len(self._queue)
 
             if not message:
@@ -317,7 +633,8 @@ class OperationIndex(Index):
             with ExitStack() as stack:
                 if Metrics.enabled:
                     stack.enter_context(Metrics.measure_level_realtime_duration())
-                await self._process_level_operations(message, message_level)
+                matched_handlers = await self._match_level_operations(message)
+                await self._process_matched_handlers(matched_handlers, message_level, message_level)
 
         else:
             if Metrics.enabled:
@@ -332,54 +649,98 @@ class OperationIndex(Index):
         first_level = index_level + 1
 
         self._logger.info('Fetching operations from level %s to %s', first_level, sync_level)
+        # NOTE: Sync level could have changed since stream was attached, e.g. after reconnect; stream is released in `process`
+        if self._sync_stream and self._sync_stream._sync_level == sync_level:
+            operations_by_level = self._sync_stream.iter_operations(self, first_level, sync_level)
+        else:
+            operations_by_level = await self._fetch_operations(first_level, sync_level)
+
+        async def _match_levels() -> AsyncIterator[Tuple[int, Deque[MatchedOperationsT]]]:
+            async for level, operations in operations_by_level:
+                if Metrics.enabled:
+                    Metrics.set_levels_to_sync(self._config.name, sync_level - level)
+
+                operation_subgroups = tuple(
+                    extract_operation_subgroups(
+                        operations,
+                        entrypoints=self._config.entrypoint_filter,
+                        addresses=self._config.address_filter,
+                    )
+                )
+                if operation_subgroups:
+                    self._logger.info('Processing operations of level %s', level)
+                    yield level, await self._match_level_operations(operation_subgroups)
+
+        matched_levels = _match_levels()
+        if parse_pool := self._ctx._parse_pool:
+            matched_levels = self._parse_in_pool(matched_levels, parse_pool)
+
+        await self._process_matched_levels(matched_levels, sync_level, self._config.batch_levels, self._config.batch_interval)
+        await self._exit_sync_state(sync_level)
+
+    async def _fetch_operations(self, first_level: int, sync_level: int) -> AsyncIterator[Tuple[int, Operations]]:
         transaction_addresses = await self._get_transaction_addresses()
         origination_addresses = await self._get_origination_addresses()
 
         migration_originations: Tuple[OperationData, ...] = ()
         if OperationType.migration in self._config.types:
             async for batch in self._datasource.iter_migration_originations(first_level):
+                await ContractHashCache.prefetch(self._datasource, (cast(str, op.originated_contract_address) for op in batch))
                 for op in batch:
                     code_hash, type_hash = await self._get_contract_hashes(cast(str, op.originated_contract_address))
                     op.originated_contract_code_hash, op.originated_contract_type_hash = code_hash, type_hash
                     migration_originations += (op,)
 
-        fetcher = OperationFetcher(
-            datasource=self._datasource,
-            first_level=first_level,
-            last_level=sync_level,
-            transaction_addresses=transaction_addresses,
-            origination_addresses=origination_addresses,
-            migration_originations=migration_originations,
-        )
-
-        async for level, operations in fetcher.fetch_operations_by_level():
-            if Metrics.enabled:
-                Metrics.set_levels_to_sync(self._config.name, sync_level - level)
-
-            operation_subgroups = tuple(
-                extract_operation_subgroups(
-                    operations,
-                    entrypoints=self._config.entrypoint_filter,
-                    addresses=self._config.address_filter,
-                )
+        # NOTE: Level windows are fetched concurrently and processed in order
+        fetchers = tuple(
+            OperationFetcher(
+                datasource=self._datasource,
+                first_level=window_first_level,
+                last_level=window_last_level,
+                transaction_addresses=transaction_addresses,
+                origination_addresses=origination_addresses,
+                migration_originations=tuple(op for op in migration_originations if window_first_level <= op.level <= window_last_level),
             )
-            if operation_subgroups:
-                self._logger.info('Processing operations of level %s', level)
-                with ExitStack() as stack:
-                    if Metrics.enabled:
-                        stack.enter_context(Metrics.measure_level_sync_duration())
-                    await self._process_level_operations(operation_subgroups, sync_level)
-
-        await self._exit_sync_state(sync_level)
+            for window_first_level, window_last_level in split_level_range(first_level, sync_level, self._datasource.sync_partitions)
+        )
+        return fetch_operations_by_level_concurrently(fetchers)
 
-    async def _process_level_operations(
+    async def _parse_in_pool(
         self,
-        operation_subgroups: Tuple[OperationSubgroup, ...],
-        sync_level: int,
-    ) -> None:
-        if not operation_subgroups:
-            return
-
+        matched_levels: AsyncIterator[Tuple[int, Deque[MatchedOperationsT]]],
+        parse_pool: Executor,
+    ) -> AsyncIterator[Tuple[int, Deque[MatchedOperationsT]]]:
+        """Parse parameters and storages of matched operations in worker processes ahead of calling handlers, yield levels in order"""
+        pending_levels: Deque[Tuple[int, Deque[MatchedOperationsT], Deque[ParsedOperationT]]] = deque()
+
+        async def _wait_level() -> Tuple[int, Deque[MatchedOperationsT]]:
+            level, matched_handlers, parsed_operations = pending_levels.popleft()
+            for context, parameter_type, storage_type, future in parsed_operations:
+                result = await future
+                if result is None:
+                    result = (*parse_operation(context.data, parameter_type, storage_type), context.data.storage)
+
+                parameter, context.storage, context.data.storage = result
+                if isinstance(context, Transaction):
+                    context.parameter = parameter
+            return level, matched_handlers
+
+        # NOTE: `_prepare_handler_args` submits operations to the pool instead of parsing them
+        self._parse_pool = parse_pool
+        try:
+            async for level, matched_handlers in matched_levels:
+                pending_levels.append((level, matched_handlers, self._parsed_operations))
+                self._parsed_operations = deque()
+                if len(pending_levels) > PARSE_LOOKAHEAD_LEVELS:
+                    yield await _wait_level()
+
+            while pending_levels:
+                yield await _wait_level()
+        finally:
+            self._parse_pool = None
+            self._parsed_operations.clear()
+
+    async def _match_level_operations(self, operation_subgroups: Tuple[OperationSubgroup, ...]) -> Deque[MatchedOperationsT]:
         batch_level = operation_subgroups[0].operations[0].level
         index_level = self.state.level
         if batch_level <= index_level:
@@ -389,24 +750,39 @@ class OperationIndex(Index):
         matched_handlers: Deque[MatchedOperationsT] = deque()
         for operation_subgroup in operation_subgroups:
             matched_handlers += await self._match_operation_subgroup(operation_subgroup)
+        return matched_handlers
 
-        if Metrics.enabled:
-            Metrics.set_index_handlers_matched(len(matched_handlers))
+    async def _call_matched_handlers(self, matched_handlers: Deque[MatchedOperationsT]) -> None:
+        """Call handlers in order of matching; handlers in `batch` mode receive all their matches at once on the first one"""
+        batches: Dict[int, Deque[Sequence[OperationHandlerArgumentT]]] = {}
+        for _, handler_config, args in matched_handlers:
+            if handler_config.batch:
+                # NOTE: Trailing optional patterns may be left unmatched; pad arguments to keep per-pattern tuples aligned
+                padding = (None,) * (len(handler_config.pattern) - len(args))
+                batches.setdefault(id(handler_config), deque()).append((*args, *padding))
+
+        for operation_subgroup, handler_config, args in matched_handlers:
+            if not handler_config.batch:
+                await self._call_matched_handler(handler_config, operation_subgroup, args)
+            elif batch := batches.pop(id(handler_config), None):
+                # NOTE: One sequence of matched operations per pattern
+                await self._call_matched_handler(handler_config, None, tuple(zip(*batch)))
 
-        # NOTE: We still need to bump index level but don't care if it will be done in existing transaction
-        if not matched_handlers:
-            await self.state.update_status(level=batch_level)
-            return
+    async def _compile_patterns(self) -> OperationPatternLookup:
+        """Build handler lookup tables and fetch contract hashes required for matching"""
+        for handler_config in self._config.handlers:
+            for pattern_config in handler_config.pattern:
+                if isinstance(pattern_config, OperationHandlerOriginationPatternConfig) and pattern_config.similar_to:
+                    await self._get_contract_hashes(pattern_config.similar_to_contract_config.address)
 
-        async with self._ctx._transactions.in_transaction(batch_level, sync_level, self.name):
-            for operation_subgroup, handler_config, args in matched_handlers:
-                await self._call_matched_handler(handler_config, operation_subgroup, args)
-            await self.state.update_status(level=batch_level)
+        return OperationPatternLookup(self._config.handlers)
 
-    async def _match_operation(self, pattern_config: OperationHandlerPatternConfigT, operation: OperationData) -> bool:
+    def _match_operation(self, pattern_config: OperationHandlerPatternConfigT, operation: OperationData) -> bool:
         """Match single operation with pattern"""
         # NOTE: Reversed conditions are intentional
         if isinstance(pattern_config, OperationHandlerTransactionPatternConfig):
+            if operation.type != 'transaction':
+                return False
             if pattern_config.entrypoint:
                 if pattern_config.entrypoint != operation.entrypoint:
                     return False
@@ -419,6 +795,8 @@ class OperationIndex(Index):
             return True
 
         elif isinstance(pattern_config, OperationHandlerOriginationPatternConfig):
+            if operation.type != 'origination':
+                return False
             if pattern_config.source:
                 if pattern_config.source_contract_config.address != operation.sender_address:
                     return False
@@ -426,7 +804,8 @@ class OperationIndex(Index):
                 if pattern_config.originated_contract_config.address != operation.originated_contract_address:
                     return False
             if pattern_config.similar_to:
-                code_hash, type_hash = await self._get_contract_hashes(pattern_config.similar_to_contract_config.address)
+                # NOTE: Fetched in `_compile_patterns`
+                code_hash, type_hash = self._contract_hashes[pattern_config.similar_to_contract_config.address]
                 if pattern_config.strict:
                     if code_hash != operation.originated_contract_code_hash:
                         return False
@@ -438,11 +817,16 @@ class OperationIndex(Index):
             raise NotImplementedError
 
     async def _match_operation_subgroup(self, operation_subgroup: OperationSubgroup) -> Deque[MatchedOperationsT]:
-        """Try to match operation subgroup with all patterns from indexes."""
+        """Try to match operation subgroup with patterns of handlers which can match it."""
+        if self._pattern_lookup is None:
+            self._pattern_lookup = await self._compile_patterns()
+
         matched_handlers: Deque[MatchedOperationsT] = deque()
         operations = operation_subgroup.operations
+        handlers = self._config.handlers
 
-        for handler_config in self._config.handlers:
+        for handler_idx in self._pattern_lookup.get_candidates(operations):
+            handler_config = handlers[handler_idx]
             operation_idx = 0
             pattern_idx = 0
             matched_operations: Deque[Optional[OperationData]] = deque()
@@ -451,7 +835,7 @@ class OperationIndex(Index):
             # TODO: Add None to matched_operations where applicable (pattern is optional and operation not found)
             while operation_idx < len(operations):
                 operation, pattern_config = operations[operation_idx], handler_config.pattern[pattern_idx]
-                operation_matched = await self._match_operation(pattern_config, operation)
+                operation_matched = self._match_operation(pattern_config, operation)
 
                 if operation.type == 'origination' and isinstance(pattern_config, OperationHandlerOriginationPatternConfig):
 
@@ -502,29 +886,44 @@ class OperationIndex(Index):
                     continue
 
                 parameter_type = pattern_config.parameter_type_cls
-                try:
-                    parameter = parameter_type.parse_obj(operation_data.parameter_json) if parameter_type else None
-                except ValidationError as e:
-                    raise InvalidDataError(parameter_type, operation_data.parameter_json, operation_data) from e
-
                 storage_type = pattern_config.storage_type_cls
-                storage = deserialize_storage(operation_data, storage_type)
-
-                transaction_context = Transaction(
-                    data=operation_data,
-                    parameter=parameter,
-                    storage=storage,
-                )
+                transaction_context: Transaction
+                if handler_config.lazy:
+                    transaction_context = LazyTransaction(
+                        data=operation_data,
+                        parse_parameter=partial(parse_parameter, operation_data, parameter_type),
+                        parse_storage=partial(deserialize_storage, operation_data, storage_type),
+                    )
+                elif self._parse_pool:
+                    # NOTE: Parameter and storage are set in `_parse_in_pool` when ready
+                    transaction_context = construct(Transaction, data=operation_data, parameter=None, storage=None)
+                    self._submit_parsing(transaction_context, parameter_type, storage_type)
+                else:
+                    parameter, storage = parse_operation(operation_data, parameter_type, storage_type)
+                    transaction_context = Transaction(
+                        data=operation_data,
+                        parameter=parameter,
+                        storage=storage,
+                    )
                 args.append(transaction_context)
 
             elif isinstance(pattern_config, OperationHandlerOriginationPatternConfig):
                 storage_type = pattern_config.storage_type_cls
-                storage = deserialize_storage(operation_data, storage_type)
-
-                origination_context = Origination(
-                    data=operation_data,
-                    storage=storage,
-                )
+                origination_context: Origination
+                if handler_config.lazy:
+                    origination_context = LazyOrigination(
+                        data=operation_data,
+                        parse_storage=partial(deserialize_storage, operation_data, storage_type),
+                    )
+                elif self._parse_pool:
+                    origination_context = construct(Origination, data=operation_data, storage=None)
+                    self._submit_parsing(origination_context, None, storage_type)
+                else:
+                    _, storage = parse_operation(operation_data, None, storage_type)
+                    origination_context = Origination(
+                        data=operation_data,
+                        storage=storage,
+                    )
                 args.append(origination_context)
 
             else:
@@ -532,8 +931,26 @@ class OperationIndex(Index):
 
         return args
 
+    def _submit_parsing(
+        self,
+        context: Union[Transaction, Origination],
+        parameter_type: Optional[Type[Any]],
+        storage_type: Type[Any],
+    ) -> None:
+        future = asyncio.get_running_loop().run_in_executor(
+            self._parse_pool,
+            _parse_operation_in_worker,
+            context.data,
+            parameter_type,
+            storage_type,
+        )
+        self._parsed_operations.append((context, parameter_type, storage_type, future))
+
     async def _call_matched_handler(
-        self, handler_config: OperationHandlerConfig, operation_subgroup: OperationSubgroup, args: Sequence[OperationHandlerArgumentT]
+        self,
+        handler_config: OperationHandlerConfig,
+        operation_subgroup: Optional[OperationSubgroup],
+        args: Sequence[Union[OperationHandlerArgumentT, Tuple[OperationHandlerArgumentT, ...]]],
     ) -> None:
         if not handler_config.parent:
             raise ConfigInitializationException
@@ -542,7 +959,7 @@ class OperationIndex(Index):
             handler_config.callback,
             handler_config.parent.name,
             self.datasource,
-            operation_subgroup.hash + ': {}',
+            operation_subgroup.hash + ': {}' if operation_subgroup else None,
             *args,
         )
 
@@ -580,11 +997,137 @@ class OperationIndex(Index):
 
     async def _get_contract_hashes(self, address: str) -> Tuple[int, int]:
         if address not in self._contract_hashes:
-            summary = await self._datasource.get_contract_summary(address)
-            self._contract_hashes[address] = (summary['codeHash'], summary['typeHash'])
+            self._contract_hashes[address] = await ContractHashCache.get(self._datasource, address)
         return self._contract_hashes[address]
 
 
+class OperationSyncStream:
+    """Fetches operations of several indexes on the same datasource with a single set of requests and splits them per index.
+
+    Operations of every level are filtered by addresses of each index and put to its own bounded queue; fetching is suspended until the
+    slowest index catches up. Fetching starts when the first index begins to consume the stream.
+    """
+
+    def __init__(self, datasource: TzktDatasource, sync_level: int) -> None:
+        self._datasource = datasource
+        self._sync_level = sync_level
+        self._first_levels: Dict[str, int] = {}
+        self._transaction_addresses: Dict[str, Set[str]] = {}
+        self._origination_addresses: Dict[str, Set[str]] = {}
+        self._queues: Dict[str, 'asyncio.Queue[Union[Tuple[int, Operations], Exception, None]]'] = {}
+        self._task: Optional['asyncio.Task[None]'] = None
+
+    @classmethod
+    async def attach(cls, indexes: Sequence[OperationIndex], sync_level: int) -> Tuple['OperationSyncStream', ...]:
+        """Attach streams to indexes behind `sync_level`; transaction addresses of a single stream fit in a single request"""
+        indexes = tuple(i for i in indexes if i.can_share_sync(sync_level))
+        streams: Deque[OperationSyncStream] = deque()
+        transaction_addresses: Set[str] = set()
+
+        for index in indexes:
+            index_transaction_addresses = await index._get_transaction_addresses()
+            if not streams or len(transaction_addresses | index_transaction_addresses) > TZKT_ORIGINATIONS_REQUEST_LIMIT:
+                streams.append(cls(index.datasource, sync_level))
+                transaction_addresses = set()
+
+            transaction_addresses |= index_transaction_addresses
+            streams[-1]._add_index(index, index_transaction_addresses, await index._get_origination_addresses())
+
+        # NOTE: Single index gains nothing from sharing
+        streams = deque(s for s in streams if len(s._queues) > 1)
+        for stream in streams:
+            for index in indexes:
+                if index.name in stream._queues:
+                    index._sync_stream = stream
+        return tuple(streams)
+
+    def _add_index(self, index: OperationIndex, transaction_addresses: Set[str], origination_addresses: Set[str]) -> None:
+        self._first_levels[index.name] = index.state.level + 1
+        self._transaction_addresses[index.name] = transaction_addresses
+        self._origination_addresses[index.name] = origination_addresses
+        self._queues[index.name] = asyncio.Queue(maxsize=SYNC_STREAM_QUEUE_SIZE)
+
+    def detach(self, index: OperationIndex) -> None:
+        """Stop sending operations to index; stop fetching when no indexes are left"""
+        queue = self._queues.pop(index.name, None)
+        # NOTE: Drop levels left in queue to unblock the fetching task waiting for a free slot
+        while queue and not queue.empty():
+            queue.get_nowait()
+        if not self._queues and self._task:
+            self._task.cancel()
+
+    async def iter_operations(self, index: OperationIndex, first_level: int, sync_level: int) -> AsyncIterator[Tuple[int, Operations]]:
+        if index.name not in self._queues:
+            raise RuntimeError(f'Index `{index.name}` is not attached to stream')
+        if first_level != self._first_levels[index.name]:
+            raise RuntimeError(f'Index `{index.name}` level has changed since stream was attached')
+        if sync_level != self._sync_level:
+            raise RuntimeError(f'Sync level has changed since stream was attached: {self._sync_level} -> {sync_level}')
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._fetch())
+
+        queue = self._queues[index.name]
+        try:
+            while (item := await queue.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.detach(index)
+
+    async def _fetch(self) -> None:
+        first_level = min(self._first_levels.values())
+        transaction_addresses = set().union(*self._transaction_addresses.values())
+        origination_addresses = set().union(*self._origination_addresses.values())
+        _logger.info(
+            'Fetching operations of %s indexes from level %s to %s',
+            len(self._queues),
+            first_level,
+            self._sync_level,
+        )
+
+        fetchers = tuple(
+            OperationFetcher(
+                datasource=self._datasource,
+                first_level=window_first_level,
+                last_level=window_last_level,
+                transaction_addresses=transaction_addresses,
+                origination_addresses=origination_addresses,
+            )
+            for window_first_level, window_last_level in split_level_range(first_level, self._sync_level, self._datasource.sync_partitions)
+        )
+        operations_by_level = fetch_operations_by_level_concurrently(fetchers)
+        try:
+            async for level, operations in operations_by_level:
+                for name, queue in tuple(self._queues.items()):
+                    if level < self._first_levels[name]:
+                        continue
+                    if index_operations := self._filter_operations(name, operations):
+                        await queue.put((level, index_operations))
+        except Exception as e:
+            for queue in tuple(self._queues.values()):
+                await queue.put(e)
+        else:
+            for queue in tuple(self._queues.values()):
+                await queue.put(None)
+        finally:
+            await operations_by_level.aclose()  # type: ignore[attr-defined]
+
+    def _filter_operations(self, name: str, operations: Operations) -> Operations:
+        """Leave only operations which would be fetched for a single index"""
+        transaction_addresses = self._transaction_addresses[name]
+        origination_addresses = self._origination_addresses[name]
+        return tuple(
+            op
+            for op in operations
+            if op.type == 'transaction'
+            and (op.sender_address in transaction_addresses or op.target_address in transaction_addresses)
+            or op.type == 'origination'
+            and op.originated_contract_address in origination_addresses
+        )
+
+
 class BigMapIndex(Index):
     message_type = MessageType.big_map
     _config: BigMapIndexConfig
@@ -592,9 +1135,15 @@ class BigMapIndex(Index):
     def __init__(self, ctx: DipDupContext, config: BigMapIndexConfig, datasource: TzktDatasource) -> None:
         super().__init__(ctx, config, datasource)
         self._queue: Deque[Tuple[BigMapData, ...]] = deque()
+        self._handler_routes: Optional[Dict[Tuple[str, str], Tuple[BigMapHandlerConfig, ...]]] = None
 
     def push_big_maps(self, big_maps: Tuple[BigMapData, ...]) -> None:
-        self._queue.append(big_maps)
+        routes = self._get_handler_routes()
+        level = big_maps[0].level
+        big_maps = tuple(big_map for big_map in big_maps if (big_map.contract_address, big_map.path) in routes)
+        if big_maps:
+            self._push_message(big_maps, level, len(big_maps))
+        self.push_level(level)
 
         if Metrics.enabled:
             Metrics.set_levels_to_realtime(self._config.name, len(self._queue))
@@ -604,7 +1153,7 @@ class BigMapIndex(Index):
         if self._queue:
             self._logger.debug('Processing websocket queue')
         while self._queue:
-            big_maps = self._queue.popleft()
+            big_maps = self._pop_message(len)
             message_level = big_maps[0].level
             if message_level <= self.state.level:
                 self._logger.debug('Skipping outdated message: %s <= %s', message_level, self.state.level)
@@ -613,7 +1162,8 @@ class BigMapIndex(Index):
             with ExitStack() as stack:
                 if Metrics.enabled:
                     stack.enter_context(Metrics.measure_level_realtime_duration())
-                await self._process_level_big_maps(big_maps, message_level)
+                matched_handlers = await self._match_level_big_maps(big_maps)
+                await self._process_matched_handlers(matched_handlers, message_level, message_level)
 
     async def _synchronize(self, sync_level: int) -> None:
         """Fetch operations via Fetcher and pass to message callback"""
@@ -648,12 +1198,13 @@ class BigMapIndex(Index):
             big_map_paths=big_map_paths,
         )
 
-        async for level, big_maps in fetcher.fetch_big_maps_by_level():
-            with ExitStack() as stack:
+        async def _match_levels() -> AsyncIterator[Tuple[int, Deque[MatchedBigMapsT]]]:
+            async for level, big_maps in fetcher.fetch_big_maps_by_level():
                 if Metrics.enabled:
                     Metrics.set_levels_to_sync(self._config.name, sync_level - level)
-                    stack.enter_context(Metrics.measure_level_sync_duration())
-                await self._process_level_big_maps(big_maps, sync_level)
+                yield level, await self._match_level_big_maps(big_maps)
+
+        await self._process_matched_levels(_match_levels(), sync_level, self._config.batch_levels, self._config.batch_interval)
 
     async def _synchronize_level(self, head_level: int) -> None:
         # NOTE: Checking late because feature flags could be modified after loading config
@@ -661,76 +1212,70 @@ class BigMapIndex(Index):
             raise ConfigurationError('`skip_history` requires `early_realtime` feature flag to be enabled')
 
         big_map_pairs = self._get_big_map_pairs()
-        big_map_ids: Set[Tuple[int, str, str]] = set()
-
-        for address, path in big_map_pairs:
-            async for contract_big_maps in self._datasource.iter_contract_big_maps(address):
-                for contract_big_map in contract_big_maps:
-                    if contract_big_map['path'] == path:
-                        big_map_ids.add((int(contract_big_map['ptr']), address, path))
-
-        # NOTE: Do not use `_process_level_big_maps` here; we want to maintain transaction manually.
+        big_map_addresses = {address for address, _ in big_map_pairs}
+        big_map_ids: Dict[int, Tuple[str, str]] = {}
+
+        async def _fetch_contract_big_maps(address: str) -> Tuple[Dict[str, Any], ...]:
+            contract_big_maps: Tuple[Dict[str, Any], ...] = ()
+            async for batch in self._datasource.iter_contract_big_maps(address):
+                contract_big_maps += batch
+            return contract_big_maps
+
+        addresses = tuple(sorted(big_map_addresses))
+        contracts_big_maps = await asyncio.gather(*(_fetch_contract_big_maps(address) for address in addresses))
+        for address, contract_big_maps in zip(addresses, contracts_big_maps):
+            for contract_big_map in contract_big_maps:
+                if (address, contract_big_map['path']) in big_map_pairs:
+                    big_map_ids[int(contract_big_map['ptr'])] = (address, contract_big_map['path'])
+
+        # NOTE: Pages are fetched concurrently, but handlers are called sequentially in a single transaction.
+        # NOTE: Do not use `_process_matched_handlers` here; we want to maintain transaction manually.
         async with self._ctx._transactions.in_transaction(head_level, head_level, self.name):
-            for big_map_id, address, path in big_map_ids:
-                async for big_map_keys in self._datasource.iter_big_map(big_map_id, head_level):
-                    big_map_data = tuple(
-                        BigMapData(
-                            id=big_map_key['id'],
-                            level=head_level,
-                            operation_id=head_level,
-                            timestamp=datetime.now(),
-                            bigmap=big_map_id,
-                            contract_address=address,
-                            path=path,
-                            action=BigMapAction.ADD_KEY,
-                            active=big_map_key['active'],
-                            key=big_map_key['key'],
-                            value=big_map_key['value'],
-                        )
-                        for big_map_key in big_map_keys
+            async for big_map_id, big_map_keys in self._datasource.iter_big_map_keys(
+                tuple(big_map_ids),
+                head_level,
+                concurrency=self._config.skip_history_concurrency,
+            ):
+                address, path = big_map_ids[big_map_id]
+                big_map_data = tuple(
+                    construct(
+                        BigMapData,
+                        id=big_map_key['id'],
+                        level=head_level,
+                        operation_id=head_level,
+                        timestamp=datetime.now(),
+                        bigmap=big_map_id,
+                        contract_address=address,
+                        path=path,
+                        action=BigMapAction.ADD_KEY,
+                        active=big_map_key['active'],
+                        key=big_map_key['key'],
+                        value=big_map_key['value'],
                     )
-                    matched_handlers = await self._match_big_maps(big_map_data)
-                    for handler_config, big_map_diff in matched_handlers:
-                        await self._call_matched_handler(handler_config, big_map_diff)
+                    for big_map_key in big_map_keys
+                )
+                matched_handlers = await self._match_big_maps(big_map_data)
+                await self._call_matched_handlers(matched_handlers)
 
             await self.state.update_status(level=head_level)
 
-    async def _process_level_big_maps(
-        self,
-        big_maps: Tuple[BigMapData, ...],
-        sync_level: int,
-    ) -> None:
-        if not big_maps:
-            return
-
+    async def _match_level_big_maps(self, big_maps: Tuple[BigMapData, ...]) -> Deque[MatchedBigMapsT]:
         batch_level = self._extract_level(big_maps)
         index_level = self.state.level
         if batch_level <= index_level:
             raise RuntimeError(f'Batch level is lower than index level: {batch_level} <= {index_level}')
 
         self._logger.debug('Processing big map diffs of level %s', batch_level)
-        matched_handlers = await self._match_big_maps(big_maps)
+        return await self._match_big_maps(big_maps)
 
-        if Metrics.enabled:
-            Metrics.set_index_handlers_matched(len(matched_handlers))
-
-        # NOTE: We still need to bump index level but don't care if it will be done in existing transaction
-        if not matched_handlers:
-            await self.state.update_status(level=batch_level)
-            return
-
-        async with self._ctx._transactions.in_transaction(batch_level, sync_level, self.name):
-            for handler_config, big_map_diff in matched_handlers:
-                await self._call_matched_handler(handler_config, big_map_diff)
-            await self.state.update_status(level=batch_level)
-
-    async def _match_big_map(self, handler_config: BigMapHandlerConfig, big_map: BigMapData) -> bool:
-        """Match single big map diff with pattern"""
-        if handler_config.path != big_map.path:
-            return False
-        if handler_config.contract_config.address != big_map.contract_address:
-            return False
-        return True
+    def _get_handler_routes(self) -> Dict[Tuple[str, str], Tuple[BigMapHandlerConfig, ...]]:
+        """Get handlers by contract address and big map path, in order of declaration"""
+        if self._handler_routes is None:
+            routes: DefaultDict[Tuple[str, str], List[BigMapHandlerConfig]] = defaultdict(list)
+            for handler_config in self._config.handlers:
+                routes[handler_config.contract_config.address, handler_config.path].append(handler_config)
+            self._handler_routes = {key: tuple(handlers) for key, handlers in routes.items()}
+        return self._handler_routes
 
     async def _prepare_handler_args(
         self,
@@ -768,19 +1313,35 @@ class BigMapIndex(Index):
         )
 
     async def _match_big_maps(self, big_maps: Iterable[BigMapData]) -> Deque[MatchedBigMapsT]:
-        """Try to match big map diffs in cache with all patterns from indexes."""
+        """Match big map diffs with handlers by contract address and path keeping order of diffs."""
         matched_handlers: Deque[MatchedBigMapsT] = deque()
+        routes = self._get_handler_routes()
 
-        for handler_config in self._config.handlers:
-            for big_map in big_maps:
-                big_map_matched = await self._match_big_map(handler_config, big_map)
-                if big_map_matched:
-                    arg = await self._prepare_handler_args(handler_config, big_map)
-                    matched_handlers.append((handler_config, arg))
+        for big_map in big_maps:
+            for handler_config in routes.get((big_map.contract_address, big_map.path), ()):
+                arg = await self._prepare_handler_args(handler_config, big_map)
+                matched_handlers.append((handler_config, arg))
 
         return matched_handlers
 
-    async def _call_matched_handler(self, handler_config: BigMapHandlerConfig, big_map_diff: BigMapDiff) -> None:
+    async def _call_matched_handlers(self, matched_handlers: Deque[MatchedBigMapsT]) -> None:
+        """Call handlers in order of matching; handlers in `batch` mode receive all their diffs at once on the first match"""
+        batches: Dict[int, Deque[BigMapDiff]] = {}
+        for handler_config, big_map_diff in matched_handlers:
+            if handler_config.batch:
+                batches.setdefault(id(handler_config), deque()).append(big_map_diff)
+
+        for handler_config, big_map_diff in matched_handlers:
+            if not handler_config.batch:
+                await self._call_matched_handler(handler_config, big_map_diff)
+            elif batch := batches.pop(id(handler_config), None):
+                await self._call_matched_handler(handler_config, tuple(batch))
+
+    async def _call_matched_handler(
+        self,
+        handler_config: BigMapHandlerConfig,
+        big_map_diff: Union[BigMapDiff, Tuple[BigMapDiff, ...]],
+    ) -> None:
         if not handler_config.parent:
             raise ConfigInitializationException
 
@@ -834,7 +1395,7 @@ class HeadIndex(Index):
 
     async def _process_queue(self) -> None:
         while self._queue:
-            head = self._queue.popleft()
+            head = self._pop_message(lambda _: 1)
             message_level = head.level
             if message_level <= self.state.level:
                 self._logger.debug('Skipping outdated message: %s <= %s', message_level, self.state.level)
@@ -849,10 +1410,13 @@ class HeadIndex(Index):
 
             async with self._ctx._transactions.in_transaction(batch_level, message_level, self.name):
                 self._logger.debug('Processing head info of level %s', batch_level)
-                for handler_config in self._config.handlers:
-                    await self._call_matched_handler(handler_config, head)
+                await self._call_matched_handlers(deque((handler_config, head) for handler_config in self._config.handlers))
                 await self.state.update_status(level=batch_level)
 
+    async def _call_matched_handlers(self, matched_handlers: Deque[Tuple[HeadHandlerConfig, HeadBlockData]]) -> None:
+        for handler_config, head in matched_handlers:
+            await self._call_matched_handler(handler_config, head)
+
     async def _call_matched_handler(self, handler_config: HeadHandlerConfig, head: HeadBlockData) -> None:
         if not handler_config.parent:
             raise ConfigInitializationException
@@ -866,7 +1430,7 @@ class HeadIndex(Index):
         )
 
     def push_head(self, head: HeadBlockData) -> None:
-        self._queue.append(head)
+        self._push_message(head, head.level, 1)
 
 
 class TokenTransferIndex(Index):
@@ -878,7 +1442,7 @@ class TokenTransferIndex(Index):
         self._queue: Deque[Tuple[TokenTransferData, ...]] = deque()
 
     def push_token_transfers(self, token_transfers: Tuple[TokenTransferData, ...]) -> None:
-        self._queue.append(token_transfers)
+        self._push_message(token_transfers, token_transfers[0].level, len(token_transfers))
 
         if Metrics.enabled:
             Metrics.set_levels_to_realtime(self._config.name, len(self._queue))
@@ -895,25 +1459,22 @@ class TokenTransferIndex(Index):
             datasource=self._datasource,
             first_level=first_level,
             last_level=sync_level,
+            token_addresses=self._get_token_addresses(),
+            token_ids=self._get_token_ids(),
+            from_addresses=self._get_from_addresses(),
+            to_addresses=self._get_to_addresses(),
         )
 
-        async for level, token_transfers in fetcher.fetch_token_transfers_by_level():
-            with ExitStack() as stack:
+        async def _match_levels() -> AsyncIterator[Tuple[int, Deque[MatchedTokenTransfersT]]]:
+            async for level, token_transfers in fetcher.fetch_token_transfers_by_level():
                 if Metrics.enabled:
                     Metrics.set_levels_to_sync(self._config.name, sync_level - level)
-                    stack.enter_context(Metrics.measure_level_sync_duration())
-                await self._process_level_token_transfers(token_transfers, sync_level)
+                yield level, await self._match_level_token_transfers(token_transfers)
 
+        await self._process_matched_levels(_match_levels(), sync_level, self._config.batch_levels, self._config.batch_interval)
         await self._exit_sync_state(sync_level)
 
-    async def _process_level_token_transfers(
-        self,
-        token_transfers: Tuple[TokenTransferData, ...],
-        sync_level: int,
-    ) -> None:
-        if not token_transfers:
-            return
-
+    async def _match_level_token_transfers(self, token_transfers: Tuple[TokenTransferData, ...]) -> Deque[MatchedTokenTransfersT]:
         # FIXME: Why is this needed?
         batch_level = self._extract_level(token_transfers)
         if self.state.status == IndexStatus.SYNCING:
@@ -928,22 +1489,26 @@ class TokenTransferIndex(Index):
                 )
 
         self._logger.debug('Processing token transfers of level %s', batch_level)
-        matched_handlers = await self._match_token_transfers(token_transfers)
+        return await self._match_token_transfers(token_transfers)
 
-        if Metrics.enabled:
-            Metrics.set_index_handlers_matched(len(matched_handlers))
+    async def _call_matched_handlers(self, matched_handlers: Deque[MatchedTokenTransfersT]) -> None:
+        """Call handlers in order of matching; handlers in `batch` mode receive all their transfers at once on the first match"""
+        batches: Dict[int, Deque[TokenTransferData]] = {}
+        for handler_config, token_transfer in matched_handlers:
+            if handler_config.batch:
+                batches.setdefault(id(handler_config), deque()).append(token_transfer)
 
-        # NOTE: We still need to bump index level but don't care if it will be done in existing transaction
-        if not matched_handlers:
-            await self.state.update_status(level=batch_level)
-            return
-
-        async with self._ctx._transactions.in_transaction(batch_level, sync_level, self.name):
-            for handler_config, big_map_diff in matched_handlers:
-                await self._call_matched_handler(handler_config, big_map_diff)
-            await self.state.update_status(level=batch_level)
+        for handler_config, token_transfer in matched_handlers:
+            if not handler_config.batch:
+                await self._call_matched_handler(handler_config, token_transfer)
+            elif batch := batches.pop(id(handler_config), None):
+                await self._call_matched_handler(handler_config, tuple(batch))
 
-    async def _call_matched_handler(self, handler_config: TokenTransferHandlerConfig, token_transfer: TokenTransferData) -> None:
+    async def _call_matched_handler(
+        self,
+        handler_config: TokenTransferHandlerConfig,
+        token_transfer: Union[TokenTransferData, Tuple[TokenTransferData, ...]],
+    ) -> None:
         if not handler_config.parent:
             raise ConfigInitializationException
 
@@ -956,13 +1521,24 @@ class TokenTransferIndex(Index):
             token_transfer,
         )
 
-    async def _match_token_transfers(
-        self, token_transfers: Iterable[TokenTransferData]
-    ) -> List[Tuple[TokenTransferHandlerConfig, TokenTransferData]]:
-        matched_handlers: List[Tuple[TokenTransferHandlerConfig, TokenTransferData]] = []
+    def _match_token_transfer(self, handler_config: TokenTransferHandlerConfig, token_transfer: TokenTransferData) -> bool:
+        """Match single token transfer with handler filters"""
+        if handler_config.contract_address and handler_config.contract_address != token_transfer.contract_address:
+            return False
+        if handler_config.token_id is not None and handler_config.token_id != token_transfer.token_id:
+            return False
+        if handler_config.from_address and handler_config.from_address != token_transfer.from_address:
+            return False
+        if handler_config.to_address and handler_config.to_address != token_transfer.to_address:
+            return False
+        return True
+
+    async def _match_token_transfers(self, token_transfers: Iterable[TokenTransferData]) -> Deque[MatchedTokenTransfersT]:
+        matched_handlers: Deque[MatchedTokenTransfersT] = deque()
         for token_transfer in token_transfers:
             for handler_config in self._config.handlers:
-                matched_handlers.append((handler_config, token_transfer))
+                if self._match_token_transfer(handler_config, token_transfer):
+                    matched_handlers.append((handler_config, token_transfer))
 
         return matched_handlers
 
@@ -971,7 +1547,7 @@ class TokenTransferIndex(Index):
         if self._queue:
             self._logger.debug('Processing websocket queue')
         while self._queue:
-            token_transfers = self._queue.popleft()
+            token_transfers = self._pop_message(len)
             message_level = token_transfers[0].level
             if message_level <= self.state.level:
                 self._logger.debug('Skipping outdated message: %s <= %s', message_level, self.state.level)
@@ -980,27 +1556,28 @@ class TokenTransferIndex(Index):
             with ExitStack() as stack:
                 if Metrics.enabled:
                     stack.enter_context(Metrics.measure_level_realtime_duration())
-                await self._process_level_token_transfers(token_transfers, message_level)
+                matched_handlers = await self._match_level_token_transfers(token_transfers)
+                await self._process_matched_handlers(matched_handlers, message_level, message_level)
+
+    def _get_filter_values(self, values: Iterable[Any]) -> Set[Any]:
+        """Values to filter token transfers by on server side; empty set if any of handlers accepts all of them"""
+        values = tuple(values)
+        if not values or None in values:
+            return set()
+        return set(values)
 
     def _get_token_addresses(self) -> Set[str]:
-        """Get addresses to fetch big map diffs from during initial synchronization"""
-        addresses: set[str] = set()
-        for handler_config in self._config.handlers:
-            if isinstance(handler_config, TokenTransferHandlerConfig):
-                continue
-            if not hasattr(handler_config, 'contract'):
-                continue
-            addresses.add(cast(ContractConfig, handler_config.contract).address)
-        return addresses
+        """Get token contract addresses to fetch transfers of during initial synchronization"""
+        return self._get_filter_values(handler_config.contract_address for handler_config in self._config.handlers)
 
     def _get_token_ids(self) -> Set[int]:
-        """Get addresses to fetch big map diffs from during initial synchronization"""
-        ids: set[int] = set()
-        for handler_config in self._config.handlers:
-            if isinstance(handler_config, TokenTransferHandlerConfig):
-                continue
-            if not hasattr(handler_config, 'token_id'):
-                continue
-            if handler_config.token_id is not None:
-                ids.add(handler_config.token_id)
-        return ids
+        """Get token IDs to fetch transfers of during initial synchronization"""
+        return self._get_filter_values(handler_config.token_id for handler_config in self._config.handlers)
+
+    def _get_from_addresses(self) -> Set[str]:
+        """Get sender addresses to fetch transfers of during initial synchronization"""
+        return self._get_filter_values(handler_config.from_address for handler_config in self._config.handlers)
+
+    def _get_to_addresses(self) -> Set[str]:
+        """Get recipient addresses to fetch transfers of during initial synchronization"""
+        return self._get_filter_values(handler_config.to_address for handler_config in self._config.handlers)
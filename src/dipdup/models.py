@@ -1,7 +1,9 @@
 import logging
 from collections import defaultdict
 from copy import copy
+from dataclasses import MISSING
 from dataclasses import field
+from dataclasses import fields as dataclass_fields
 from datetime import date
 from datetime import datetime
 from datetime import time
@@ -9,10 +11,12 @@ from decimal import Decimal
 from enum import Enum
 from functools import cache
 from typing import Any
+from typing import Callable
 from typing import DefaultDict
 from typing import Deque
 from typing import Dict
 from typing import Generic
+from typing import Hashable
 from typing import Iterable
 from typing import List
 from typing import Optional
@@ -46,6 +50,7 @@ ParameterType = TypeVar('ParameterType', bound=BaseModel)
 StorageType = TypeVar('StorageType', bound=BaseModel)
 KeyType = TypeVar('KeyType', bound=BaseModel)
 ValueType = TypeVar('ValueType', bound=BaseModel)
+DataclassT = TypeVar('DataclassT')
 
 
 _logger = logging.getLogger(__name__)
@@ -104,6 +109,67 @@ class Origination(Generic[StorageType]):
     storage: StorageType
 
 
+class _LazyField:
+    """Descriptor calling `_parse_<name>` on first access and memoizing the result"""
+
+    def __set_name__(self, owner: Type[Any], name: str) -> None:
+        self._name = name
+
+    def __get__(self, instance: Any, owner: Optional[Type[Any]] = None) -> Any:
+        if instance is None:
+            return self
+        if self._name not in instance.__dict__:
+            instance.__dict__[self._name] = getattr(instance, f'_parse_{self._name}')()
+        return instance.__dict__[self._name]
+
+    def __set__(self, instance: Any, value: Any) -> None:
+        instance.__dict__[self._name] = value
+
+
+class _LazyMixin:
+    """`__repr__` and `__eq__` which don't force parsing of lazy fields"""
+
+    data: OperationData
+
+    def __repr__(self) -> str:
+        # NOTE: Only fields already set; `_parse_*` callbacks are private
+        fields = ', '.join(f'{k}={v!r}' for k, v in self.__dict__.items() if not k.startswith('_'))
+        return f'{self.__class__.__name__}({fields})'
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        # NOTE: Parsed fields are derived from operation data
+        return self.data == cast(_LazyMixin, other).data
+
+
+class LazyTransaction(_LazyMixin, Transaction[ParameterType, StorageType]):
+    """Matched transaction with parameter and storage parsed on first access"""
+
+    parameter: ParameterType = _LazyField()  # type: ignore[assignment]
+    storage: StorageType = _LazyField()  # type: ignore[assignment]
+
+    def __init__(
+        self,
+        data: OperationData,
+        parse_parameter: Callable[[], ParameterType],
+        parse_storage: Callable[[], StorageType],
+    ) -> None:
+        self.data = data
+        self._parse_parameter = parse_parameter
+        self._parse_storage = parse_storage
+
+
+class LazyOrigination(_LazyMixin, Origination[StorageType]):
+    """Matched origination with storage parsed on first access"""
+
+    storage: StorageType = _LazyField()  # type: ignore[assignment]
+
+    def __init__(self, data: OperationData, parse_storage: Callable[[], StorageType]) -> None:
+        self.data = data
+        self._parse_storage = parse_storage
+
+
 class BigMapAction(Enum):
     """Mapping for action in TzKT response"""
 
@@ -233,6 +299,35 @@ class TokenTransferData:
     tzkt_migration_id: Optional[int] = None
 
 
+@cache
+def _get_dataclass_defaults(cls: Type[Any]) -> Tuple[Dict[str, Any], Dict[str, Callable[[], Any]]]:
+    defaults, factories = {}, {}
+    for field_ in dataclass_fields(cls):
+        if field_.default is not MISSING:
+            defaults[field_.name] = field_.default
+        elif field_.default_factory is not MISSING:
+            factories[field_.name] = field_.default_factory
+    return defaults, factories
+
+
+def construct(cls: Type[DataclassT], **kwargs: Any) -> DataclassT:
+    """Create pydantic dataclass instance from trusted data skipping validation, like `BaseModel.construct`.
+
+    Values must already have field types; no coercion is performed.
+    """
+    # NOTE: Types are hashable, typeshed just doesn't know it
+    defaults, factories = _get_dataclass_defaults(cast(Hashable, cls))
+    values = {**defaults, **kwargs}
+    for name, factory in factories.items():
+        if name not in kwargs:
+            values[name] = factory()
+
+    instance = cls.__new__(cls)  # type: ignore[call-overload]
+    object.__setattr__(instance, '__dict__', values)
+    object.__setattr__(instance, '__initialised__', True)
+    return cast(DataclassT, instance)
+
+
 # ===> Model Versioning
 
 
@@ -702,6 +797,17 @@ class Contract(TortoiseModel):
         table = 'dipdup_contract'
 
 
+class ContractHash(TortoiseModel):
+    address = fields.CharField(36, pk=True)
+    code_hash = fields.IntField()
+    type_hash = fields.IntField()
+
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = 'dipdup_contract_hash'
+
+
 # ===> Built-in Models (versioned)
 
 
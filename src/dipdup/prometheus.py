@@ -39,6 +39,16 @@ _index_levels_to_realtime = Histogram(
     'Number of levels to reach realtime state',
     ['index'],
 )
+_index_realtime_delay = Histogram(
+    'dipdup_index_realtime_delay_seconds',
+    'Delay between receiving a realtime message and processing it',
+    ['index'],
+)
+_index_realtime_overflows = Counter(
+    'dipdup_index_realtime_overflows_total',
+    'Number of times realtime queue has overflowed and levels were fetched again via REST',
+    ['index'],
+)
 _index_handlers_matched = Gauge(
     'dipdup_index_handlers_matched_total',
     'Index total hits',
@@ -55,11 +65,57 @@ _datasource_rollbacks = Counter(
     ['datasource'],
 )
 
+_datasource_fetch_buffer = Gauge(
+    'dipdup_datasource_fetch_buffer_pages',
+    'Number of REST pages fetched ahead of processing',
+    ['datasource'],
+)
+_datasource_batch_size = Gauge(
+    'dipdup_datasource_batch_size',
+    'Current number of items requested in a single REST page',
+    ['datasource'],
+)
+_datasource_page_duration = Histogram(
+    'dipdup_datasource_page_duration_seconds',
+    'Duration of REST page requests',
+    ['datasource'],
+)
+_datasource_buffer_levels = Gauge(
+    'dipdup_datasource_buffer_levels',
+    'Number of levels in realtime message buffer',
+    ['datasource'],
+)
+_datasource_buffer_items = Gauge(
+    'dipdup_datasource_buffer_items',
+    'Number of data items in realtime message buffer',
+    ['datasource'],
+)
+_datasource_realtime_queue = Gauge(
+    'dipdup_datasource_realtime_queue_size',
+    'Number of realtime messages received but not processed yet',
+    ['datasource'],
+)
+_datasource_realtime_blocked = Counter(
+    'dipdup_datasource_realtime_blocked_seconds_total',
+    'Time Websocket receive loop was waiting for a free slot in the realtime queue',
+    ['datasource'],
+)
+
 _http_errors = Counter(
     'dipdup_http_errors_total',
     'Number of http errors',
     ['url', 'status'],
 )
+_http_coalescing_hits = Counter(
+    'dipdup_http_coalescing_hits_total',
+    'Number of http requests served by identical in-flight request',
+    ['url'],
+)
+_http_coalescing_misses = Counter(
+    'dipdup_http_coalescing_misses_total',
+    'Number of http requests sent to the network',
+    ['url'],
+)
 _callback_duration = Histogram(
     'dipdup_callback_duration_seconds',
     'Duration of callback execution',
@@ -117,10 +173,47 @@ class Metrics:
     def set_datasource_rollback(cls, name: str) -> None:
         _datasource_rollbacks.labels(datasource=name).inc()
 
+    @classmethod
+    def inc_datasource_fetch_buffer(cls, name: str, pages: int) -> None:
+        _datasource_fetch_buffer.labels(datasource=name).inc(pages)
+
+    @classmethod
+    def dec_datasource_fetch_buffer(cls, name: str, pages: int) -> None:
+        _datasource_fetch_buffer.labels(datasource=name).dec(pages)
+
+    @classmethod
+    def set_datasource_batch_size(cls, name: str, size: int) -> None:
+        _datasource_batch_size.labels(datasource=name).set(size)
+
+    @classmethod
+    def set_datasource_page_duration(cls, name: str, duration: float) -> None:
+        _datasource_page_duration.labels(datasource=name).observe(duration)
+
+    @classmethod
+    def set_datasource_buffer(cls, name: str, levels: int, items: int) -> None:
+        _datasource_buffer_levels.labels(datasource=name).set(levels)
+        _datasource_buffer_items.labels(datasource=name).set(items)
+
+    @classmethod
+    def set_datasource_realtime_queue_size(cls, name: str, size: int) -> None:
+        _datasource_realtime_queue.labels(datasource=name).set(size)
+
+    @classmethod
+    def set_datasource_realtime_blocked(cls, name: str, duration: float) -> None:
+        _datasource_realtime_blocked.labels(datasource=name).inc(duration)
+
     @classmethod
     def set_http_error(cls, url: str, status: int) -> None:
         _http_errors.labels(url=url, status=status).inc()
 
+    @classmethod
+    def set_http_coalescing_hit(cls, url: str) -> None:
+        _http_coalescing_hits.labels(url=url).inc()
+
+    @classmethod
+    def set_http_coalescing_miss(cls, url: str) -> None:
+        _http_coalescing_misses.labels(url=url).inc()
+
     @classmethod
     def set_index_handlers_matched(cls, amount: float) -> None:
         _index_handlers_matched.inc(amount)
@@ -132,3 +225,11 @@ class Metrics:
     @classmethod
     def set_levels_to_realtime(cls, index: str, levels: int) -> None:
         _index_levels_to_realtime.labels(index=index).observe(levels)
+
+    @classmethod
+    def set_index_realtime_delay(cls, index: str, delay: float) -> None:
+        _index_realtime_delay.labels(index=index).observe(delay)
+
+    @classmethod
+    def set_index_realtime_overflow(cls, index: str) -> None:
+        _index_realtime_overflows.labels(index=index).inc()
@@ -1,6 +1,7 @@
 from collections import deque
 from contextlib import asynccontextmanager
 from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import AsyncIterator
 from typing import Deque
 from typing import Generator
@@ -10,12 +11,14 @@ from typing import Set
 from tortoise.transactions import in_transaction
 
 import dipdup.models
-from dipdup.utils.database import get_connection
-from dipdup.utils.database import set_connection
 
 
 class TransactionManager:
-    """Manages versioned transactions"""
+    """Manages versioned transactions
+
+    Transaction metadata and pending model updates are task-local (as well as connections in Tortoise), so indexes processed
+    concurrently in different tasks don't interfere.
+    """
 
     def __init__(
         self,
@@ -24,8 +27,8 @@ class TransactionManager:
     ) -> None:
         self._depth = depth
         self._immune_tables = immune_tables or set()
-        self._transaction: Optional[dipdup.models.VersionedTransaction] = None
-        self._pending_updates: Deque[dipdup.models.ModelUpdate] = deque()
+        self._transaction: ContextVar[Optional[dipdup.models.VersionedTransaction]] = ContextVar('transaction', default=None)
+        self._pending_updates: ContextVar[Deque[dipdup.models.ModelUpdate]] = ContextVar('pending_updates')
 
     @contextmanager
     def register(self) -> Generator[None, None, None]:
@@ -40,8 +43,8 @@ class TransactionManager:
         else:
             raise RuntimeError('TransactionManager is already registered')
 
-        dipdup.models.get_transaction = lambda: self._transaction
-        dipdup.models.get_pending_updates = lambda: self._pending_updates
+        dipdup.models.get_transaction = self._transaction.get
+        dipdup.models.get_pending_updates = self._pending_updates.get
         yield
         dipdup.models.get_transaction = original_get_transaction
         dipdup.models.get_pending_updates = original_get_pending_updates
@@ -54,34 +57,36 @@ class TransactionManager:
         index: Optional[str] = None,
     ) -> AsyncIterator[None]:
         """Enforce using transaction for all queries inside wrapped block. Works for a single DB only."""
-        try:
-            original_conn = get_connection()
-            async with in_transaction() as conn:
-                set_connection(conn)
-
-                if self._transaction:
-                    raise ValueError('Transaction is already started')
+        if self._transaction.get():
+            raise ValueError('Transaction is already started')
 
-                if level and index and self._depth:
-                    if not sync_level or sync_level - level <= self._depth:
-                        self._transaction = dipdup.models.VersionedTransaction(
-                            level,
-                            index,
-                            self._immune_tables,
-                        )
+        transaction: Optional[dipdup.models.VersionedTransaction] = None
+        if level and index and self._depth:
+            if not sync_level or sync_level - level <= self._depth:
+                transaction = dipdup.models.VersionedTransaction(
+                    level,
+                    index,
+                    self._immune_tables,
+                )
 
+        # NOTE: Tortoise sets transaction connection for the current task only
+        async with in_transaction():
+            transaction_token = self._transaction.set(transaction)
+            pending_updates_token = self._pending_updates.set(deque())
+            try:
                 yield
 
-                if self._transaction:
+                if transaction:
                     await self._commit()
-        finally:
-            self._transaction = None
-            set_connection(original_conn)
+            finally:
+                self._transaction.reset(transaction_token)
+                self._pending_updates.reset(pending_updates_token)
 
     async def _commit(self) -> None:
         """Save pending updates to DB in the same order as they were added"""
-        while self._pending_updates:
-            await self._pending_updates.popleft().save()
+        pending_updates = self._pending_updates.get()
+        while pending_updates:
+            await pending_updates.popleft().save()
 
     async def cleanup(self) -> None:
         """Cleanup outdated model updates"""
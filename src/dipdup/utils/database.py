@@ -44,10 +44,6 @@ def get_connection() -> BaseDBAsyncClient:
     return connections.get(DEFAULT_CONNECTION_NAME)
 
 
-def set_connection(conn: BaseDBAsyncClient) -> None:
-    connections.set(DEFAULT_CONNECTION_NAME, conn)
-
-
 @asynccontextmanager
 async def tortoise_wrapper(url: str, models: Optional[str] = None, timeout: int = 60) -> AsyncIterator:
     """Initialize Tortoise with internal and project models, close connections when done"""
@@ -117,7 +113,21 @@ def iter_models(package: Optional[str]) -> Iterator[Tuple[str, Type[TortoiseMode
 
 def get_schema_hash(conn: BaseDBAsyncClient) -> str:
     """Get hash of the current schema"""
-    schema_sql = get_schema_sql(conn, False)
+    from dipdup.models import ContractHash
+
+    # NOTE: Cache tables are created on every start if missing and don't require reindexing when added.
+    # NOTE: Generate schema without them; original model registry is restored right after.
+    apps = {app: dict(models) for app, models in Tortoise.apps.items()}
+    try:
+        for models in Tortoise.apps.values():
+            for name, model in tuple(models.items()):
+                if model is ContractHash:
+                    del models[name]
+        schema_sql = get_schema_sql(conn, False)
+    finally:
+        for app, models in apps.items():
+            Tortoise.apps[app].clear()
+            Tortoise.apps[app].update(models)
     # NOTE: Column order could differ in two generated schemas for the same models, drop commas and sort strings to eliminate this
     processed_schema_sql = '\n'.join(sorted(schema_sql.replace(',', '').split('\n'))).encode()
     return hashlib.sha256(processed_schema_sql).hexdigest()
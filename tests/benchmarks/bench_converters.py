@@ -0,0 +1,79 @@
+"""Compare throughput of TzKT converters with and without pydantic validation of resulting dataclasses.
+
+Run with `python tests/benchmarks/bench_converters.py`.
+"""
+import json
+import time
+from os.path import dirname
+from os.path import join
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+import dipdup.datasources.tzkt.datasource as tzkt_datasource
+from dipdup.datasources.tzkt.datasource import TzktDatasource
+
+ROUNDS = 100
+
+BIG_MAP_JSON = {
+    'id': 1,
+    'level': 2,
+    'timestamp': '2022-01-01T00:00:00Z',
+    'bigmap': 3,
+    'contract': {'address': 'KT1GBZmSxmnKJXGMdMLbugPfLyUPmuLSMwKS'},
+    'path': 'store.records',
+    'action': 'add_key',
+    'content': {'key': 'aa', 'value': {'level': '1', 'owner': 'tz1cmAfyjWW3Rf3tH3M3maCpwsiAwBKbtmG4'}},
+}
+TOKEN_TRANSFER_JSON = {
+    'id': 1,
+    'level': 2,
+    'timestamp': '2022-01-01T00:00:00Z',
+    'token': {'id': 3, 'contract': {'address': 'KT1RJ6PbjHpwc3M5rw5s2Nbmefwbuwbdxton'}, 'tokenId': '42', 'standard': 'fa2'},
+    'to': {'address': 'tz1cmAfyjWW3Rf3tH3M3maCpwsiAwBKbtmG4'},
+    'amount': '1000',
+}
+
+
+def _load_operations() -> List[Dict[str, Any]]:
+    operations: List[Dict[str, Any]] = []
+    for name in ('asdf', 'ftzfun', 'hen_subjkt', 'hjkl', 'kolibri_ovens', 'qwer', 'rewq', 'yupana', 'zxcv'):
+        with open(join(dirname(__file__), '..', 'test_dipdup', f'{name}.json')) as f:
+            operations.extend(json.load(f))
+    return operations
+
+
+def _validated_construct(cls, **kwargs):
+    """Implementation previously used by converters: regular pydantic dataclass constructor"""
+    return cls(**kwargs)
+
+
+def _measure(name: str, fn: Callable[[Dict[str, Any]], Any], items: List[Dict[str, Any]]) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for item in items:
+            fn(item)
+    duration = time.perf_counter() - start
+    print(f'{name:<36} {len(items) * ROUNDS / duration:>10.0f} items/s')
+    return duration
+
+
+def main() -> None:
+    benchmarks: Tuple[Tuple[str, Callable[[Dict[str, Any]], Any], List[Dict[str, Any]]], ...] = (
+        ('convert_operation', TzktDatasource.convert_operation, _load_operations()),
+        ('convert_big_map', TzktDatasource.convert_big_map, [BIG_MAP_JSON] * 100),
+        ('convert_token_transfer', TzktDatasource.convert_token_transfer, [TOKEN_TRANSFER_JSON] * 100),
+    )
+    construct = tzkt_datasource.construct
+    for name, fn, items in benchmarks:
+        tzkt_datasource.construct = _validated_construct  # type: ignore[assignment]
+        legacy = _measure(f'{name} (validated)', fn, items)
+        tzkt_datasource.construct = construct
+        current = _measure(f'{name} (current)', fn, items)
+        print(f'{name:<36} {legacy / current:>10.1f}x faster')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Compare level grouping of paginated REST responses before and after `group_by_level` was introduced.
+
+Run with `python tests/benchmarks/bench_group_by_level.py`.
+"""
+import asyncio
+import time
+from datetime import datetime
+from datetime import timezone
+from typing import AsyncIterator
+from typing import Tuple
+
+from dipdup.datasources.tzkt.datasource import group_by_level
+from dipdup.models import BigMapAction
+from dipdup.models import BigMapData
+
+PAGES = 20
+PAGE_SIZE = 10000
+ITEMS_PER_LEVEL = 2
+
+
+def _create_pages() -> Tuple[Tuple[BigMapData, ...], ...]:
+    items = tuple(
+        BigMapData(
+            id=i,
+            level=i // ITEMS_PER_LEVEL,
+            operation_id=i,
+            timestamp=datetime(2022, 1, 1, tzinfo=timezone.utc),
+            bigmap=1,
+            contract_address='KT1BEC9uHmADgVLXCm3wxN52qJJ85ohrWEaU',
+            path='ledger',
+            action=BigMapAction.ADD_KEY,
+            active=True,
+        )
+        for i in range(PAGES * PAGE_SIZE)
+    )
+    return tuple(items[i : i + PAGE_SIZE] for i in range(0, len(items), PAGE_SIZE))
+
+
+async def _iter_pages(pages: Tuple[Tuple[BigMapData, ...], ...]) -> AsyncIterator[Tuple[BigMapData, ...]]:
+    for page in pages:
+        yield page
+
+
+async def _group_by_level_legacy(batches: AsyncIterator[Tuple[BigMapData, ...]]) -> AsyncIterator[Tuple[int, Tuple[BigMapData, ...]]]:
+    """Implementation previously used by BigMapFetcher and TokenTransferFetcher"""
+    big_maps: Tuple[BigMapData, ...] = ()
+    async for fetched_big_maps in batches:
+        big_maps = big_maps + fetched_big_maps
+        while True:
+            for i in range(len(big_maps) - 1):
+                curr_level, next_level = big_maps[i].level, big_maps[i + 1].level
+                if curr_level != next_level:
+                    yield curr_level, big_maps[: i + 1]
+                    big_maps = big_maps[i + 1 :]
+                    break
+            else:
+                break
+    if big_maps:
+        yield big_maps[0].level, big_maps
+
+
+async def _measure(name: str, fn, pages: Tuple[Tuple[BigMapData, ...], ...]) -> None:
+    levels = 0
+    start = time.perf_counter()
+    async for _ in fn(_iter_pages(pages)):
+        levels += 1
+    duration = time.perf_counter() - start
+    print(f'{name:<10} {levels} levels in {duration:.3f}s')
+
+
+async def main() -> None:
+    pages = _create_pages()
+    print(f'{PAGES} pages of {PAGE_SIZE} items, {ITEMS_PER_LEVEL} items per level')
+    await _measure('legacy', _group_by_level_legacy, pages)
+    await _measure('current', group_by_level, pages)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
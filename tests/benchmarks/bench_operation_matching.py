@@ -0,0 +1,162 @@
+"""Compare matching of operation subgroups in an index with many handlers before and after `OperationPatternLookup` was introduced.
+
+Run with `python tests/benchmarks/bench_operation_matching.py`.
+"""
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from datetime import timezone
+from typing import Deque
+from typing import Optional
+from typing import Tuple
+from typing import cast
+
+from dipdup.config import ContractConfig
+from dipdup.config import OperationHandlerConfig
+from dipdup.config import OperationHandlerOriginationPatternConfig
+from dipdup.config import OperationHandlerTransactionPatternConfig
+from dipdup.config import OperationIndexConfig
+from dipdup.config import TzktDatasourceConfig
+from dipdup.index import MatchedOperationsT
+from dipdup.index import OperationIndex
+from dipdup.index import OperationSubgroup
+from dipdup.models import OperationData
+
+HANDLERS = 50
+SUBGROUPS = 2000
+WALLET = 'tz1cmAfyjWW3Rf3tH3M3maCpwsiAwBKbtmG4'
+
+
+class LegacyOperationIndex(OperationIndex):
+    """Implementation previously used by OperationIndex: every handler is checked with a coroutine call per operation"""
+
+    async def _match_operation_legacy(self, pattern_config, operation: OperationData) -> bool:
+        return self._match_operation(pattern_config, operation)
+
+    async def _match_operation_subgroup(self, operation_subgroup: OperationSubgroup) -> Deque[MatchedOperationsT]:
+        matched_handlers: Deque[MatchedOperationsT] = deque()
+        operations = operation_subgroup.operations
+
+        for handler_config in self._config.handlers:
+            operation_idx = 0
+            pattern_idx = 0
+            matched_operations: Deque[Optional[OperationData]] = deque()
+
+            while operation_idx < len(operations):
+                operation, pattern_config = operations[operation_idx], handler_config.pattern[pattern_idx]
+                operation_matched = await self._match_operation_legacy(pattern_config, operation)
+
+                if operation.type == 'origination' and isinstance(pattern_config, OperationHandlerOriginationPatternConfig):
+                    if operation_matched is True and pattern_config.origination_processed(cast(str, operation.originated_contract_address)):
+                        operation_matched = False
+
+                if operation_matched:
+                    matched_operations.append(operation)
+                    pattern_idx += 1
+                    operation_idx += 1
+                elif pattern_config.optional:
+                    matched_operations.append(None)
+                    pattern_idx += 1
+                else:
+                    operation_idx += 1
+
+                if pattern_idx == len(handler_config.pattern):
+                    args = await self._prepare_handler_args(handler_config, matched_operations)
+                    matched_handlers.append((operation_subgroup, handler_config, args))
+                    matched_operations.clear()
+                    pattern_idx = 0
+
+            if len(matched_operations) >= sum(0 if x.optional else 1 for x in handler_config.pattern):
+                args = await self._prepare_handler_args(handler_config, matched_operations)
+                matched_handlers.append((operation_subgroup, handler_config, args))
+
+        return matched_handlers
+
+
+def _create_config() -> OperationIndexConfig:
+    dex = ContractConfig(address='KT1BEC9uHmADgVLXCm3wxN52qJJ85ohrWEaU', typename='dex')
+    token = ContractConfig(address='KT1TwzD6zV3WeJ39ukuqxcfK2fJCnhvrdN1X', typename='token')
+    handlers = tuple(
+        OperationHandlerConfig(
+            callback=f'on_{i}',
+            pattern=(
+                OperationHandlerTransactionPatternConfig(type='transaction', destination=dex, entrypoint=f'entrypoint_{i}'),
+                OperationHandlerTransactionPatternConfig(type='transaction', destination=token, entrypoint='transfer'),
+            ),
+        )
+        for i in range(HANDLERS)
+    )
+    config = OperationIndexConfig(
+        kind='operation',
+        datasource=TzktDatasourceConfig(kind='tzkt', url='https://api.tzkt.io'),
+        handlers=handlers,
+        contracts=[dex, token],
+    )
+    config.name = 'dex'
+    return config
+
+
+def _create_subgroups(config: OperationIndexConfig) -> Tuple[OperationSubgroup, ...]:
+    dex = config.contracts[0]
+    token = config.contracts[1]
+    assert isinstance(dex, ContractConfig) and isinstance(token, ContractConfig)
+
+    def _operation(id_: int, target: str, entrypoint: str) -> OperationData:
+        return OperationData(
+            type='transaction',
+            id=id_,
+            level=1,
+            timestamp=datetime(2022, 1, 1, tzinfo=timezone.utc),
+            hash=f'op{id_}',
+            counter=id_,
+            sender_address=WALLET,
+            target_address=target,
+            initiator_address=None,
+            amount=0,
+            status='applied',
+            has_internals=False,
+            storage={},
+            entrypoint=entrypoint,
+        )
+
+    return tuple(
+        OperationSubgroup(
+            hash=f'op{i}',
+            counter=i,
+            operations=(
+                _operation(i, dex.address, f'entrypoint_{i % HANDLERS}'),
+                _operation(i, token.address, 'transfer'),
+                _operation(i, WALLET, 'default'),
+            ),
+            entrypoints=set(),
+        )
+        for i in range(SUBGROUPS)
+    )
+
+
+async def _measure(name: str, index: OperationIndex, subgroups: Tuple[OperationSubgroup, ...]) -> float:
+    async def _prepare_handler_args(handler_config, matched_operations):
+        return matched_operations
+
+    index._prepare_handler_args = _prepare_handler_args  # type: ignore[assignment]
+    matched = 0
+    start = time.perf_counter()
+    for subgroup in subgroups:
+        matched += len(await index._match_operation_subgroup(subgroup))
+    duration = time.perf_counter() - start
+    print(f'{name:<10} {matched} matches of {len(subgroups)} subgroups in {duration:.3f}s')
+    return duration
+
+
+async def main() -> None:
+    config = _create_config()
+    subgroups = _create_subgroups(config)
+    print(f'{HANDLERS} handlers, {SUBGROUPS} subgroups of 3 operations')
+    legacy = await _measure('legacy', LegacyOperationIndex(None, config, None), subgroups)  # type: ignore[arg-type]
+    current = await _measure('current', OperationIndex(None, config, None), subgroups)  # type: ignore[arg-type]
+    print(f'{legacy / current:.1f}x faster')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,251 @@
+"""Compare deserialization of demo contract storages before and after storage types were compiled into traversal plans.
+
+Run with `python tests/benchmarks/bench_storage.py`.
+"""
+import json
+import time
+from contextlib import suppress
+from datetime import datetime
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import Type
+
+from pydantic import BaseModel
+from pydantic import Extra
+
+from demo_hic_et_nunc.types.hen_minter.storage import HenMinterStorage
+from demo_hic_et_nunc.types.hen_objkts.storage import HenObjktsStorage
+from demo_quipuswap.types.quipu_fa2.storage import QuipuFa2Storage
+from demo_quipuswap.types.quipu_fa12.storage import QuipuFa12Storage
+from dipdup.datasources.tzkt.models import IntrospectionError
+from dipdup.datasources.tzkt.models import _apply_bigmap_diffs
+from dipdup.datasources.tzkt.models import _preprocess_bigmap_diffs
+from dipdup.datasources.tzkt.models import deserialize_storage
+from dipdup.datasources.tzkt.models import get_dict_value_type
+from dipdup.datasources.tzkt.models import get_list_elt_type
+from dipdup.datasources.tzkt.models import is_array_type
+from dipdup.datasources.tzkt.models import unwrap_union_type
+from dipdup.models import OperationData
+
+ROUNDS = 2000
+WALLET = 'tz1cmAfyjWW3Rf3tH3M3maCpwsiAwBKbtmG4'
+
+QUIPU_STORAGE = {
+    'baker_validator': 'KT1Pv1ryx3tRLiEbNwMwYz9spVXXjDEWsgEq',
+    'current_candidate': None,
+    'current_delegated': 'tz1Ldzz6k1BHdhuKvAtMRX7h5kJSMHESMHLC',
+    'last_update_time': '2021-06-01T00:00:00Z',
+    'last_veto': '2021-06-01T00:00:00Z',
+    'period_finish': '2021-06-02T00:00:00Z',
+    'reward': '0',
+    'reward_paid': '0',
+    'reward_per_sec': '0',
+    'reward_per_share': '0',
+    'tez_pool': '1000000',
+    'token_pool': '2000000',
+    'total_reward': '0',
+    'total_supply': '1000000',
+    'total_votes': '0',
+    'veto': '0',
+}
+QUIPU_DIFFS = (
+    {
+        'bigmap': 7,
+        'path': 'storage.ledger',
+        'action': 'update_key',
+        'content': {'key': WALLET, 'value': {'allowances': {}, 'balance': '1000', 'frozen_balance': '0'}},
+    },
+    {
+        'bigmap': 8,
+        'path': 'storage.user_rewards',
+        'action': 'update_key',
+        'content': {'key': WALLET, 'value': {'reward': '0', 'reward_paid': '0'}},
+    },
+)
+
+# NOTE: Storages and big map diffs as returned by TzKT for typical operations of demo indexes
+SAMPLES: Tuple[Tuple[str, Type[BaseModel], Any, Tuple[Dict[str, Any], ...]], ...] = (
+    (
+        'hen_minter.swap',
+        HenMinterStorage,
+        {
+            'curate': 'KT1TybhR7XraG75JFYKSrh7KnxukMBT5dor6',
+            'genesis': '2021-03-01T00:00:00Z',
+            'hdao': 'KT1AFA2mwNUMNd4SsujE1YYp29vd8BZejyKW',
+            'locked': True,
+            'manager': WALLET,
+            'metadata': 519,
+            'objkt': 'KT1RJ6PbjHpwc3M5rw5s2Nbmefwbuwbdxton',
+            'objkt_id': '152',
+            'royalties': 522,
+            'size': '0',
+            'swap_id': '1000',
+            'swaps': 523,
+        },
+        (
+            {
+                'bigmap': 523,
+                'path': 'swaps',
+                'action': 'add_key',
+                'content': {'key': '999', 'value': {'issuer': WALLET, 'objkt_amount': '1', 'objkt_id': '152', 'xtz_per_objkt': '1000000'}},
+            },
+        ),
+    ),
+    (
+        'hen_objkts.mint',
+        HenObjktsStorage,
+        {
+            'administrator': 'KT1Hkg5qeNhfwpKW4fXvq7HGZB9z2EnmCCA9',
+            'all_tokens': '153',
+            'ledger': 511,
+            'metadata': 512,
+            'operators': 513,
+            'paused': False,
+            'token_metadata': 514,
+        },
+        (
+            {
+                'bigmap': 511,
+                'path': 'ledger',
+                'action': 'add_key',
+                'content': {'key': {'address': WALLET, 'nat': '152'}, 'value': '10'},
+            },
+            {
+                'bigmap': 514,
+                'path': 'token_metadata',
+                'action': 'add_key',
+                'content': {'key': '152', 'value': {'token_id': '152', 'token_info': {'': '697066733a2f2f'}}},
+            },
+        ),
+    ),
+    (
+        'quipu_fa12.tezToTokenPayment',
+        QuipuFa12Storage,
+        {
+            'dex_lambdas': 5,
+            'metadata': 6,
+            'storage': {
+                **QUIPU_STORAGE,
+                'ledger': 7,
+                'user_rewards': 8,
+                'vetos': 9,
+                'voters': 10,
+                'votes': 11,
+                'token_address': 'KT1K9gCRgaLRFKTErYt1wVxA3Frb9FjasjTV',
+            },
+            'token_lambdas': 12,
+        },
+        QUIPU_DIFFS,
+    ),
+    (
+        'quipu_fa2.tezToTokenPayment',
+        QuipuFa2Storage,
+        {
+            'dex_lambdas': 5,
+            'metadata': 6,
+            'storage': {
+                **QUIPU_STORAGE,
+                'ledger': 7,
+                'user_rewards': 8,
+                'vetos': 9,
+                'voters': 10,
+                'votes': 11,
+                'token_address': 'KT1AFA2mwNUMNd4SsujE1YYp29vd8BZejyKW',
+                'token_id': '0',
+            },
+            'token_lambdas': 12,
+        },
+        (
+            {
+                **QUIPU_DIFFS[0],
+                'content': {'key': WALLET, 'value': {'allowances': [], 'balance': '1000', 'frozen_balance': '0'}},
+            },
+            QUIPU_DIFFS[1],
+        ),
+    ),
+)
+
+
+def _process_storage_legacy(storage: Any, storage_type: Any, bigmap_diffs: Dict[int, Any]) -> Any:
+    """Implementation previously used by `deserialize_storage`: types are introspected on every call"""
+    is_union, arg_types = unwrap_union_type(storage_type)
+    if is_union:
+        for arg_type in arg_types:
+            with suppress(*IntrospectionError):
+                return _process_storage_legacy(storage, arg_type, bigmap_diffs)
+
+    if isinstance(storage, int) and type(storage) != storage_type:
+        is_array = is_array_type(storage_type)
+        storage = _apply_bigmap_diffs(storage, bigmap_diffs, is_array)
+
+    elif isinstance(storage, list):
+        elt_type = get_list_elt_type(storage_type)
+        for i, _ in enumerate(storage):
+            storage[i] = _process_storage_legacy(storage[i], elt_type, bigmap_diffs)
+
+    elif isinstance(storage, dict):
+        ignore = getattr(getattr(storage_type, 'Config', None), 'extra', None) == Extra.ignore
+
+        for key, value in storage.items():
+            try:
+                value_type = get_dict_value_type(storage_type, key)
+                storage[key] = _process_storage_legacy(value, value_type, bigmap_diffs)
+            except IntrospectionError:
+                if not ignore:
+                    raise
+
+    return storage
+
+
+def _deserialize_storage_legacy(operation_data: OperationData, storage_type: Type[BaseModel]) -> BaseModel:
+    bigmap_diffs = _preprocess_bigmap_diffs(operation_data.diffs)
+    operation_data.storage = _process_storage_legacy(operation_data.storage, storage_type, bigmap_diffs)
+    return storage_type.parse_obj(operation_data.storage)
+
+
+def _create_operations(storage: Any, diffs: Tuple[Dict[str, Any], ...]) -> List[OperationData]:
+    # NOTE: Storage is processed in place, every call needs its own copy
+    raw_storage = json.dumps(storage)
+    return [
+        OperationData(
+            type='transaction',
+            id=i,
+            level=1,
+            timestamp=datetime(2022, 1, 1),
+            hash=f'op{i}',
+            counter=i,
+            sender_address=WALLET,
+            target_address=None,
+            initiator_address=None,
+            amount=0,
+            status='applied',
+            has_internals=False,
+            storage=json.loads(raw_storage),
+            diffs=diffs,
+        )
+        for i in range(ROUNDS)
+    ]
+
+
+def _measure(name: str, fn: Callable[[OperationData, Type[BaseModel]], BaseModel], storage_type, operations) -> Tuple[float, BaseModel]:
+    start = time.perf_counter()
+    for operation in operations:
+        result = fn(operation, storage_type)
+    duration = time.perf_counter() - start
+    print(f'{name:<40} {len(operations) / duration:>10.0f} storages/s')
+    return duration, result
+
+
+def main() -> None:
+    for name, storage_type, storage, diffs in SAMPLES:
+        legacy, legacy_result = _measure(f'{name} (legacy)', _deserialize_storage_legacy, storage_type, _create_operations(storage, diffs))
+        current, current_result = _measure(f'{name} (current)', deserialize_storage, storage_type, _create_operations(storage, diffs))
+        assert legacy_result == current_result
+        print(f'{name:<40} {legacy / current:>10.1f}x faster')
+
+
+if __name__ == '__main__':
+    main()
@@ -8,9 +8,13 @@ from unittest import IsolatedAsyncioTestCase
 from dipdup.config import ContractConfig
 from dipdup.config import DipDupConfig
 from dipdup.config import HasuraConfig
+from dipdup.config import HeadIndexConfig
 from dipdup.config import PostgresDatabaseConfig
+from dipdup.config import TokenTransferHandlerConfig
+from dipdup.config import TokenTransferIndexConfig
 from dipdup.config import TzktDatasourceConfig
 from dipdup.datasources.subscription import OriginationSubscription
+from dipdup.datasources.subscription import TokenTransferSubscription
 from dipdup.datasources.subscription import TransactionSubscription
 from dipdup.enums import OperationType
 from dipdup.exceptions import ConfigurationError
@@ -61,6 +65,69 @@ class ConfigTest(IsolatedAsyncioTestCase):
             config.indexes['hen_mainnet'].subscriptions,  # type: ignore
         )
 
+    async def test_token_transfer_filters(self) -> None:
+        config = DipDupConfig.load([self.path])
+        config.advanced.merge_subscriptions = False
+        config.indexes['hen_transfers'] = TokenTransferIndexConfig(
+            kind='token_transfer',
+            datasource='tzkt_mainnet',
+            contract='HEN_objkts',
+            handlers=(
+                TokenTransferHandlerConfig(callback='on_transfer_to_minter', to='HEN_minter'),
+                TokenTransferHandlerConfig(callback='on_token_transfer', token_id=152),
+            ),
+        )
+        config.initialize(skip_imports=True)
+
+        index_config = config.indexes['hen_transfers']
+        self.assertEqual(config.contracts['HEN_objkts'], index_config.handlers[0].contract)  # type: ignore
+        self.assertEqual(
+            {
+                TokenTransferSubscription(contract='KT1RJ6PbjHpwc3M5rw5s2Nbmefwbuwbdxton', account='KT1Hkg5qeNhfwpKW4fXvq7HGZB9z2EnmCCA9'),
+                TokenTransferSubscription(contract='KT1RJ6PbjHpwc3M5rw5s2Nbmefwbuwbdxton', token_id=152),
+            },
+            index_config.subscriptions,
+        )
+
+        config = DipDupConfig.load([self.path])
+        config.indexes['hen_transfers'] = TokenTransferIndexConfig(
+            kind='token_transfer',
+            datasource='tzkt_mainnet',
+            contract='HEN_objkts',
+            handlers=(TokenTransferHandlerConfig(callback='on_token_transfer', contract='HEN_minter'),),
+        )
+        with self.assertRaises(ConfigurationError):
+            config.initialize(skip_imports=True)
+
+    async def test_token_transfer_from_filter(self) -> None:
+        config = DipDupConfig.load([self.path])
+        config.indexes['hen_transfers'] = TokenTransferIndexConfig(
+            kind='token_transfer',
+            datasource='tzkt_mainnet',
+            handlers=(TokenTransferHandlerConfig(callback='on_token_transfer', from_='HEN_minter'),),
+        )
+        config.initialize(skip_imports=True)
+        dump = config.dump()
+        self.assertIn('from:', dump)
+        self.assertNotIn('from_:', dump)
+
+        tmp = tempfile.mkstemp()[1]
+        with open(tmp, 'w') as f:
+            f.write(dump)
+        config = DipDupConfig.load([tmp], environment=False)
+        config.initialize(skip_imports=True)
+        index_config = config.indexes['hen_transfers']
+        self.assertEqual(config.contracts['HEN_minter'], index_config.handlers[0].from_)  # type: ignore
+
+    async def test_token_transfer_hash(self) -> None:
+        # NOTE: Unset filters must not change hashes of indexes created before they were introduced
+        config = DipDupConfig.load([join(dirname(__file__), '..', '..', 'src', 'demo_tzbtc_transfers', 'dipdup.yml')])
+        config.initialize(skip_imports=True)
+        self.assertEqual(
+            '1c585bb50a8baf77575bbaa1694203ff243a1c15602586dfd895e1942adaec79',
+            config.indexes['tzbtc_holders_mainnet'].hash(),
+        )
+
     async def test_validators(self) -> None:
         with self.assertRaises(ConfigurationError):
             ContractConfig(address='KT1lalala')
@@ -68,6 +135,12 @@ class ConfigTest(IsolatedAsyncioTestCase):
             ContractConfig(address='lalalalalalalalalalalalalalalalalala')
         with self.assertRaises(ConfigurationError):
             TzktDatasourceConfig(kind='tzkt', url='not_an_url')
+        with self.assertRaises(ConfigurationError):
+            TokenTransferIndexConfig(kind='token_transfer', datasource='tzkt_mainnet', batch_levels=0)
+        with self.assertRaises(ConfigurationError):
+            TokenTransferIndexConfig(kind='token_transfer', datasource='tzkt_mainnet', batch_interval=-1)
+        with self.assertRaises(ConfigurationError):
+            HeadIndexConfig(kind='head', datasource='tzkt_mainnet', handlers=(), queue_size=-1)
 
     async def test_dump(self) -> None:
         config = DipDupConfig.load([self.path])
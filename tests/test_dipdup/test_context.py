@@ -1,10 +1,15 @@
+import asyncio
 from contextlib import AsyncExitStack
 from os.path import dirname
 from os.path import join
+from types import SimpleNamespace
 from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock
+from unittest.mock import patch
 
 from dipdup.config import DipDupConfig
 from dipdup.config import SqliteDatabaseConfig
+from dipdup.context import CallbackManager
 from dipdup.dipdup import DipDup
 from dipdup.enums import ReindexingReason
 from dipdup.exceptions import ReindexingRequiredError
@@ -56,3 +61,24 @@ class ReindexingTest(IsolatedAsyncioTestCase):
             # Assert
             schema = await Schema.filter().get()
             self.assertEqual(ReindexingReason.manual, schema.reindex)
+
+
+class CallbackManagerTest(IsolatedAsyncioTestCase):
+    async def test_run(self) -> None:
+        callbacks = CallbackManager('demo')
+        hook_called = asyncio.Event()
+        hook_config = SimpleNamespace(atomic=False, callback_fn=AsyncMock(side_effect=lambda *_: hook_called.set()))
+        ctx = SimpleNamespace(datasources={}, config=None, _callbacks=callbacks, _transactions=None)
+
+        task = asyncio.create_task(callbacks.run())
+        try:
+            with patch.object(callbacks, '_get_hook', return_value=hook_config), patch.object(callbacks, '_verify_arguments'):
+                for _ in range(2):
+                    hook_called.clear()
+                    await callbacks.fire_hook(ctx, 'on_job', wait=False)  # type: ignore[arg-type]
+                    # NOTE: Scheduled hook is awaited right away, not on the next poll
+                    await asyncio.wait_for(hook_called.wait(), 0.1)
+        finally:
+            task.cancel()
+
+        self.assertEqual(2, hook_config.callback_fn.await_count)
@@ -40,6 +40,28 @@ class MessageBufferTest(IsolatedAsyncioTestCase):
         self.assertIsInstance(messages[1], BufferedMessage)
         self.assertEqual(MessageType.operation, messages[1].type)
 
+    async def test_yield_from_unordered(self) -> None:
+        for level in (5, 3, 4, 1, 2):
+            self.buffer.add(MessageType.head, level, {'level': level})
+
+        self.assertEqual([1, 2, 3], [message.data['level'] for message in self.buffer.yield_from()])  # type: ignore
+        self.buffer.add(MessageType.head, 6, {'level': 6})
+        self.assertEqual([4], [message.data['level'] for message in self.buffer.yield_from()])  # type: ignore
+        self.assertEqual(2, len(self.buffer))
+
+    async def test_item_count(self) -> None:
+        self.buffer.add(MessageType.head, 1, {})
+        self.buffer.add(MessageType.operation, 1, [{}, {}])
+        self.buffer.add(MessageType.operation, 2, [{}])
+        self.buffer.add(MessageType.operation, 3, [{}, {}, {}])
+        self.assertEqual(1 + 2 + 1 + 3, self.buffer.item_count)
+
+        self.assertEqual(True, self.buffer.rollback(MessageType.operation, 3, 2))
+        self.assertEqual(1 + 2 + 1, self.buffer.item_count)
+
+        list(self.buffer.yield_from())
+        self.assertEqual(1, self.buffer.item_count)
+
     async def test_rollback(self) -> None:
         self.buffer.add(MessageType.head, 2, {})
         self.buffer.add(MessageType.operation, 2, [{}])
@@ -54,3 +76,13 @@ class MessageBufferTest(IsolatedAsyncioTestCase):
         self.assertEqual(True, self.buffer.rollback(MessageType.head, 3, 1))
         self.assertEqual(False, self.buffer.rollback(MessageType.operation, 1, 0))
         self.assertEqual(False, self.buffer.rollback(MessageType.head, 1, 0))
+
+    async def test_rollback_multiple_messages(self) -> None:
+        self.buffer.add(MessageType.operation, 2, [{}])
+        self.buffer.add(MessageType.operation, 2, [{}])
+        self.buffer.add(MessageType.head, 2, {})
+
+        self.assertEqual(True, self.buffer.rollback(MessageType.operation, 2, 1))
+        self.buffer.add(MessageType.head, 3, {})
+        self.buffer.add(MessageType.head, 4, {})
+        self.assertEqual([MessageType.head], [message.type for message in self.buffer.yield_from()])
@@ -0,0 +1,357 @@
+import asyncio
+from datetime import datetime
+from datetime import timezone
+from types import SimpleNamespace
+from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+from typing import cast
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from dipdup.datasources.tzkt.datasource import TARGET_PAGE_PAYLOAD
+from dipdup.datasources.tzkt.datasource import AdaptiveBatchSize
+from dipdup.datasources.tzkt.datasource import OperationFetcher
+from dipdup.datasources.tzkt.datasource import TzktDatasource
+from dipdup.datasources.tzkt.datasource import fetch_operations_by_level_concurrently
+from dipdup.datasources.tzkt.datasource import group_by_level
+from dipdup.datasources.tzkt.datasource import prefetch_pages
+from dipdup.datasources.tzkt.datasource import split_level_range
+from dipdup.models import OperationData
+from dipdup.prometheus import Metrics
+from dipdup.prometheus import _datasource_fetch_buffer
+
+
+def _operation(id_: int, level: int, sender: str, target: Optional[str], type_: str = 'transaction', **kwargs: Any) -> OperationData:
+    return OperationData(
+        type=type_,
+        id=id_,
+        level=level,
+        timestamp=datetime(2022, 1, 1, tzinfo=timezone.utc),
+        hash=f'op{id_}',
+        counter=id_,
+        sender_address=sender,
+        target_address=target,
+        initiator_address=None,
+        amount=None,
+        status='applied',
+        has_internals=False,
+        storage={},
+        **kwargs,
+    )
+
+
+CONTRACT = 'KT1BEC9uHmADgVLXCm3wxN52qJJ85ohrWEaU'
+WALLET = 'tz1cmAfyjWW3Rf3tH3M3maCpwsiAwBKbtmG4'
+
+# NOTE: Two operations per level, five levels; some operations are returned by both sender and target requests
+target_operations = tuple(_operation(i, 100 + (i - 1) // 2, WALLET, CONTRACT) for i in range(1, 11))
+sender_operations = tuple(_operation(i, 100 + (i - 1) // 2, CONTRACT, CONTRACT) for i in range(2, 11, 3))
+
+
+def _create_datasource(limit: int, prefetch_depth: int) -> MagicMock:
+    async def get_transactions(field: str, addresses, first_level: int, last_level: int, offset: int = 0, limit: int = limit):
+        operations = target_operations if field == 'target' else sender_operations
+        return tuple(op for op in operations if op.id > offset and first_level <= op.level <= last_level)[:limit]
+
+    datasource = MagicMock()
+    datasource.name = 'tzkt'
+    datasource.request_limit = limit
+    datasource.prefetch_depth = prefetch_depth
+    datasource.get_transactions = AsyncMock(side_effect=get_transactions)
+    datasource.get_originations = AsyncMock(return_value=())
+    return datasource
+
+
+async def _fetch_all(datasource: MagicMock, partitions: int = 1) -> Tuple[Tuple[int, Tuple[int, ...]], ...]:
+    fetchers = tuple(
+        OperationFetcher(
+            datasource=datasource,
+            first_level=first_level,
+            last_level=last_level,
+            transaction_addresses={CONTRACT},
+            origination_addresses=set(),
+        )
+        for first_level, last_level in split_level_range(95, 110, partitions)
+    )
+    result = []
+    async for level, operations in fetch_operations_by_level_concurrently(fetchers):
+        result.append((level, tuple(op.id for op in operations)))
+    return tuple(result)
+
+
+class OperationFetcherTest(IsolatedAsyncioTestCase):
+    async def test_fetch_operations_by_level(self) -> None:
+        levels = await _fetch_all(_create_datasource(limit=3, prefetch_depth=0))
+        self.assertEqual(
+            (
+                (100, (1, 2)),
+                (101, (3, 4)),
+                (102, (5, 6)),
+                (103, (7, 8)),
+                (104, (9, 10)),
+            ),
+            levels,
+        )
+
+    async def test_fetch_operations_by_level_prefetch(self) -> None:
+        expected = await _fetch_all(_create_datasource(limit=3, prefetch_depth=0))
+        for depth in (1, 2, 10):
+            levels = await _fetch_all(_create_datasource(limit=3, prefetch_depth=depth))
+            self.assertEqual(expected, levels)
+
+    async def test_fetch_operations_by_level_partitioned(self) -> None:
+        expected = await _fetch_all(_create_datasource(limit=3, prefetch_depth=0))
+        for partitions in (2, 3, 7, 100):
+            for depth in (0, 2):
+                levels = await _fetch_all(_create_datasource(limit=3, prefetch_depth=depth), partitions)
+                self.assertEqual(expected, levels)
+
+    async def test_fetch_originations(self) -> None:
+        addresses = tuple(f'KT1{i:033}' for i in range(250))
+        originations = tuple(
+            _operation(i, 100 + i // 10, WALLET, None, type_='origination', originated_contract_address=address)
+            for i, address in enumerate(addresses, start=1)
+        )
+
+        async def get_originations(addresses, first_level: int, last_level: int, offset: int = 0, limit: int = 7):
+            self.assertLessEqual(len(addresses), 100)
+            return tuple(op for op in originations if op.id > offset and op.originated_contract_address in addresses)[:limit]
+
+        datasource = _create_datasource(limit=7, prefetch_depth=0)
+        datasource.get_originations = AsyncMock(side_effect=get_originations)
+        fetcher = OperationFetcher(
+            datasource=datasource,
+            first_level=0,
+            last_level=200,
+            transaction_addresses=set(),
+            origination_addresses=set(addresses),
+        )
+
+        levels = []
+        async for level, operations in fetcher.fetch_operations_by_level():
+            levels.append(level)
+            self.assertTrue(all(op.level == level for op in operations))
+            self.assertEqual(sorted(op.id for op in operations), [op.id for op in operations])
+        self.assertEqual(sorted(set(levels)), levels)
+        self.assertEqual(list(range(100, 126)), levels)
+
+    async def test_fetch_originations_lagging_chunks(self) -> None:
+        addresses = tuple(f'KT1{i:033}' for i in range(200))
+        # NOTE: The first chunk of addresses lags behind the second one
+        levels = tuple(100 + i // 10 for i in range(100)) + tuple(200 + i // 50 for i in range(100))
+        originations = tuple(
+            _operation(i, level, WALLET, None, type_='origination', originated_contract_address=address)
+            for i, (level, address) in enumerate(zip(levels, addresses), start=1)
+        )
+        requested = []
+
+        async def get_originations(addresses, first_level: int, last_level: int, offset: int = 0, limit: int = 7):
+            requested.append(min(addresses))
+            return tuple(op for op in originations if op.id > offset and op.originated_contract_address in addresses)[:limit]
+
+        datasource = _create_datasource(limit=7, prefetch_depth=0)
+        datasource.get_originations = AsyncMock(side_effect=get_originations)
+        fetcher = OperationFetcher(
+            datasource=datasource,
+            first_level=0,
+            last_level=300,
+            transaction_addresses=set(),
+            origination_addresses=set(addresses),
+        )
+
+        fetched_levels = [level async for level, _ in fetcher.fetch_operations_by_level()]
+        self.assertEqual([*range(100, 110), 200, 201], fetched_levels)
+        # NOTE: The second chunk is requested once, then again only after the first one is exhausted
+        self.assertEqual([addresses[0], addresses[100]], requested[:2])
+        self.assertEqual({addresses[0]}, set(requested[2:16]))
+        self.assertEqual(addresses[100], requested[16])
+
+    def test_split_level_range(self) -> None:
+        self.assertEqual(((100, 200),), split_level_range(100, 200, 1))
+        self.assertEqual(((100, 133), (134, 167), (168, 200)), split_level_range(100, 200, 3))
+        self.assertEqual(((100, 100), (101, 101)), split_level_range(100, 101, 8))
+        self.assertEqual(((100, 100),), split_level_range(100, 100, 4))
+
+    async def test_get_originations_chunks(self) -> None:
+        addresses = {f'KT{i:03}' for i in range(250)}
+
+        async def request(method: str, url: str, params: Dict[str, Any]):
+            ids = sorted(int(address[2:]) for address in params['originatedContract.in'].split(','))
+            return [{'id': id_} for id_ in ids if id_ > params['offset.cr']][: params['limit']]
+
+        datasource = TzktDatasource('https://api.tzkt.io')
+        datasource.request = AsyncMock(side_effect=request)  # type: ignore
+        datasource.convert_operation = lambda operation_json, type_: SimpleNamespace(**operation_json)  # type: ignore
+
+        originations = await datasource.get_originations(addresses, 0, 100, offset=95, limit=10)
+        self.assertEqual(list(range(96, 106)), [op.id for op in originations])
+        self.assertEqual(3, datasource.request.await_count)  # type: ignore
+
+
+class GroupByLevelTest(IsolatedAsyncioTestCase):
+    async def test_group_by_level(self) -> None:
+        levels = (1, 1, 1, 2, 3, 3, 5, 5, 5, 5, 5, 6, 7, 7)
+        items = tuple(_operation(i, level, WALLET, CONTRACT) for i, level in enumerate(levels, start=1))
+        expected = tuple((level, tuple(op.id for op in items if op.level == level)) for level in sorted(set(levels)))
+
+        async def batches(size: int):
+            for i in range(0, len(items), size):
+                yield items[i : i + size]
+            yield ()
+
+        for size in range(1, len(items) + 1):
+            result = []
+            async for level, level_items in group_by_level(batches(size)):
+                result.append((level, tuple(op.id for op in level_items)))
+            self.assertEqual(expected, tuple(result), size)
+
+
+class PrefetchPagesTest(IsolatedAsyncioTestCase):
+    async def test_backpressure(self) -> None:
+        fetched = []
+
+        async def pages():
+            for i in range(10):
+                fetched.append(i)
+                yield i
+
+        iterator = prefetch_pages(pages(), 2, 'test')
+        self.assertEqual(0, await iterator.__anext__())
+        await asyncio.sleep(0.1)
+
+        # NOTE: One page is consumed, two are in queue and the last one is waiting to be put
+        self.assertEqual([0, 1, 2, 3], fetched)
+        await iterator.aclose()
+
+    async def test_fetch_buffer_metric(self) -> None:
+        async def pages():
+            for i in range(10):
+                yield i
+
+        gauge = _datasource_fetch_buffer.labels(datasource='test_metric')
+        with patch.object(Metrics, 'enabled', True):
+            iterator = prefetch_pages(pages(), 2, 'test_metric')
+            await iterator.__anext__()
+            await asyncio.sleep(0.1)
+            self.assertEqual(2, gauge._value.get())
+
+            # NOTE: Pages left in queue are released when consumer exits early
+            await iterator.aclose()
+            self.assertEqual(0, gauge._value.get())
+
+    async def test_exception(self) -> None:
+        async def pages():
+            yield 1
+            raise ValueError('boom')
+
+        result = []
+        with self.assertRaises(ValueError):
+            async for page in prefetch_pages(pages(), 2, 'test'):
+                result.append(page)
+        self.assertEqual([1], result)
+
+
+class BigMapKeysTest(IsolatedAsyncioTestCase):
+    async def test_iter_big_map_keys(self) -> None:
+        big_maps = {1: 7, 2: 0, 3: 3, 4: 12}
+        in_flight, max_in_flight = 0, 0
+
+        async def get_big_map(big_map_id: int, level: int, active: bool, offset: int, limit: int):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(in_flight, max_in_flight)
+            try:
+                await asyncio.sleep(0.01)
+            finally:
+                in_flight -= 1
+            keys = tuple({'id': big_map_id * 100 + i} for i in range(big_maps[big_map_id]))
+            return keys[offset : offset + limit]
+
+        datasource = TzktDatasource('https://api.tzkt.io')
+        datasource._http_config.batch_size = 3
+        datasource.get_big_map = AsyncMock(side_effect=get_big_map)  # type: ignore
+
+        for concurrency in (1, 2, 5):
+            in_flight, max_in_flight = 0, 0
+            result: Dict[int, Tuple[int, ...]] = {}
+            async for big_map_id, keys in datasource.iter_big_map_keys(tuple(big_maps), 100, concurrency=concurrency):
+                self.assertTrue(0 < len(keys) <= 3)
+                result[big_map_id] = result.get(big_map_id, ()) + tuple(key['id'] for key in keys)
+
+            self.assertEqual({i: tuple(i * 100 + j for j in range(n)) for i, n in big_maps.items() if n}, result)
+            self.assertLessEqual(max_in_flight, concurrency)
+            if concurrency > 1:
+                self.assertGreater(max_in_flight, 1)
+
+
+class AdaptiveBatchSizeTest(IsolatedAsyncioTestCase):
+    async def test_observe(self) -> None:
+        batch_size = AdaptiveBatchSize(1000, 100, 5000)
+
+        # NOTE: Fast full pages grow the size up to upper bound
+        batch_size.observe(1000, 1000, 0.1, 1024)
+        self.assertEqual(2000, batch_size.size)
+        batch_size.observe(2000, 2000, 0.1, 1024)
+        batch_size.observe(4000, 4000, 0.1, 1024)
+        self.assertEqual(5000, batch_size.size)
+
+        # NOTE: Partial page can't grow the size, dead band is ignored
+        batch_size = AdaptiveBatchSize(1000, 100, 5000)
+        batch_size.observe(1000, 10, 0.1, 1024)
+        batch_size.observe(1000, 1000, 0.9, 1024)
+        self.assertEqual(1000, batch_size.size)
+
+        # NOTE: Slow or large pages shrink the size down to lower bound
+        batch_size.observe(1000, 10, 4.0, 1024)
+        self.assertEqual(500, batch_size.size)
+        batch_size.observe(500, 500, 0.1, TARGET_PAGE_PAYLOAD * 4)
+        self.assertEqual(250, batch_size.size)
+        for _ in range(5):
+            batch_size.observe(batch_size.size, batch_size.size, 10.0, 1024)
+        self.assertEqual(100, batch_size.size)
+        self.assertEqual(9, len(batch_size.durations))
+
+    async def test_request_page_payload(self) -> None:
+        datasource = TzktDatasource('https://api.tzkt.io', adaptive_batch_size=True, min_batch_size=10, max_batch_size=1000)
+        batch_size = cast(AdaptiveBatchSize, datasource._batch_size)
+        batch_size._size = 100
+        shared = False
+
+        async def request(method: str, url: str, weight: int = 1, payload_callback=None, **kwargs: Any):
+            # NOTE: Identical in-flight request was sent by someone else
+            if payload_callback and not shared:
+                payload_callback(TARGET_PAGE_PAYLOAD * 4)
+            return [{}] * kwargs['params']['limit']
+
+        datasource._http.request = AsyncMock(side_effect=request)  # type: ignore
+        await datasource._request_page('get', 'v1/operations/transactions', params={'limit': 100})
+        self.assertEqual(50, batch_size.size)
+
+        shared = True
+        await datasource._request_page('get', 'v1/operations/transactions', params={'limit': 50})
+        self.assertEqual(50, batch_size.size)
+
+    async def test_iter_batches(self) -> None:
+        items = tuple({'id': i} for i in range(1, 1001))
+        datasource = TzktDatasource('https://api.tzkt.io', adaptive_batch_size=True, min_batch_size=10, max_batch_size=100)
+        batch_size = cast(AdaptiveBatchSize, datasource._batch_size)
+        limits = []
+
+        async def get_items(offset: int, limit: int):
+            limits.append(limit)
+            # NOTE: Pretend page was fetched too fast; request limit changes between pages
+            batch_size._size = 10 + len(limits) * 7
+            return items[offset : offset + limit]
+
+        for cursor in (False, True):
+            limits.clear()
+            batch_size._size = 10
+            result = []
+            async for batch in datasource._iter_batches(get_items, cursor=cursor):
+                result.extend(batch)
+            self.assertEqual(items, tuple(result))
+            self.assertEqual(len(set(limits)), len(limits))
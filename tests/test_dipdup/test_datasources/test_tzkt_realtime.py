@@ -0,0 +1,145 @@
+import asyncio
+import json
+from contextlib import suppress
+from typing import Any
+from typing import Dict
+from typing import List
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from aiohttp import WSMsgType
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from dipdup.datasources.subscription import HeadSubscription
+from dipdup.datasources.tzkt.datasource import TzktDatasource
+from dipdup.datasources.tzkt.enums import TzktMessageType
+from dipdup.enums import MessageType
+from dipdup.models import HeadBlockData
+from dipdup.prometheus import Metrics
+from dipdup.prometheus import _datasource_realtime_blocked
+
+LEVELS = 200
+RECORD_SEPARATOR = chr(0x1E)
+
+
+def _head_message(level: int) -> Dict[str, Any]:
+    timestamp = '2022-01-01T00:00:00Z'
+    quotes = {f'quote{currency}': '1' for currency in ('Btc', 'Eur', 'Usd', 'Cny', 'Jpy', 'Krw', 'Eth', 'Gbp')}
+    data = {
+        'chain': 'mainnet',
+        'chainId': 'NetXdQprcVkpaWU',
+        'cycle': 1,
+        'level': level,
+        'hash': f'block{level}',
+        'protocol': 'PtJakart2xVj7pYXJBXrqHgd82rdkLey5ZeeGikDRPJP6d7Ed5S',
+        'nextProtocol': 'PtJakart2xVj7pYXJBXrqHgd82rdkLey5ZeeGikDRPJP6d7Ed5S',
+        'timestamp': timestamp,
+        'votingEpoch': 1,
+        'votingPeriod': 1,
+        'knownLevel': level,
+        'lastSync': timestamp,
+        'synced': True,
+        'quoteLevel': level,
+        **quotes,
+    }
+    return {'type': TzktMessageType.DATA.value, 'state': level, 'data': data}
+
+
+def _create_app() -> web.Application:
+    """Minimal SignalR server sending a burst of head messages right after handshake"""
+
+    async def _negotiate(request: web.Request) -> web.Response:
+        return web.json_response({'connectionId': 'test', 'availableTransports': []})
+
+    async def _events(request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        request.app['websockets'].append(ws)
+        await ws.receive()
+        await ws.send_str('{}' + RECORD_SEPARATOR)
+
+        for level in range(1, LEVELS + 1):
+            message = {'type': 1, 'target': 'head', 'arguments': [_head_message(level)]}
+            await ws.send_str(json.dumps(message) + RECORD_SEPARATOR)
+
+        while (await ws.receive()).type not in (WSMsgType.CLOSE, WSMsgType.CLOSING, WSMsgType.CLOSED):
+            pass
+        return ws
+
+    app = web.Application()
+    app['websockets'] = []
+    app.router.add_post('/v1/events/negotiate', _negotiate)
+    app.router.add_get('/v1/events', _events)
+    return app
+
+
+class RealtimeQueueTest(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.server = TestServer(_create_app())
+        await self.server.start_server()
+
+    async def asyncTearDown(self) -> None:
+        for ws in self.server.app['websockets']:
+            await ws.close()
+        await self.server.close()
+
+    async def _run(self, datasource: TzktDatasource) -> List[int]:
+        """Run datasource until every head is processed by slow callback, return levels of processed heads"""
+        heads: List[int] = []
+        processed = asyncio.Event()
+
+        async def _on_head(_, head: HeadBlockData) -> None:
+            await asyncio.sleep(0.001)
+            heads.append(head.level)
+            if len(heads) == LEVELS:
+                processed.set()
+
+        datasource.call_on_head(_on_head)
+        datasource.set_sync_level(HeadSubscription(), 1)
+        task = asyncio.create_task(datasource.run())
+        try:
+            await asyncio.wait_for(processed.wait(), 10)
+        finally:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        return heads
+
+    async def test_burst(self) -> None:
+        datasource = TzktDatasource(str(self.server.make_url('')).rstrip('/'))
+        receive_message = datasource._receive_message
+        processed_on_receive: List[int] = []
+
+        async def _receive_message(*args) -> None:
+            await receive_message(*args)
+            processed_on_receive.append(LEVELS - datasource._realtime_queue.qsize())
+
+        with patch.object(datasource, '_receive_message', _receive_message):
+            heads = await self._run(datasource)
+
+        self.assertEqual(list(range(1, LEVELS + 1)), heads)
+        # NOTE: Whole burst was read from socket while callbacks were still running
+        self.assertEqual(LEVELS, len(processed_on_receive))
+        self.assertLess(processed_on_receive[-1], LEVELS / 2)
+
+    async def test_full_queue(self) -> None:
+        with patch('dipdup.datasources.tzkt.datasource.REALTIME_QUEUE_SIZE', 10):
+            datasource = TzktDatasource(str(self.server.make_url('')).rstrip('/'))
+        blocked = _datasource_realtime_blocked.labels(datasource=datasource.name)._value.get()
+
+        with patch.object(Metrics, 'enabled', True):
+            heads = await self._run(datasource)
+
+        # NOTE: Receive loop waits for processing instead of dropping messages
+        self.assertEqual(list(range(1, LEVELS + 1)), heads)
+        self.assertGreater(_datasource_realtime_blocked.labels(datasource=datasource.name)._value.get(), blocked)
+
+    async def test_disconnect(self) -> None:
+        datasource = TzktDatasource(str(self.server.make_url('')).rstrip('/'))
+        for level in range(1, 4):
+            await datasource._receive_message(MessageType.head, [_head_message(level)])
+
+        # NOTE: Messages of the lost connection are not processed after reconnect
+        await datasource._on_disconnected()
+        self.assertTrue(datasource._realtime_queue.empty())
@@ -1,18 +1,47 @@
+from collections import deque
 from contextlib import AsyncExitStack
 from datetime import datetime
 from os.path import dirname
 from os.path import join
+from types import SimpleNamespace
+from typing import Optional
+from typing import cast
 from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock
+from unittest.mock import patch
 
 from pytz import UTC
+from tortoise import Tortoise
 
+from dipdup.config import BigMapHandlerConfig
+from dipdup.config import BigMapIndexConfig
+from dipdup.config import ContractConfig
 from dipdup.config import DipDupConfig
+from dipdup.config import OperationHandlerConfig
+from dipdup.config import OperationHandlerOriginationPatternConfig
+from dipdup.config import OperationHandlerTransactionPatternConfig
+from dipdup.config import OperationIndexConfig
+from dipdup.config import TokenTransferHandlerConfig
+from dipdup.config import TokenTransferIndexConfig
+from dipdup.config import TzktDatasourceConfig
 from dipdup.context import pending_indexes
+from dipdup.datasources.tzkt.datasource import TzktDatasource
 from dipdup.dipdup import IndexDispatcher
 from dipdup.enums import IndexStatus
 from dipdup.enums import IndexType
 from dipdup.exceptions import ReindexingRequiredError
+from dipdup.index import BigMapIndex
+from dipdup.index import ContractHashCache
+from dipdup.index import OperationIndex
+from dipdup.index import TokenTransferIndex
+from dipdup.models import BigMapAction
+from dipdup.models import BigMapData
+from dipdup.models import ContractHash
 from dipdup.models import Index
+from dipdup.models import OperationData
+from dipdup.models import TokenTransferData
+from dipdup.utils.database import get_connection
+from dipdup.utils.database import get_schema_hash
 from tests.test_dipdup import create_test_dipdup
 
 
@@ -55,6 +84,7 @@ class IndexStateTest(IsolatedAsyncioTestCase):
             # Assert
             index = await Index.filter().get()
             self.assertEqual(self.new_hash, index.config_hash)
+            self.assertTrue(dispatcher._wakeup.is_set())
 
     async def test_new_hash(self) -> None:
         async with AsyncExitStack() as stack:
@@ -80,3 +110,223 @@ class IndexStateTest(IsolatedAsyncioTestCase):
             # Act, Assert
             with self.assertRaises(ReindexingRequiredError):
                 await dispatcher._load_index_states()
+
+
+class SyncWindowTest(IsolatedAsyncioTestCase):
+    async def test_resume_from_last_committed_window(self) -> None:
+        config = DipDupConfig.load([join(dirname(__file__), '..', 'integration_tests', 'hic_et_nunc.yml')])
+        async with AsyncExitStack() as stack:
+            dipdup = await create_test_dipdup(config, stack)
+            dispatcher = IndexDispatcher(dipdup._ctx)
+            await spawn_index(dispatcher, 'hen_mainnet')
+            index = dispatcher._indexes['hen_mainnet']
+
+            async def _call_matched_handlers(matched_handlers) -> None:
+                if 5 in matched_handlers:
+                    raise RuntimeError('Handler failed')
+
+            async def _matched_levels():
+                for level in range(1365001, 1365011):
+                    yield level, deque((level - 1365000,))
+
+            index._call_matched_handlers = _call_matched_handlers  # type: ignore
+            with self.assertRaises(RuntimeError):
+                await index._process_matched_levels(_matched_levels(), 1366000, 3)
+
+            # NOTE: Levels 1365004-1365006 were processed in the failed transaction
+            state = await Index.filter(name='hen_mainnet').get()
+            self.assertEqual(1365003, state.level)
+
+
+class ContractHashCacheTest(IsolatedAsyncioTestCase):
+    async def asyncTearDown(self) -> None:
+        ContractHashCache.clear()
+
+    async def test_contract_hashes(self) -> None:
+        config = DipDupConfig.load([join(dirname(__file__), '..', 'integration_tests', 'hic_et_nunc.yml')])
+        async with AsyncExitStack() as stack:
+            await create_test_dipdup(config, stack)
+            datasource = SimpleNamespace(
+                get_contract_hashes=AsyncMock(
+                    return_value={
+                        'KT1Hkg5qeNhfwpKW4fXvq7HGZB9z2EnmCCA9': (1, 2),
+                        'KT1RJ6PbjHpwc3M5rw5s2Nbmefwbuwbdxton': (3, 4),
+                    }
+                )
+            )
+
+            # NOTE: Unknown contracts are fetched in a single request and stored in the database
+            tzkt = cast(TzktDatasource, datasource)
+            await ContractHashCache.prefetch(tzkt, ('KT1Hkg5qeNhfwpKW4fXvq7HGZB9z2EnmCCA9', 'KT1RJ6PbjHpwc3M5rw5s2Nbmefwbuwbdxton'))
+            await ContractHashCache.prefetch(tzkt, ('KT1Hkg5qeNhfwpKW4fXvq7HGZB9z2EnmCCA9',))
+            datasource.get_contract_hashes.assert_awaited_once_with(
+                {'KT1Hkg5qeNhfwpKW4fXvq7HGZB9z2EnmCCA9', 'KT1RJ6PbjHpwc3M5rw5s2Nbmefwbuwbdxton'}
+            )
+            self.assertEqual(2, await ContractHash.all().count())
+
+            # NOTE: Hashes are shared between indexes and survive restart
+            ContractHashCache.clear()
+            await ContractHashCache.initialize()
+            indexes = (
+                OperationIndex(None, config.indexes['hen_mainnet'], datasource),  # type: ignore
+                OperationIndex(None, config.indexes['hen_mainnet'], datasource),  # type: ignore
+            )
+            for index in indexes:
+                self.assertEqual((1, 2), await index._get_contract_hashes('KT1Hkg5qeNhfwpKW4fXvq7HGZB9z2EnmCCA9'))
+            datasource.get_contract_hashes.assert_awaited_once()
+
+    async def test_schema_hash(self) -> None:
+        config = DipDupConfig.load([join(dirname(__file__), '..', 'integration_tests', 'hic_et_nunc.yml')])
+        async with AsyncExitStack() as stack:
+            await create_test_dipdup(config, stack)
+            conn = get_connection()
+            schema_hash = get_schema_hash(conn)
+            self.assertIn('ContractHash', Tortoise.apps['int_models'])
+
+            # NOTE: Databases created before `dipdup_contract_hash` table was added don't require reindexing
+            with patch.dict(Tortoise.apps['int_models']):
+                del Tortoise.apps['int_models']['ContractHash']
+                self.assertEqual(schema_hash, get_schema_hash(conn))
+                del Tortoise.apps['int_models']['Contract']
+                self.assertNotEqual(schema_hash, get_schema_hash(conn))
+
+
+class IndexRoutingTest(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.datasource = SimpleNamespace(name='tzkt_mainnet')
+        self.datasource_config = TzktDatasourceConfig(kind='tzkt', url='https://api.tzkt.io')
+        self.dispatcher = IndexDispatcher(None)  # type: ignore
+        self.dex = ContractConfig(address='KT1BEC9uHmADgVLXCm3wxN52qJJ85ohrWEaU')
+        self.token = ContractConfig(address='KT1TwzD6zV3WeJ39ukuqxcfK2fJCnhvrdN1X')
+        self.wallet = 'tz1cmAfyjWW3Rf3tH3M3maCpwsiAwBKbtmG4'
+
+    def _add_index(self, index_cls, config):
+        config.name = f'index_{len(self.dispatcher._indexes)}'
+        index = index_cls(None, config, self.datasource)
+        self.dispatcher._indexes[config.name] = index
+        self.dispatcher._add_routes(index)
+        return index
+
+    def _operation(self, id_: int, type_: str, target: Optional[str], entrypoint: Optional[str] = None) -> OperationData:
+        return OperationData(
+            type=type_,
+            id=id_,
+            level=1,
+            timestamp=datetime(2022, 1, 1, tzinfo=UTC),
+            hash=f'op{id_}',
+            counter=id_,
+            sender_address=self.wallet,
+            target_address=target,
+            initiator_address=None,
+            amount=0,
+            status='applied',
+            has_internals=False,
+            storage={},
+            entrypoint=entrypoint,
+        )
+
+    async def test_on_operations(self) -> None:
+        def _config(*pattern) -> OperationIndexConfig:
+            return OperationIndexConfig(
+                kind='operation',
+                datasource=self.datasource_config,
+                handlers=(OperationHandlerConfig(callback='on_operation', pattern=pattern),),
+            )
+
+        swaps = self._add_index(
+            OperationIndex,
+            _config(OperationHandlerTransactionPatternConfig(type='transaction', destination=self.dex, entrypoint='swap')),
+        )
+        transfers = self._add_index(
+            OperationIndex,
+            _config(OperationHandlerTransactionPatternConfig(type='transaction', destination=self.token, entrypoint='transfer')),
+        )
+        originations = self._add_index(OperationIndex, _config(OperationHandlerOriginationPatternConfig(originated_contract=self.token)))
+        unmatched = (self._operation(6, 'transaction', self.dex.address, 'default'),)
+        await self.dispatcher._on_operations(self.datasource, unmatched)  # type: ignore
+        self.assertFalse(self.dispatcher._wakeup.is_set())
+        # NOTE: Indexes without routed operations still bump their level
+        self.assertEqual([1, 1, 1], [i._pushed_level for i in (swaps, transfers, originations)])
+
+        operations = (
+            self._operation(1, 'transaction', self.dex.address, 'swap'),
+            self._operation(2, 'transaction', self.token.address, 'transfer'),
+            self._operation(3, 'transaction', self.dex.address, 'transfer'),
+            self._operation(4, 'origination', None),
+            self._operation(5, 'transaction', self.token.address, 'transfer'),
+        )
+        await self.dispatcher._on_operations(self.datasource, operations)  # type: ignore
+        await self.dispatcher._on_operations(self.datasource, operations[2:3])  # type: ignore
+
+        def _queued(index: OperationIndex):
+            return [tuple(s.operations[0].id for s in message) for message in index._queue]
+
+        self.assertEqual([(1,)], _queued(swaps))
+        self.assertEqual([(2, 5)], _queued(transfers))
+        self.assertEqual([(4,)], _queued(originations))
+
+        # NOTE: Dispatcher loop is woken up, indexes remember when their oldest message was received
+        self.assertTrue(self.dispatcher._wakeup.is_set())
+        self.assertIsNotNone(swaps._queued_at)
+
+    async def test_on_big_maps(self) -> None:
+        def _config(contract: ContractConfig, path: str) -> BigMapIndexConfig:
+            return BigMapIndexConfig(
+                kind='big_map',
+                datasource=self.datasource_config,
+                handlers=(BigMapHandlerConfig(callback='on_update', contract=contract, path=path),),
+            )
+
+        def _big_map(id_: int, address: str, path: str) -> BigMapData:
+            return BigMapData(
+                id=id_,
+                level=1,
+                operation_id=id_,
+                timestamp=datetime(2022, 1, 1, tzinfo=UTC),
+                bigmap=id_,
+                contract_address=address,
+                path=path,
+                action=BigMapAction.ADD_KEY,
+                active=True,
+            )
+
+        ledger = self._add_index(BigMapIndex, _config(self.token, 'ledger'))
+        pools = self._add_index(BigMapIndex, _config(self.dex, 'pools'))
+
+        big_maps = (
+            _big_map(1, self.token.address, 'ledger'),
+            _big_map(2, self.dex.address, 'ledger'),
+            _big_map(3, self.token.address, 'ledger'),
+        )
+        await self.dispatcher._on_big_maps(self.datasource, big_maps)  # type: ignore
+
+        self.assertEqual([(1, 3)], [tuple(b.id for b in message) for message in ledger._queue])
+        self.assertEqual([], list(pools._queue))
+
+    async def test_on_token_transfers(self) -> None:
+        def _config(contract: Optional[ContractConfig]) -> TokenTransferIndexConfig:
+            return TokenTransferIndexConfig(
+                kind='token_transfer',
+                datasource=self.datasource_config,
+                handlers=(TokenTransferHandlerConfig(callback='on_transfer', contract=contract),),
+            )
+
+        def _transfer(id_: int, contract: str) -> TokenTransferData:
+            return TokenTransferData(
+                id=id_,
+                level=1,
+                timestamp=datetime(2022, 1, 1, tzinfo=UTC),
+                tzkt_token_id=id_,
+                contract_address=contract,
+            )
+
+        token_transfers = self._add_index(TokenTransferIndex, _config(self.token))
+        dex_transfers = self._add_index(TokenTransferIndex, _config(self.dex))
+        all_transfers = self._add_index(TokenTransferIndex, _config(None))
+
+        transfers = (_transfer(1, self.token.address), _transfer(2, self.wallet), _transfer(3, self.token.address))
+        await self.dispatcher._on_token_transfers(self.datasource, transfers)  # type: ignore
+
+        self.assertEqual([(1, 3)], [tuple(t.id for t in message) for message in token_transfers._queue])
+        self.assertEqual([], list(dex_transfers._queue))
+        self.assertEqual([(1, 2, 3)], [tuple(t.id for t in message) for message in all_transfers._queue])
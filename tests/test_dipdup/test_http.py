@@ -0,0 +1,136 @@
+import asyncio
+import os
+from tempfile import TemporaryDirectory
+from typing import Any
+from typing import List
+from unittest import IsolatedAsyncioTestCase
+from unittest import TestCase
+from unittest.mock import AsyncMock
+
+from dipdup.config import HTTPConfig
+from dipdup.datasources.tzkt.datasource import TzktDatasource
+from dipdup.http import ResponseCache
+from dipdup.http import _HTTPGateway
+
+
+class _FakeGateway(_HTTPGateway):
+    def __init__(self) -> None:
+        super().__init__('https://api.tzkt.io', HTTPConfig(retry_count=0))
+        self.calls: List[Any] = []
+
+    async def _request(self, method: str, url: str, weight: int = 1, payload_callback=None, **kwargs):
+        self.calls.append((method, url, kwargs))
+        await asyncio.sleep(0.05)
+        if url == 'fail':
+            raise ValueError(url)
+        return {'url': url, **kwargs.get('params', {})}
+
+
+class HTTPGatewayTest(IsolatedAsyncioTestCase):
+    async def test_coalesce_identical_requests(self) -> None:
+        gateway = _FakeGateway()
+        results = await asyncio.gather(*(gateway.request('get', 'v1/contracts', params={'limit': 1}) for _ in range(10)))
+        self.assertEqual(1, len(gateway.calls))
+        self.assertEqual([{'url': 'v1/contracts', 'limit': 1}] * 10, results)
+        self.assertEqual({}, gateway._inflight)
+
+        await gateway.request('get', 'v1/contracts', params={'limit': 1})
+        self.assertEqual(2, len(gateway.calls))
+
+    async def test_coalesced_results_are_copied(self) -> None:
+        gateway = _FakeGateway()
+        results = await asyncio.gather(*(gateway.request('get', 'v1/contracts', params={'limit': 1}) for _ in range(3)))
+        results[0]['limit'] = 2
+        self.assertEqual([2, 1, 1], [result['limit'] for result in results])
+
+    async def test_different_requests(self) -> None:
+        gateway = _FakeGateway()
+        await asyncio.gather(
+            gateway.request('get', 'v1/contracts', params={'limit': 1}),
+            gateway.request('get', 'v1/contracts', params={'limit': 2}),
+            gateway.request('get', 'v1/blocks', params={'limit': 1}),
+            gateway.request('post', 'v1/contracts', json={}),
+            gateway.request('post', 'v1/contracts', json={}),
+        )
+        self.assertEqual(5, len(gateway.calls))
+
+    async def test_exception(self) -> None:
+        gateway = _FakeGateway()
+        results = await asyncio.gather(*(gateway.request('get', 'fail') for _ in range(3)), return_exceptions=True)
+        self.assertEqual(1, len(gateway.calls))
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+    async def test_cancel_caller(self) -> None:
+        gateway = _FakeGateway()
+        first = asyncio.create_task(gateway.request('get', 'v1/contracts'))
+        second = asyncio.create_task(gateway.request('get', 'v1/contracts'))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual({'url': 'v1/contracts'}, await second)
+        self.assertEqual(1, len(gateway.calls))
+
+
+class ResponseCacheTest(TestCase):
+    def test_get_set(self) -> None:
+        with TemporaryDirectory() as path:
+            cache = ResponseCache(path)
+            self.assertIsNone(cache.get(('a', 1)))
+            cache.set(('a', 1), [{'level': 1}])
+            self.assertEqual([{'level': 1}], cache.get(('a', 1)))
+            self.assertEqual(1, cache.count())
+
+            cache.clear()
+            self.assertIsNone(cache.get(('a', 1)))
+            self.assertEqual(0, cache.count())
+            self.assertEqual(0, cache.size())
+
+    def test_evict(self) -> None:
+        with TemporaryDirectory() as path:
+            cache = ResponseCache(path, size=1)
+            value = 'x' * 300 * 1024
+            for i in range(5):
+                cache.set(i, value)
+                # NOTE: Make LRU order deterministic
+                os.utime(cache._get_path(i), (i, i))
+
+            self.assertLessEqual(cache.size(), 1024 * 1024)
+            self.assertEqual(cache.size(), ResponseCache(path).size())
+            self.assertIsNone(cache.get(0))
+            self.assertEqual(value, cache.get(4))
+
+
+class TzktResponseCacheTest(IsolatedAsyncioTestCase):
+    async def test_cache_finalized_pages(self) -> None:
+        with TemporaryDirectory() as path:
+            datasource = TzktDatasource('https://api.tzkt.io', HTTPConfig(cache=True), rollback_depth=2)
+            cache = datasource._http._cache = ResponseCache(path)
+            datasource._head_level = 100
+
+            page = [{'id': 1, 'level': 90}, {'id': 2, 'level': 97}, {'id': 3, 'level': 99}]
+            datasource._http.request = AsyncMock(return_value=page)  # type: ignore
+
+            async def request(last_level: int, limit: int = 3) -> Any:
+                params = {'level.ge': 0, 'level.le': last_level, 'offset.cr': 0, 'limit': limit}
+                return await datasource.request('get', 'v1/operations/transactions', params=params)
+
+            # NOTE: Not finalized yet
+            self.assertEqual(page, await request(99))
+            # NOTE: Partial page
+            self.assertEqual(page, await request(99, limit=4))
+            self.assertEqual(0, cache.count())
+
+            datasource._head_level = 101
+            self.assertEqual(page, await request(99))
+            self.assertEqual(1, cache.count())
+            self.assertEqual(3, datasource._http.request.call_count)
+
+            # NOTE: Served from cache regardless of `level.le`
+            self.assertEqual(page, await request(1000))
+            self.assertEqual(page[:2], await request(98))
+            self.assertEqual(3, datasource._http.request.call_count)
+
+            # NOTE: Cached page serves lower limits only
+            self.assertEqual(page[:2], await request(99, limit=2))
+            self.assertEqual(3, datasource._http.request.call_count)
+            await request(99, limit=4)
+            self.assertEqual(4, datasource._http.request.call_count)
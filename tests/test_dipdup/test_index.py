@@ -1,16 +1,48 @@
+import asyncio
 import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from types import SimpleNamespace
+from typing import Any
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import cast
 from unittest import IsolatedAsyncioTestCase
 from unittest.mock import AsyncMock
+from unittest.mock import patch
 
+from demo_hic_et_nunc.types.hen_minter.parameter.swap import SwapParameter
+from demo_hic_et_nunc.types.hen_minter.storage import HenMinterStorage
+from dipdup.config import BigMapHandlerConfig
+from dipdup.config import BigMapIndexConfig
 from dipdup.config import ContractConfig
 from dipdup.config import OperationHandlerConfig
+from dipdup.config import OperationHandlerOriginationPatternConfig
+from dipdup.config import OperationHandlerPatternConfigT
 from dipdup.config import OperationHandlerTransactionPatternConfig
 from dipdup.config import OperationIndexConfig
+from dipdup.config import TokenTransferHandlerConfig
+from dipdup.config import TokenTransferIndexConfig
 from dipdup.config import TzktDatasourceConfig
+from dipdup.datasources.tzkt.models import deserialize_storage
 from dipdup.enums import OperationType
+from dipdup.exceptions import InvalidDataError
+from dipdup.index import BigMapIndex
 from dipdup.index import OperationIndex
+from dipdup.index import OperationPatternLookup
+from dipdup.index import OperationSubgroup
+from dipdup.index import OperationSyncStream
+from dipdup.index import TokenTransferIndex
 from dipdup.index import extract_operation_subgroups
+from dipdup.models import BigMapAction
+from dipdup.models import BigMapData
+from dipdup.models import IndexStatus
+from dipdup.models import LazyTransaction
 from dipdup.models import OperationData
+from dipdup.models import TokenTransferData
+from dipdup.models import Transaction
 
 add_liquidity_operations = (
     OperationData(
@@ -309,3 +341,667 @@ class MatcherTest(IsolatedAsyncioTestCase):
         matched_handlers = await index._match_operation_subgroup(operation_subgroups[0])
         assert len(matched_handlers) == 1
         index._prepare_handler_args.assert_called()
+
+
+class TokenTransferMatcherTest(IsolatedAsyncioTestCase):
+    async def test_match_token_transfers(self) -> None:
+        token = ContractConfig(address='KT1RJ6PbjHpwc3M5rw5s2Nbmefwbuwbdxton')
+        wallet = ContractConfig(address='tz1cmAfyjWW3Rf3tH3M3maCpwsiAwBKbtmG4')
+        on_mint = TokenTransferHandlerConfig(callback='on_mint', contract=token, token_id=1)
+        on_receive = TokenTransferHandlerConfig(callback='on_receive', to=wallet)
+        config = TokenTransferIndexConfig(
+            kind='token_transfer',
+            datasource=TzktDatasourceConfig(kind='tzkt', url='https://api.tzkt.io'),
+            handlers=(on_mint, on_receive),
+        )
+        config.name = 'transfers'
+        index = TokenTransferIndex(None, config, None)  # type: ignore
+
+        def _transfer(id_: int, contract: str, token_id: int, to: str) -> TokenTransferData:
+            return TokenTransferData(
+                id=id_,
+                level=1,
+                timestamp=datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc),
+                tzkt_token_id=id_,
+                contract_address=contract,
+                token_id=token_id,
+                to_address=to,
+            )
+
+        token_transfers = (
+            _transfer(1, token.address, 1, 'tz1VSUr8wwNhLAzempoch5d6hLRiTh8Cjcjb'),
+            _transfer(2, token.address, 2, wallet.address),
+            _transfer(3, token.address, 1, wallet.address),
+            _transfer(4, 'KT1Hkg5qeNhfwpKW4fXvq7HGZB9z2EnmCCA9', 1, 'tz1VSUr8wwNhLAzempoch5d6hLRiTh8Cjcjb'),
+        )
+        matched_handlers = await index._match_token_transfers(token_transfers)
+        self.assertEqual(
+            [('on_mint', 1), ('on_receive', 2), ('on_mint', 3), ('on_receive', 3)],
+            [(handler_config.callback, token_transfer.id) for handler_config, token_transfer in matched_handlers],
+        )
+
+        # NOTE: Every field is filtered by only one of handlers, nothing to push to TzKT
+        self.assertEqual(set(), index._get_token_addresses())
+        self.assertEqual(set(), index._get_to_addresses())
+        self.assertEqual(set(), index._get_from_addresses())
+
+    async def test_call_matched_handlers(self) -> None:
+        on_transfer = TokenTransferHandlerConfig(callback='on_transfer')
+        on_transfers = TokenTransferHandlerConfig(callback='on_transfers', batch=True)
+        config = TokenTransferIndexConfig(
+            kind='token_transfer',
+            datasource=TzktDatasourceConfig(kind='tzkt', url='https://api.tzkt.io'),
+            handlers=(on_transfer, on_transfers),
+        )
+        config.name = 'transfers'
+        index = TokenTransferIndex(None, config, None)  # type: ignore
+        index._call_matched_handler = AsyncMock()  # type: ignore
+
+        matched_handlers = deque(((on_transfer, 1), (on_transfers, 1), (on_transfer, 2), (on_transfers, 2)))
+        await index._call_matched_handlers(matched_handlers)  # type: ignore
+
+        self.assertEqual(
+            [(on_transfer, 1), (on_transfers, (1, 2)), (on_transfer, 2)],
+            [call.args for call in index._call_matched_handler.call_args_list],  # type: ignore
+        )
+
+    def test_batch_argument(self) -> None:
+        handler_config = TokenTransferHandlerConfig(callback='on_transfers', batch=True)
+        self.assertEqual(
+            ['ctx: HandlerContext', 'token_transfers: Tuple[TokenTransferData, ...]'],
+            list(handler_config.format_arguments()),
+        )
+        self.assertIn('from typing import Tuple', set(handler_config.format_imports('demo')))
+
+    async def test_process_matched_levels(self) -> None:
+        ctx = SimpleNamespace(config=SimpleNamespace(advanced=SimpleNamespace(rollback_depth=2)))
+        config = TokenTransferIndexConfig(kind='token_transfer', datasource=TzktDatasourceConfig(kind='tzkt', url='https://api.tzkt.io'))
+        config.name = 'transfers'
+        index = TokenTransferIndex(ctx, config, None)  # type: ignore
+        index._process_matched_handlers = AsyncMock()  # type: ignore
+
+        async def _matched_levels():
+            for level in range(1, 11):
+                yield level, deque((level,))
+
+        await index._process_matched_levels(_matched_levels(), 10, 3)
+
+        # NOTE: Levels within rollback depth from sync level are not batched
+        self.assertEqual(
+            [((1, 2, 3), 3), ((4, 5, 6), 6), ((7,), 7), ((8,), 8), ((9,), 9), ((10,), 10)],
+            [(tuple(call.args[0]), call.args[1]) for call in index._process_matched_handlers.call_args_list],  # type: ignore
+        )
+
+        # NOTE: Each level takes a second to process; window is closed after 2 seconds
+        index._process_matched_handlers.reset_mock()  # type: ignore
+        with patch('dipdup.index.time') as time_mock:
+            time_mock.perf_counter.side_effect = range(100)
+            await index._process_matched_levels(_matched_levels(), 10, 100, 2)
+
+        self.assertEqual(
+            [((1, 2), 2), ((3, 4), 4), ((5, 6), 6), ((7,), 7), ((8,), 8), ((9,), 9), ((10,), 10)],
+            [(tuple(call.args[0]), call.args[1]) for call in index._process_matched_handlers.call_args_list],  # type: ignore
+        )
+
+
+def _big_map(id_: int, address: str, path: str, level: int = 1) -> BigMapData:
+    return BigMapData(
+        id=id_,
+        level=level,
+        operation_id=1,
+        timestamp=datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc),
+        bigmap=1,
+        contract_address=address,
+        path=path,
+        action=BigMapAction.ADD_KEY,
+        active=True,
+    )
+
+
+def _big_map_index(*handlers: BigMapHandlerConfig) -> BigMapIndex:
+    config = BigMapIndexConfig(
+        kind='big_map',
+        datasource=TzktDatasourceConfig(kind='tzkt', url='https://api.tzkt.io'),
+        handlers=handlers,
+    )
+    config.name = 'big_maps'
+    index = BigMapIndex(None, config, None)  # type: ignore
+    index._prepare_handler_args = AsyncMock(side_effect=lambda handler_config, big_map: big_map.id)  # type: ignore
+    index._call_matched_handler = AsyncMock()  # type: ignore
+    return index
+
+
+class BigMapMatcherTest(IsolatedAsyncioTestCase):
+    async def test_match_big_maps(self) -> None:
+        registry = ContractConfig(address='KT1GBZmSxmnKJXGMdMLbugPfLyUPmuLSMwKS')
+        token = ContractConfig(address='KT1RJ6PbjHpwc3M5rw5s2Nbmefwbuwbdxton')
+        on_records = BigMapHandlerConfig(callback='on_records', contract=registry, path='store.records')
+        on_ledger = BigMapHandlerConfig(callback='on_ledger', contract=token, path='ledger')
+        on_ledger_audit = BigMapHandlerConfig(callback='on_ledger_audit', contract=token, path='ledger')
+        index = _big_map_index(on_records, on_ledger, on_ledger_audit)
+
+        big_maps = (
+            _big_map(0, token.address, 'ledger'),
+            _big_map(1, registry.address, 'store.records'),
+            _big_map(2, registry.address, 'ledger'),
+            _big_map(3, token.address, 'store.records'),
+            _big_map(4, token.address, 'ledger'),
+        )
+        matched_handlers = await index._match_big_maps(big_maps)
+        self.assertEqual(
+            [('on_ledger', 0), ('on_ledger_audit', 0), ('on_records', 1), ('on_ledger', 4), ('on_ledger_audit', 4)],
+            [(handler_config.callback, arg) for handler_config, arg in matched_handlers],
+        )
+
+        index.push_big_maps(big_maps[2:4])
+        index.push_big_maps(big_maps)
+        self.assertEqual([(0, 1, 4)], [tuple(big_map.id for big_map in message) for message in index._queue])
+
+    async def test_call_matched_handlers(self) -> None:
+        contract = ContractConfig(address='KT1GBZmSxmnKJXGMdMLbugPfLyUPmuLSMwKS')
+        on_records = BigMapHandlerConfig(callback='on_records', contract=contract, path='store.records', batch=True)
+        on_expiry = BigMapHandlerConfig(callback='on_expiry', contract=contract, path='store.expiry_map')
+        index = _big_map_index(on_records, on_expiry)
+
+        paths = ('store.expiry_map', 'store.records', 'store.expiry_map', 'store.records', 'store.records')
+        big_maps = tuple(_big_map(i, contract.address, path) for i, path in enumerate(paths))
+        matched_handlers = await index._match_big_maps(big_maps)
+        await index._call_matched_handlers(matched_handlers)
+
+        self.assertEqual(
+            [(on_expiry, 0), (on_records, (1, 3, 4)), (on_expiry, 2)],
+            [call.args for call in index._call_matched_handler.call_args_list],  # type: ignore
+        )
+
+    async def test_queue_overflow(self) -> None:
+        contract = ContractConfig(address='KT1GBZmSxmnKJXGMdMLbugPfLyUPmuLSMwKS')
+        index = _big_map_index(BigMapHandlerConfig(callback='on_records', contract=contract, path='store.records'))
+        index._config.queue_size = 3
+        index._state = SimpleNamespace(level=1, status=IndexStatus.REALTIME)  # type: ignore
+        index.get_sync_level = lambda: 1  # type: ignore
+        index._synchronize = AsyncMock()  # type: ignore
+
+        # NOTE: Levels 2 and 3 don't fit into queue and are dropped
+        index.push_big_maps(tuple(_big_map(i, contract.address, 'store.records', 2) for i in range(2)))
+        index.push_big_maps(tuple(_big_map(i, contract.address, 'store.records', 3) for i in range(2, 4)))
+        index.push_big_maps((_big_map(4, contract.address, 'store.records', 4),))
+        self.assertEqual([(4,)], [tuple(big_map.id for big_map in message) for message in index._queue])
+        self.assertEqual(1, index._queue_items)
+        self.assertEqual(3, index._dropped_level)
+
+        # NOTE: Dropped levels are fetched via REST, newer messages stay in queue
+        self.assertTrue(await index.process())
+        index._synchronize.assert_awaited_once_with(3)  # type: ignore
+        self.assertEqual(1, len(index._queue))
+        self.assertEqual(0, index._dropped_level)
+
+    async def test_bump_unmatched_level(self) -> None:
+        contract = ContractConfig(address='KT1GBZmSxmnKJXGMdMLbugPfLyUPmuLSMwKS')
+        index = _big_map_index(BigMapHandlerConfig(callback='on_records', contract=contract, path='store.records'))
+        index._state = SimpleNamespace(level=1, status=IndexStatus.REALTIME, update_status=AsyncMock())  # type: ignore
+        index.get_sync_level = lambda: 1  # type: ignore
+        index._process_queue = AsyncMock(side_effect=index._queue.clear)  # type: ignore
+
+        # NOTE: Level is bumped only after queued levels are processed
+        index.push_big_maps((_big_map(0, contract.address, 'store.records', 2),))
+        index.push_big_maps((_big_map(1, contract.address, 'store.expiry_map', 3),))
+        self.assertEqual(1, len(index._queue))
+        self.assertTrue(await index.process())
+        index.state.update_status.assert_not_awaited()  # type: ignore
+
+        index.push_big_maps((_big_map(2, contract.address, 'store.expiry_map', 4),))
+        self.assertTrue(await index.process())
+        index.state.update_status.assert_awaited_once_with(level=4)  # type: ignore
+
+    def test_batch_argument(self) -> None:
+        contract = ContractConfig(address='KT1GBZmSxmnKJXGMdMLbugPfLyUPmuLSMwKS', typename='name_registry')
+        handler_config = BigMapHandlerConfig(callback='on_records', contract=contract, path='store.records', batch=True)
+        self.assertEqual(
+            ['ctx: HandlerContext', 'store_records: Tuple[BigMapDiff[StoreRecordsKey, StoreRecordsValue], ...]'],
+            list(handler_config.format_arguments()),
+        )
+        self.assertIn('from typing import Tuple', set(handler_config.format_imports('demo')))
+
+
+class OperationBatchTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        dex = ContractConfig(address='KT1BEC9uHmADgVLXCm3wxN52qJJ85ohrWEaU', typename='dex')
+        token = ContractConfig(address='KT1TwzD6zV3WeJ39ukuqxcfK2fJCnhvrdN1X', typename='token')
+        self.on_swap = OperationHandlerConfig(
+            callback='on_swap',
+            pattern=(
+                OperationHandlerTransactionPatternConfig(destination=dex, entrypoint='swap'),
+                OperationHandlerTransactionPatternConfig(destination=token, entrypoint='transfer', optional=True),
+            ),
+        )
+        self.on_swaps = OperationHandlerConfig(callback='on_swaps', pattern=self.on_swap.pattern, batch=True)
+
+    def test_batch_argument(self) -> None:
+        self.assertEqual(
+            [
+                'ctx: HandlerContext',
+                'swap: Tuple[Transaction[SwapParameter, DexStorage], ...]',
+                'transfer: Tuple[Optional[Transaction[TransferParameter, TokenStorage]], ...]',
+            ],
+            list(self.on_swaps.format_arguments()),
+        )
+        imports = set(self.on_swaps.format_imports('demo'))
+        self.assertIn('from typing import Tuple', imports)
+        self.assertIn('from typing import Optional', imports)
+
+    async def test_call_matched_handlers(self) -> None:
+        index = OperationIndex(None, index_config, None)  # type: ignore
+        index._call_matched_handler = AsyncMock()  # type: ignore
+
+        subgroups = tuple(OperationSubgroup(hash=f'op{i}', counter=i, operations=(), entrypoints=set()) for i in range(2))
+        matched_handlers = deque(
+            (
+                (subgroups[0], self.on_swap, ('swap_0', 'transfer_0')),
+                (subgroups[0], self.on_swaps, ('swap_0', 'transfer_0')),
+                (subgroups[1], self.on_swap, ('swap_1', None)),
+                (subgroups[1], self.on_swaps, ('swap_1', None)),
+            )
+        )
+        await index._call_matched_handlers(matched_handlers)  # type: ignore
+
+        self.assertEqual(
+            [
+                (self.on_swap, subgroups[0], ('swap_0', 'transfer_0')),
+                (self.on_swaps, None, (('swap_0', 'swap_1'), ('transfer_0', None))),
+                (self.on_swap, subgroups[1], ('swap_1', None)),
+            ],
+            [call.args for call in index._call_matched_handler.call_args_list],  # type: ignore
+        )
+
+    async def test_absent_optional(self) -> None:
+        index = OperationIndex(None, index_config, None)  # type: ignore
+        index._call_matched_handler = AsyncMock()  # type: ignore
+
+        subgroups = tuple(OperationSubgroup(hash=f'op{i}', counter=i, operations=(), entrypoints=set()) for i in range(2))
+        # NOTE: Trailing optional pattern item is not matched in the first subgroup
+        matched_handlers = deque(
+            (
+                (subgroups[0], self.on_swaps, ('swap_0',)),
+                (subgroups[1], self.on_swaps, ('swap_1', 'transfer_1')),
+            )
+        )
+        await index._call_matched_handlers(matched_handlers)  # type: ignore
+
+        self.assertEqual(
+            [(self.on_swaps, None, (('swap_0', 'swap_1'), (None, 'transfer_1')))],
+            [call.args for call in index._call_matched_handler.call_args_list],  # type: ignore
+        )
+
+
+class OperationPatternLookupTest(IsolatedAsyncioTestCase):
+    async def test_match_candidates(self) -> None:
+        dex = ContractConfig(address='KT1BEC9uHmADgVLXCm3wxN52qJJ85ohrWEaU', typename='dex')
+        token = ContractConfig(address='KT1TwzD6zV3WeJ39ukuqxcfK2fJCnhvrdN1X', typename='token')
+        factory = ContractConfig(address='KT1NLZah1MKeWuveQvdsCqAUCjksKw8J296z', typename='factory')
+
+        def _transaction(**kwargs) -> OperationHandlerTransactionPatternConfig:
+            return OperationHandlerTransactionPatternConfig(type='transaction', **kwargs)
+
+        def _create_config() -> OperationIndexConfig:
+            patterns: Tuple[Tuple[OperationHandlerPatternConfigT, ...], ...] = (
+                (_transaction(destination=dex, entrypoint='swap'),),
+                (_transaction(destination=dex, entrypoint='swap'), _transaction(destination=token, entrypoint='transfer')),
+                (_transaction(destination=dex),),
+                (_transaction(destination=token, entrypoint='transfer'),),
+                (_transaction(source=factory),),
+                (_transaction(destination=dex, entrypoint='invest'), _transaction(destination=token, entrypoint='transfer', optional=True)),
+                (OperationHandlerOriginationPatternConfig(source=factory),),
+                (OperationHandlerOriginationPatternConfig(originated_contract=token),),
+            )
+            config = OperationIndexConfig(
+                kind='operation',
+                datasource=TzktDatasourceConfig(kind='tzkt', url='https://api.tzkt.io'),
+                handlers=tuple(OperationHandlerConfig(callback=f'on_{i}', pattern=pattern) for i, pattern in enumerate(patterns)),
+                contracts=[dex],
+            )
+            config.name = 'dex'
+            return config
+
+        def _operation(
+            id_: int,
+            type_: str,
+            sender: str,
+            target: Optional[str],
+            entrypoint: Optional[str] = None,
+            originated: Optional[str] = None,
+        ) -> OperationData:
+            return OperationData(
+                type=type_,
+                id=id_,
+                level=1,
+                timestamp=datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc),
+                hash='op',
+                counter=1,
+                sender_address=sender,
+                target_address=target,
+                initiator_address=None,
+                amount=0,
+                status='applied',
+                has_internals=False,
+                storage={},
+                entrypoint=entrypoint,
+                originated_contract_address=originated,
+            )
+
+        wallet = 'tz1cmAfyjWW3Rf3tH3M3maCpwsiAwBKbtmG4'
+        subgroups = (
+            (
+                _operation(1, 'transaction', wallet, dex.address, 'swap'),
+                _operation(2, 'transaction', dex.address, token.address, 'transfer'),
+            ),
+            (_operation(1, 'transaction', wallet, dex.address, 'invest'),),
+            (_operation(1, 'transaction', factory.address, wallet, 'default'),),
+            (_operation(1, 'origination', factory.address, None, originated=token.address),),
+            (_operation(1, 'transaction', wallet, wallet, 'default'),),
+        )
+
+        async def _match(lookup: OperationPatternLookup):
+            # NOTE: Origination patterns are stateful
+            index = OperationIndex(None, _create_config(), None)  # type: ignore
+            index._prepare_handler_args = AsyncMock(side_effect=lambda handler_config, operations: tuple(operations))  # type: ignore
+            index._pattern_lookup = lookup
+            result = []
+            for operations in subgroups:
+                subgroup = OperationSubgroup(hash='op', counter=1, operations=operations, entrypoints=set())
+                matched_handlers = await index._match_operation_subgroup(subgroup)
+                result.append([(handler_config.callback, args) for _, handler_config, args in matched_handlers])
+            return result
+
+        # NOTE: Compare with checking every handler
+        config = _create_config()
+        lookup = OperationPatternLookup(config.handlers)
+        full_scan = OperationPatternLookup(())
+        full_scan._any = set(range(len(config.handlers)))
+
+        self.assertEqual([[0, 1, 2, 3, 5], [2, 5], [4, 5], [5, 6, 7], [5]], [lookup.get_candidates(operations) for operations in subgroups])
+        expected = await _match(full_scan)
+        self.assertEqual(['on_0', 'on_1', 'on_2', 'on_3'], [callback for callback, _ in expected[0]])
+        self.assertEqual(expected, await _match(lookup))
+
+
+class ParsePoolTest(IsolatedAsyncioTestCase):
+    async def test_parse_in_pool(self) -> None:
+        minter = ContractConfig(address='KT1Hkg5qeNhfwpKW4fXvq7HGZB9z2EnmCCA9', typename='hen_minter')
+        pattern = OperationHandlerTransactionPatternConfig(type='transaction', destination=minter, entrypoint='swap')
+        pattern.parameter_type_cls = SwapParameter
+        pattern.storage_type_cls = HenMinterStorage
+        config = OperationIndexConfig(
+            kind='operation',
+            datasource=TzktDatasourceConfig(kind='tzkt', url='https://api.tzkt.io'),
+            handlers=(OperationHandlerConfig(callback='on_swap', pattern=(pattern,)),),
+            contracts=[minter],
+        )
+        config.name = 'hen_mainnet'
+        index = OperationIndex(None, config, None)  # type: ignore
+
+        def _swap(level: int, objkt_amount: Any) -> OperationData:
+            return OperationData(
+                type='transaction',
+                id=level,
+                level=level,
+                timestamp=datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc),
+                hash=f'op{level}',
+                counter=level,
+                sender_address='tz1cmAfyjWW3Rf3tH3M3maCpwsiAwBKbtmG4',
+                target_address=minter.address,
+                initiator_address=None,
+                amount=0,
+                status='applied',
+                has_internals=False,
+                entrypoint='swap',
+                parameter_json={'objkt_amount': objkt_amount, 'objkt_id': str(level), 'xtz_per_objkt': '1000000'},
+                storage={
+                    'curate': 'KT1TybhR7XraG75JFYKSrh7KnxukMBT5dor6',
+                    'genesis': '2021-03-01T00:00:00Z',
+                    'hdao': 'KT1AFA2mwNUMNd4SsujE1YYp29vd8BZejyKW',
+                    'locked': True,
+                    'manager': 'tz1UBZUkXpKGhYsP5KtzDNqLLchwF4uHrGjw',
+                    'metadata': 519,
+                    'objkt': 'KT1RJ6PbjHpwc3M5rw5s2Nbmefwbuwbdxton',
+                    'objkt_id': '152',
+                    'royalties': 522,
+                    'size': '0',
+                    'swap_id': str(level),
+                    'swaps': 523,
+                },
+                diffs=(
+                    {
+                        'bigmap': 523,
+                        'path': 'swaps',
+                        'action': 'add_key',
+                        'content': {
+                            'key': str(level),
+                            'value': {
+                                'issuer': 'tz1cmAfyjWW3Rf3tH3M3maCpwsiAwBKbtmG4',
+                                'objkt_amount': '1',
+                                'objkt_id': str(level),
+                                'xtz_per_objkt': '1000000',
+                            },
+                        },
+                    },
+                ),
+            )
+
+        async def _match_levels(operations: Tuple[OperationData, ...]):
+            for operation in operations:
+                subgroup = OperationSubgroup(hash=operation.hash, counter=operation.counter, operations=(operation,), entrypoints={'swap'})
+                yield operation.level, await index._match_operation_subgroup(subgroup)
+
+        with ProcessPoolExecutor(max_workers=2, mp_context=get_context('spawn')) as pool:
+            with patch('dipdup.index.PARSE_LOOKAHEAD_LEVELS', 4):
+                levels = [item async for item in index._parse_in_pool(_match_levels(tuple(_swap(i, '1') for i in range(1, 11))), pool)]
+
+            self.assertEqual(list(range(1, 11)), [level for level, _ in levels])
+            for level, matched_handlers in levels:
+                _, _, args = matched_handlers[0]
+                transaction = args[0]
+                assert isinstance(transaction, Transaction)
+                self.assertEqual(SwapParameter(objkt_amount='1', objkt_id=str(level), xtz_per_objkt='1000000'), transaction.parameter)
+                self.assertIsInstance(transaction.storage, HenMinterStorage)
+                self.assertEqual(str(level), transaction.storage.swaps[str(level)].objkt_id)
+                self.assertEqual(transaction.storage.swaps.keys(), transaction.data.storage['swaps'].keys())
+
+            # NOTE: Errors are raised in the main process
+            with self.assertRaises(InvalidDataError):
+                async for _ in index._parse_in_pool(_match_levels((_swap(11, {}),)), pool):
+                    pass
+            self.assertIsNone(index._parse_pool)
+
+
+class LazyParsingTest(IsolatedAsyncioTestCase):
+    async def test_lazy_transaction(self) -> None:
+        minter = ContractConfig(address='KT1Hkg5qeNhfwpKW4fXvq7HGZB9z2EnmCCA9', typename='hen_minter')
+        pattern = OperationHandlerTransactionPatternConfig(type='transaction', destination=minter, entrypoint='swap')
+        pattern.parameter_type_cls = SwapParameter
+        pattern.storage_type_cls = HenMinterStorage
+        handler_config = OperationHandlerConfig(callback='on_swap', pattern=(pattern,), lazy=True)
+        config = OperationIndexConfig(
+            kind='operation',
+            datasource=TzktDatasourceConfig(kind='tzkt', url='https://api.tzkt.io'),
+            handlers=(handler_config,),
+            contracts=[minter],
+        )
+        config.name = 'hen_mainnet'
+        index = OperationIndex(None, config, None)  # type: ignore
+
+        def _swap(level: int, objkt_amount: Any) -> OperationData:
+            return OperationData(
+                type='transaction',
+                id=level,
+                level=level,
+                timestamp=datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc),
+                hash=f'op{level}',
+                counter=level,
+                sender_address='tz1cmAfyjWW3Rf3tH3M3maCpwsiAwBKbtmG4',
+                target_address=minter.address,
+                initiator_address=None,
+                amount=0,
+                status='applied',
+                has_internals=False,
+                entrypoint='swap',
+                parameter_json={'objkt_amount': objkt_amount, 'objkt_id': str(level), 'xtz_per_objkt': '1000000'},
+                storage={
+                    'curate': 'KT1TybhR7XraG75JFYKSrh7KnxukMBT5dor6',
+                    'genesis': '2021-03-01T00:00:00Z',
+                    'hdao': 'KT1AFA2mwNUMNd4SsujE1YYp29vd8BZejyKW',
+                    'locked': True,
+                    'manager': 'tz1UBZUkXpKGhYsP5KtzDNqLLchwF4uHrGjw',
+                    'metadata': 519,
+                    'objkt': 'KT1RJ6PbjHpwc3M5rw5s2Nbmefwbuwbdxton',
+                    'objkt_id': '152',
+                    'royalties': 522,
+                    'size': '0',
+                    'swap_id': str(level),
+                    'swaps': 523,
+                },
+            )
+
+        with patch('dipdup.index.deserialize_storage', wraps=deserialize_storage) as deserialize_storage_mock:
+            (transaction,) = await index._prepare_handler_args(handler_config, deque((_swap(1, '1'),)))
+            assert isinstance(transaction, LazyTransaction)
+            self.assertEqual(1, transaction.data.level)
+
+            # NOTE: Neither `repr` nor comparison force parsing
+            self.assertEqual(f'LazyTransaction(data={transaction.data!r})', repr(transaction))
+            (same_transaction,) = await index._prepare_handler_args(handler_config, deque((_swap(1, '1'),)))
+            self.assertEqual(same_transaction, transaction)
+            deserialize_storage_mock.assert_not_called()
+
+            self.assertIsInstance(transaction.storage, HenMinterStorage)
+            self.assertIs(transaction.storage, transaction.storage)
+            self.assertEqual('1', transaction.storage.swap_id)
+            deserialize_storage_mock.assert_called_once()
+            self.assertIn(f'storage={transaction.storage!r}', repr(transaction))
+
+        self.assertEqual(SwapParameter(objkt_amount='1', objkt_id='1', xtz_per_objkt='1000000'), transaction.parameter)
+        self.assertIsInstance(transaction, Transaction)
+
+        (invalid_transaction,) = await index._prepare_handler_args(handler_config, deque((_swap(2, {}),)))
+        self.assertNotEqual(invalid_transaction, transaction)
+        with self.assertRaises(InvalidDataError) as e:
+            invalid_transaction.parameter  # type: ignore[union-attr]
+        self.assertEqual(2, e.exception.parsed_object.level)
+
+
+CONTRACTS = (
+    'KT1BEC9uHmADgVLXCm3wxN52qJJ85ohrWEaU',
+    'KT1TwzD6zV3WeJ39ukuqxcfK2fJCnhvrdN1X',
+    'KT1RJ6PbjHpwc3M5rw5s2Nbmefwbuwbdxton',
+    'KT1Hkg5qeNhfwpKW4fXvq7HGZB9z2EnmCCA9',
+)
+
+
+def _contract_call_index(name: str, address: str, level: int) -> OperationIndex:
+    contract = ContractConfig(address=address, typename='contract')
+    pattern = OperationHandlerTransactionPatternConfig(type='transaction', destination=contract, entrypoint='default')
+    config = OperationIndexConfig(
+        kind='operation',
+        datasource=TzktDatasourceConfig(kind='tzkt', url='https://api.tzkt.io'),
+        handlers=(OperationHandlerConfig(callback='on_call', pattern=(pattern,)),),
+        contracts=[contract],
+        types=(OperationType.transaction,),
+    )
+    config.name = name
+    index = OperationIndex(None, config, None)  # type: ignore
+    index._state = SimpleNamespace(level=level, status=IndexStatus.SYNCING)  # type: ignore
+    return index
+
+
+class OperationSyncStreamTest(IsolatedAsyncioTestCase):
+    async def test_shared_sync(self) -> None:
+        addresses = CONTRACTS[:3]
+        transactions = tuple(
+            OperationData(
+                type='transaction',
+                id=level * 10 + i,
+                level=level,
+                timestamp=datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc),
+                hash=f'op{level}{i}',
+                counter=level,
+                sender_address='tz1cmAfyjWW3Rf3tH3M3maCpwsiAwBKbtmG4',
+                target_address=address,
+                initiator_address=None,
+                amount=0,
+                status='applied',
+                has_internals=False,
+                storage={},
+                entrypoint='default',
+            )
+            for level in range(1, 11)
+            for i, address in enumerate(addresses)
+        )
+
+        async def _get_transactions(field, addresses, offset, limit, first_level, last_level):
+            if field == 'sender':
+                return ()
+            return tuple(t for t in transactions if t.target_address in addresses and first_level <= t.level <= last_level)
+
+        datasource = SimpleNamespace(
+            name='tzkt',
+            request_limit=10000,
+            prefetch_depth=0,
+            sync_partitions=1,
+            get_transactions=AsyncMock(side_effect=_get_transactions),
+        )
+        indexes = [_contract_call_index(f'index_{i}', address, i * 3) for i, address in enumerate(addresses)]
+        for index in indexes:
+            index._datasource = datasource  # type: ignore
+
+        # NOTE: Indexes at sync level and indexes with `last_level` are synchronized separately
+        synchronized = _contract_call_index('synchronized', CONTRACTS[3], 10)
+        (stream,) = await OperationSyncStream.attach((*indexes, synchronized), 10)
+        self.assertIsNone(synchronized._sync_stream)
+
+        async def _consume(index: OperationIndex) -> List[Tuple[int, Tuple[str, ...]]]:
+            return [
+                (level, tuple(cast(str, op.target_address) for op in operations))
+                async for level, operations in stream.iter_operations(index, index.state.level + 1, 10)
+            ]
+
+        results = await asyncio.gather(*(_consume(index) for index in indexes))
+        for i, (index, result) in enumerate(zip(indexes, results)):
+            self.assertIs(stream, index._sync_stream)
+            self.assertEqual([(level, (addresses[i],)) for level in range(i * 3 + 1, 11)], result)
+
+        # NOTE: One request per field instead of one per field and index
+        self.assertEqual(2, datasource.get_transactions.await_count)
+        self.assertEqual(set(addresses), datasource.get_transactions.await_args.kwargs['addresses'])
+
+    async def test_detach(self) -> None:
+        indexes = [_contract_call_index(f'index_{i}', CONTRACTS[i], 0) for i in range(2)]
+        stream = OperationSyncStream(None, 10)  # type: ignore
+        for index in indexes:
+            stream._add_index(index, {index._config.contracts[0].address}, set())  # type: ignore[union-attr]
+
+        # NOTE: Index which is not consuming stream must not block the rest
+        queue = stream._queues['index_1']
+        for level in range(queue.maxsize):
+            queue.put_nowait((level, ()))
+        stream.detach(indexes[1])
+        self.assertTrue(queue.empty())
+        self.assertEqual(['index_0'], list(stream._queues))
+
+    async def test_sync_level_changed(self) -> None:
+        index = _contract_call_index('index_0', CONTRACTS[0], 0)
+        stream = OperationSyncStream(None, 10)  # type: ignore
+        stream._add_index(index, {CONTRACTS[0]}, set())
+        index._sync_stream = stream
+
+        with self.assertRaises(RuntimeError):
+            async for _ in stream.iter_operations(index, 1, 12):
+                pass
+
+        # NOTE: Index falls back to fetching operations on its own
+        index._sync_stream = stream
+        index._ctx = SimpleNamespace(_parse_pool=None)  # type: ignore
+        index._enter_sync_state = AsyncMock(return_value=0)  # type: ignore
+        index._exit_sync_state = AsyncMock()  # type: ignore
+        index._process_matched_levels = AsyncMock()  # type: ignore
+        index._fetch_operations = AsyncMock()  # type: ignore
+        await index._synchronize(12)
+        index._fetch_operations.assert_awaited_once_with(1, 12)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import json
+from dataclasses import fields
 from datetime import datetime
 from os.path import dirname
 from os.path import join
@@ -9,10 +10,15 @@ from typing import Dict
 from typing import Tuple
 from unittest import TestCase
 
+from demo_hic_et_nunc.types.hen_minter.storage import HenMinterStorage
+from demo_hic_et_nunc.types.hen_minter.storage import Royalties
 from demo_tezos_domains.types.name_registry.storage import NameRegistryStorage
 from dipdup.datasources.tzkt.datasource import TzktDatasource
+from dipdup.datasources.tzkt.models import _compile_storage_plan
 from dipdup.datasources.tzkt.models import deserialize_storage
+from dipdup.models import HeadBlockData
 from dipdup.models import OperationData
+from dipdup.models import TokenTransferData
 from tests.test_dipdup.types.asdf.storage import AsdfStorage
 from tests.test_dipdup.types.bazaar.storage import BazaarMarketPlaceStorage
 from tests.test_dipdup.types.ftzfun.storage import FtzFunStorage
@@ -363,3 +369,104 @@ class ModelsTest(TestCase):
         self.assertIsInstance(storage_obj, YupanaStorage)
         self.assertIsInstance(storage_obj.storage.markets, dict)
         self.assertEqual(storage_obj.storage.markets['tz1MDhGTfMQjtMYFXeasKzRWzkQKPtXEkSEw'], ['0'])
+
+    def test_storage_plan(self) -> None:
+        # Arrange
+        storage = {
+            'curate': 'KT1TybhR7XraG75JFYKSrh7KnxukMBT5dor6',
+            'genesis': '2021-03-01T00:00:00Z',
+            'hdao': 'KT1AFA2mwNUMNd4SsujE1YYp29vd8BZejyKW',
+            'locked': True,
+            'manager': 'tz1UBZUkXpKGhYsP5KtzDNqLLchwF4uHrGjw',
+            'metadata': 519,
+            'objkt': 'KT1RJ6PbjHpwc3M5rw5s2Nbmefwbuwbdxton',
+            'objkt_id': '152',
+            'royalties': 522,
+            'size': '0',
+            'swap_id': '1000',
+            'swaps': 523,
+        }
+        diffs = (
+            {'bigmap': 523, 'path': 'swaps', 'action': 'allocate'},
+            {
+                'bigmap': 523,
+                'path': 'swaps',
+                'action': 'add_key',
+                'content': {
+                    'key': '999',
+                    'value': {
+                        'issuer': 'tz1UBZUkXpKGhYsP5KtzDNqLLchwF4uHrGjw',
+                        'objkt_amount': '1',
+                        'objkt_id': '152',
+                        'xtz_per_objkt': '1000000',
+                    },
+                },
+            },
+        )
+        operation_data = get_operation_data(storage, diffs)
+
+        # Act
+        storage_obj = deserialize_storage(operation_data, HenMinterStorage)
+
+        # Assert
+        self.assertIs(_compile_storage_plan(HenMinterStorage), _compile_storage_plan(HenMinterStorage))
+        self.assertIsNone(_compile_storage_plan(Royalties))
+        self.assertEqual({}, storage_obj.metadata)
+        self.assertEqual({}, storage_obj.royalties)
+        self.assertEqual('152', storage_obj.swaps['999'].objkt_id)
+
+
+def _validate(data: Any) -> Any:
+    """Build the same dataclass with pydantic validation"""
+    return type(data)(**{field.name: getattr(data, field.name) for field in fields(data)})
+
+
+class ConvertersTest(TestCase):
+    def test_convert_operation(self) -> None:
+        for name in ('asdf', 'ftzfun', 'hen_subjkt', 'hjkl', 'kolibri_ovens', 'qwer', 'rewq', 'yupana', 'zxcv'):
+            with open(join(dirname(__file__), f'{name}.json')) as f:
+                operations_json = json.load(f)
+
+            for operation_json in operations_json:
+                operation = TzktDatasource.convert_operation(operation_json)
+                self.assertIsInstance(operation, OperationData)
+                self.assertEqual(_validate(operation), operation)
+
+    def test_convert_token_transfer(self) -> None:
+        token_transfer = TzktDatasource.convert_token_transfer(
+            {
+                'id': 1,
+                'level': 2,
+                'timestamp': '2022-01-01T00:00:00Z',
+                'token': {'id': 3, 'contract': {'address': 'KT1RJ6PbjHpwc3M5rw5s2Nbmefwbuwbdxton'}, 'tokenId': '42', 'standard': 'fa2'},
+                'to': {'address': 'tz1cmAfyjWW3Rf3tH3M3maCpwsiAwBKbtmG4'},
+                'amount': '1000',
+                'transactionId': 4,
+            }
+        )
+        self.assertIsInstance(token_transfer, TokenTransferData)
+        self.assertEqual(42, token_transfer.token_id)
+        self.assertEqual(1000, token_transfer.amount)
+        self.assertEqual(_validate(token_transfer), token_transfer)
+
+    def test_convert_head_block(self) -> None:
+        head_block_json = {
+            'chain': 'main',
+            'chainId': 'NetXdQprcVkpaWU',
+            'cycle': 1,
+            'level': 2,
+            'hash': 'BL',
+            'protocol': 'Pt',
+            'nextProtocol': 'Pt',
+            'timestamp': '2022-01-01T00:00:00Z',
+            'votingEpoch': 3,
+            'votingPeriod': 4,
+            'knownLevel': 2,
+            'lastSync': '2022-01-01T00:00:01Z',
+            'synced': True,
+            'quoteLevel': 2,
+            **{f'quote{currency}': 1.5 for currency in ('Btc', 'Eur', 'Usd', 'Cny', 'Jpy', 'Krw', 'Eth', 'Gbp')},
+        }
+        head_block = TzktDatasource.convert_head_block(head_block_json)
+        self.assertIsInstance(head_block, HeadBlockData)
+        self.assertEqual(_validate(head_block), head_block)
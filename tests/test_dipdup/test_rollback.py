@@ -1,7 +1,10 @@
+import asyncio
 from contextlib import AsyncExitStack
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import List
 from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
 
 import demo_hic_et_nunc.models as hen_models
 import demo_tezos_domains.models as domains_models
@@ -353,3 +356,49 @@ class RollbackTest(IsolatedAsyncioTestCase):
 
             model_updates = await ModelUpdate.filter().count()
             assert model_updates == 3
+
+
+class ConcurrentTransactionsTest(IsolatedAsyncioTestCase):
+    async def _sync_indexes(self, indexes: int, levels: int) -> None:
+        config = DipDupConfig(spec_version='1.2', package='demo_hic_et_nunc')
+        config.initialize()
+        dipdup = DipDup(config)
+        in_transaction = dipdup._transactions.in_transaction
+
+        async with AsyncExitStack() as stack:
+            await dipdup._set_up_database(stack)
+            await dipdup._set_up_transactions(stack)
+            await dipdup._set_up_hooks(set())
+            await dipdup._initialize_schema()
+
+            async def _sync(index: str) -> None:
+                for level in range(1000, 1000 + levels):
+                    async with in_transaction(level=level, index=index):
+                        holder = hen_models.Holder(address=f'{index}_{level}')
+                        await holder.save()
+                        await asyncio.sleep(0)
+                        await holder.delete()
+
+            await asyncio.gather(*(_sync(f'index_{i}') for i in range(indexes)))
+
+            model_updates = await ModelUpdate.filter().order_by('id').values_list('index', 'level', 'model_pk', 'action')
+            self.assertEqual(indexes * levels * 2, len(model_updates))
+            for index, level, model_pk, _ in model_updates:
+                self.assertEqual(f'{index}_{level}', model_pk)
+
+            for i in range(indexes):
+                actions = [action for index, _, _, action in model_updates if index == f'index_{i}']
+                self.assertEqual([ModelUpdateAction.INSERT, ModelUpdateAction.DELETE] * levels, actions)
+
+    async def test_concurrent_sync(self) -> None:
+        await self._sync_indexes(indexes=20, levels=20)
+
+    async def test_overlapping_transactions(self) -> None:
+        """SQLite serializes transactions with a lock; drop it to let transactions of different indexes overlap like on Postgres"""
+
+        @asynccontextmanager
+        async def _in_transaction():
+            yield
+
+        with patch('dipdup.transactions.in_transaction', _in_transaction):
+            await self._sync_indexes(indexes=20, levels=20)